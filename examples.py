@@ -1,7 +1,14 @@
 import base64
+import gzip
+import hashlib
 import os
 import json
 
+# Directory, next to the index, of the file holding each example
+PAYLOAD_DIR = "examples"
+# Global object that each example's file adds the example to, by id
+PAYLOADS_VAR = "EXAMPLES_PAYLOADS"
+
 EXAMPLES = {
     "Getting started": [
         ("hello",       "1) Hello world"),
@@ -49,17 +56,31 @@ EXAMPLES = {
     ],
 }
 
-def bundle_examples_to_javascript(output_file: str):
-    """Bundle the examples into a single javascript file.
+def bundle_examples_to_javascript(output_file: str, payload_dir: str | None = None):
+    """Bundle the examples as an index, plus a javascript file per example.
+
+    The index, written to output_file, lists each category of EXAMPLES, and
+    for each example in it the id, the help entry (its title), the size of
+    the example (loaded from html in the examples directory), and the file
+    holding it. That file, in payload_dir (by default an examples directory
+    next to output_file), stores the example gzipped and encoded as base64,
+    and is named by a hash of its contents, so it can be cached for good.
+    The editor only loads the index at startup, and loads an example's file
+    once it's selected.
 
-    For each example listed in EXAMPLES, create an entry
-    in a javascript data structure that stores the title,
-    the help entry, and the example (loaded from html in the examples directory)
-    encoded as base64."""
+    Other .js files in payload_dir are deleted, so it can't be the directory
+    the examples are read from."""
 
     examples_dir = "./examples"
+    if payload_dir is None:
+        payload_dir = os.path.join(os.path.dirname(output_file), PAYLOAD_DIR)
+    if os.path.realpath(payload_dir) == os.path.realpath(examples_dir):
+        raise ValueError(f"Payload directory {payload_dir} is the examples source directory; "
+                         "write the examples somewhere else, e.g. dist/")
+    src_dir = os.path.relpath(payload_dir, os.path.dirname(output_file) or ".").replace(os.sep, "/")
+    os.makedirs(payload_dir, exist_ok=True)
     result = []
-    num_examples = 0
+    payloads = set()
 
     for category, examples_list in EXAMPLES.items():
         examples_in_category = []
@@ -70,37 +91,57 @@ def bundle_examples_to_javascript(output_file: str):
                 # Read the HTML content
                 with open(file_path, "r", encoding="utf-8") as f:
                     html_content = f.read()
-
-                # Encode to base64
-                base64_content = base64.b64encode(html_content.encode("utf-8")).decode("utf-8")
-
-                # Add to result
-                examples_in_category.append({
-                    "id": example_id,
-                    "help": help_text,
-                    "content": base64_content
-                })
-                print(f'    Encoded {example_id}')
-                num_examples += 1
             except FileNotFoundError:
                 print(f"Warning: Example file {file_path} in category {category} not found")
+                continue
+
+            # Compress and encode to base64, with no timestamp so the same
+            # example always hashes the same
+            html_bytes = html_content.encode("utf-8")
+            base64_content = base64.b64encode(gzip.compress(html_bytes, mtime=0)).decode("utf-8")
+            payload = (f"(globalThis.{PAYLOADS_VAR} ??= {{}})"
+                       f"[{json.dumps(example_id)}] = \"{base64_content}\";\n")
+            digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+            payload_name = f"{example_id}.{digest}.js"
+            with open(os.path.join(payload_dir, payload_name), "w", encoding="utf-8") as f:
+                f.write(payload)
+            payloads.add(payload_name)
+
+            # Add to result
+            examples_in_category.append({
+                "id": example_id,
+                "help": help_text,
+                "size": len(html_bytes),
+                "src": f"{src_dir}/{payload_name}"
+            })
+            print(f'    Encoded {example_id} ({len(payload) // 1024} kB)')
         result.append({
             "category": category,
             "examples": examples_in_category
         })
 
+    # Remove the files of examples since changed or removed
+    for name in os.listdir(payload_dir):
+        if name.endswith(".js") and name not in payloads:
+            os.remove(os.path.join(payload_dir, name))
+
     # Convert to JavaScript object format
-    js_data = "window.EXAMPLES_DATA = " + json.dumps(result, ensure_ascii=False) + ";"
+    js_data = "window.EXAMPLES_INDEX = " + json.dumps(result, ensure_ascii=False) + ";"
 
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(js_data)
 
-    print(f"Wrote {len(result)} categories, {num_examples} examples bundled into {output_file}")
+    print(f"Wrote {len(result)} categories, {len(payloads)} examples indexed into "
+          f"{output_file}, and stored in {payload_dir}")
 
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: python examples.py <output_file>")
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python examples.py <output_file> [<payload_dir>]")
+        sys.exit(1)
+    try:
+        bundle_examples_to_javascript(*sys.argv[1:])
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
-    bundle_examples_to_javascript(sys.argv[1])
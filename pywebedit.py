@@ -7,6 +7,10 @@ from typing import Callable
 from browser import document, window, bind, aio, console, html
 from browser.widgets.dialog import InfoDialog, Dialog, EntryDialog
 
+# ast, gzip, hashlib and json are imported in the functions that use them:
+# they're slow to load under Brython, and the editor only needs them to save,
+# to export or as fallbacks
+
 
 BRYTHON_VERSION = '3.13.2'
 PYWEBEDIT_VERSION = '0.3.1'
@@ -69,29 +73,175 @@ def wrapscript(s):
     assert '>' in s
     return '<' + 'script' + s + '<' + '/script>'
 
+class Template:
+    """A text template with %key% placeholders, parsed once into segments.
+
+    Rendering is a single linear pass over the segments. Values are spliced
+    in as-is and never rescanned, so substituting a multi-MB value (like the
+    bundled libraries) does not slow down the placeholders after it, and
+    placeholder-like text inside a value is left alone.
+    """
+    def __init__(self, text):
+        # Alternating literal text and placeholder keys, as (is_key, text)
+        self.segments = []
+        literal_start = 0
+        i = text.find('%')
+        while i >= 0:
+            j = text.find('%', i + 1)
+            if j < 0:
+                break
+            key = text[i + 1:j]
+            if key and key.replace('_', '').isalnum():
+                if i > literal_start:
+                    self.segments.append((False, text[literal_start:i]))
+                self.segments.append((True, key))
+                literal_start = j + 1
+                i = text.find('%', literal_start)
+            else:
+                # Lone %, not a placeholder; the second % may start one
+                i = j
+        if literal_start < len(text):
+            self.segments.append((False, text[literal_start:]))
+
+    def keys(self):
+        return {text for is_key, text in self.segments if is_key}
+
+    def render_parts(self, values):
+        """Render into a list of parts. A value that is a list of parts (strings
+        or Blobs) is spliced in without being joined."""
+        parts = []
+        for is_key, text in self.segments:
+            if not is_key:
+                parts.append(text)
+                continue
+            value = values[text]
+            if isinstance(value, list):
+                parts += value
+            else:
+                parts.append(value)
+        return [part for part in parts if not isinstance(part, str) or part]
+
+    def render(self, **values):
+        """Render into a single string."""
+        return ''.join(self.render_parts(values))
+
+
+# Values for the script tag placeholders used by all templates
+SCRIPT_TAGS = {'script':    '<' + 'script',
+               'endscript': '<' + '/script>'}
+
 # A little fix to get brython to load properly when it is embedded as a script element
-SCRIPT_LOCAL_BRYTHON_SHIM = """
+SCRIPT_LOCAL_BRYTHON_SHIM = Template("""
 %script% type="text/javascript">
 globalThis.__BRYTHON__ = {};
 globalThis.__BRYTHON__.brython_path = document.location.href.substring(0, document.location.href.lastIndexOf('/') + 1);
 %endscript%
-"""
+""").render(**SCRIPT_TAGS)
+
+# Bundled libraries can be stored gzipped and base64 encoded in inert script
+# blocks of this type, rather than as data URLs
+COMPRESSED_LIBRARY_MIME = 'application/x-pwe-gzip'
+
+# Inflates the compressed library blocks above it with the native
+# DecompressionStream and runs them in order. The page's brython boot waits
+# for __pwe_libs_ready.
+LIBRARY_INFLATER = Template("""
+%script% type="text/javascript">
+globalThis.__pwe_libs_ready = (async () => {
+  for (const block of document.querySelectorAll('script[type="%mime%"]')) {
+    const text = block.textContent;
+    const bytes = Uint8Array.fromBase64 ? Uint8Array.fromBase64(text)
+                : Uint8Array.from(atob(text.replace(/\\s+/g, '')), c => c.charCodeAt(0));
+    const inflated = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    const lib = document.createElement('script');
+    lib.textContent = await new Response(inflated).text();
+    document.head.appendChild(lib);
+  }
+})();
+%endscript%
+""").render(mime=COMPRESSED_LIBRARY_MIME, **SCRIPT_TAGS)
+
+# Block of the modules an export stores compiled to JavaScript (see
+# compile_module), as JSON: the Brython build that compiled them, and for each
+# python block id, the SHA-256 of the source it was compiled from.
+COMPILED_MODULES_ID = '__pwe-compiled'
+
+# Picks out the stored compiled modules that this very Brython build compiled
+# from the source now in their python blocks, once the libraries are ready.
+# Brython's importer runs a module's precompiled code in place of compiling
+# it; the page's precode runs the main code as brython() would, minus compiling.
+COMPILED_MODULES_LOADER = Template("""
+%script% type="text/javascript">
+globalThis.__pwe_compiled = {};
+globalThis.__pwe_compiled_ready = async () => {
+  await globalThis.__pwe_libs_ready;
+  const $B = __BRYTHON__, stored = JSON.parse(document.getElementById('%id%').text);
+  if (stored.brython !== `${$B.implementation.join('.')} ${$B.compiled_date}` || !globalThis.crypto?.subtle) {
+    return;
+  }
+  for (const [id, module] of Object.entries(stored.modules)) {
+    const source = document.getElementById(id).text.slice(1, -1);
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(source));
+    const sha256 = Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+    if (sha256 !== module.sha256) {
+      continue;
+    }
+    if (id === '%main_id%') {
+      __pwe_compiled[id] = Object.assign(module, {source});
+    } else {
+      $B.precompiled[module.name] = module.js;
+    }
+  }
+};
+globalThis.__pwe_run_compiled = (id) => {
+  const module = __pwe_compiled[id], $B = __BRYTHON__;
+  if (!module) {
+    return false;
+  }
+  const script = document.getElementById(id), filename = module.filename;
+  $B.file_cache[filename] = module.source;
+  $B.url2name[filename] = module.name;
+  $B.scripts[filename] = script;
+  $B.make_import_paths(filename);
+  $B.tasks.push(['execute', {__doc__: $B.builtins.None, js: module.js, __name__: module.name,
+                             __file__: filename, script_element: script, filename}]);
+  $B.loop();
+  return true;
+};
+%endscript%
+""").render(id=COMPILED_MODULES_ID, main_id='pythoncode', **SCRIPT_TAGS)
 
 # Template for generated final page. Do not include script tags, which
 # screws up the html in python in html. Use alternate replacement
-# syntax (other than format()) to avoid syntax conflicts. Note the
-# second level of indirection when defining the fallback script tags.
-PAGE_TEMPLATE = """
+# syntax (other than format()) to avoid syntax conflicts.
+PAGE_TEMPLATE = Template("""
 <!doctype html>
 <html>
 <head>
 <meta charset="utf-8">
 
 %libraries%
+%compiled_modules%
 
 %script% type="text/javascript">
+// Registers the project's modules with Brython's importer as a virtual file
+// system, the way Brython bundles modules, so each one is only compiled and run
+// when first imported. The hash of its source stands as its timestamp, which
+// keeps Brython's cache of compiled modules from mixing up their versions.
+function __pwe_register_modules(modules) {
+  for (const [name, sha256] of modules) {
+    const source = document.getElementById('__pwe_' + name).text.slice(1, -1);
+    __BRYTHON__.update_VFS({$timestamp: sha256, [name]: ['.py', source, []]});
+  }
+}
+
 function __brython_pre_then_code() {
-  brython({debug:1, ids:["brythonpre"]});
+  const run = () => {
+    __pwe_register_modules(%modules%);
+    brython({debug:1, ids:["brythonpre"]});
+  };
+  const ready = globalThis.__pwe_compiled_ready ? __pwe_compiled_ready() : globalThis.__pwe_libs_ready;
+  ready ? ready.then(run) : run();
 }
 %endscript%
 </head>
@@ -113,21 +263,30 @@ class __ErrorReporter:
         self.errdiv.textContent += ("\\n" + msg)
 sys.stderr = __ErrorReporter()
 
+# The manifest lists each distinct asset once, with the offset of its data
+# URL in the payload block, and maps asset names to them
+__manifest = window.JSON.parse(document['__pwe-manifest'].text)
+__payload = document['__pwe-assets'].text
+__assets = {asset.sha256: __payload[asset.offset:asset.offset + asset.length]
+            for asset in __manifest.assets}
+
+def __by_name(names):
+    return {name: __assets[key] for name, key in window.Object.entries(names)}
+
 # Load sound resouces
-window.SOUNDS = %sounds%
+window.SOUNDS = __by_name(__manifest.sounds)
 
 # Load image resources
-window.IMAGES = %images%
+window.IMAGES = __by_name(__manifest.images)
 
 # Load other file resources (css, fonts, etc.) as data URLs
-window.RESOURCES = %resources%
-
-# Load modules - use runPythonSource as it is synchronous
-for module in [%modules%]:
-    __BRYTHON__.runPythonSource(document[module].text, module.replace('__pwe_', ''))
+window.RESOURCES = __by_name(__manifest.resources)
 
-# Now run main code
-window.brython({'debug': 1, 'ids': ["pythoncode"]})
+# Now run main code, which imports the modules as it needs them. Main code
+# stored compiled by this same Brython runs without compiling it again.
+__run_compiled = getattr(window, '__pwe_run_compiled', lambda block_id: False)
+if not __run_compiled('pythoncode'):
+    window.brython({'debug': 1, 'ids': ["pythoncode"]})
 %endscript%
 
 %modulescripts%
@@ -135,15 +294,24 @@ window.brython({'debug': 1, 'ids': ["pythoncode"]})
 %script% type="text/python" id="pythoncode">
 %python_code%
 %endscript%
+%script% type="application/json" id="__pwe-manifest">%manifest%%endscript%
+%script% type="text/plain" id="__pwe-assets">%asset_payload%%endscript%
 </body>
 </html>
-""".strip()
+""".strip())
 
-MODULE_TEMPLATE = """
+MODULE_TEMPLATE = Template("""
 %script% type="text/python" id="%moduleid%">
 %modulecode%
 %endscript%
-""".strip()
+""".strip())
+
+# Loads a library from its CDN, with a fallback to a local copy. Note the
+# second level of indirection when defining the fallback script tag.
+SCRIPT_LOADER_TEMPLATE = Template(
+    '%script% type="text/javascript" src="%url%" crossorigin="anonymous">%endscript%\n'
+    '%script%> typeof %var% === "undefined" && '
+    'document.write("%script% src=\\"%jslibname%\\">\\x3C/script>")%endscript%')
 
 
 # Dict of name: javascript library info tuples (desc, var, url), where:
@@ -164,6 +332,21 @@ JSLIBS = {
 }
 
 
+# Upper bound, in characters, on the memory used to keep encoded library
+# payloads around between exports. Brython + stdlib + pixi + three encode to
+# about 10M characters.
+LIBRARY_PAYLOAD_CACHE_CHARS = 32 * 1024 * 1024
+
+# Rough sizes of the libraries, in bytes, to estimate the size of an export
+# with before they have been fetched
+JSLIB_TYPICAL_SIZES = {'brython': 850_000, 'brython_stdlib': 4_700_000, 'pixi': 1_000_000,
+                       'pixi-sound': 180_000, 'three': 560_000}
+# Rough size of JavaScript once gzipped and base64 encoded, and of Python
+# compiled to JavaScript by Brython, as multiples of the source size
+COMPRESSED_SIZE_RATIO = 0.35
+PRECOMPILED_SIZE_RATIO = 6
+
+
 PYFILES = [('main', 'main'),
            (None, None),
            ('New python module', '__new'),
@@ -188,44 +371,220 @@ def strip_extension(filename):
     return filename[:filename.rindex('.')]
 
 
+def format_size(size):
+    """A size in bytes as text: '850 B', '12.3 kB' or '4.5 MB'."""
+    if size < 1024:
+        return f'{size} B'
+    if size < 1024 * 1024:
+        return f'{size / 1024:.1f} kB'
+    return f'{size / 1024 / 1024:.1f} MB'
+
+
+def base64_size(size):
+    """Length of the base64 encoding of size bytes."""
+    return (size + 2) // 3 * 4
+
+
+def find_between(s, start_token, end_token, start=0, end=None):
+    """Finds the (start, end) offsets of the string between two tokens,
+    exclusive, searching only s[start:end].
+
+    Raises error if token is not present.
+    """
+    if end is None:
+        end = len(s)
+    i_start = s.index(start_token, start, end) + len(start_token)
+    i_end = s.index(end_token, i_start, end)
+    return i_start, i_end
+
+
 def extract_between(s, start_token, end_token):
     """Extracts the string between two tokens, exclusive.
 
     Raises error if token is not present.
     """
-    i_start = s.index(start_token) + len(start_token)
-    i_end = s.index(end_token, i_start)
+    i_start, i_end = find_between(s, start_token, end_token)
     return s[i_start:i_end]
 
 
-def parse_str_str_dict(s):
+def parse_str_str_dict(s, start=0, end=None):
     """Parse a dict[str, str] encoded as a string back into a dict.
+
+    Only s[start:end] is parsed, and it isn't copied; only the keys and
+    values are.
     """
+    if end is None:
+        end = len(s)
     d = {}
-    if not s or s.isspace():
-        return d
-    for row in s.split(',\n'):
-        i_q0 = row.index("'", 0)
-        i_q1 = row.index("'", i_q0+1)
-        i_q2 = row.index("'", i_q1+1)
-        i_q3 = row.index("'", i_q2+1)
-        d[row[i_q0+1:i_q1]] = row[i_q2+1:i_q3]
+    i = start
+    while (i_q0 := s.find("'", i, end)) >= 0:
+        i_q1 = s.index("'", i_q0+1, end)
+        i_q2 = s.index("'", i_q1+1, end)
+        i_q3 = s.index("'", i_q2+1, end)
+        d[s[i_q0+1:i_q1]] = s[i_q2+1:i_q3]
+        i = i_q3 + 1
     return d
 
 
-def encode_js_for_html(js_content, chunk_size=1023):
+def content_hash(text):
+    """A cheap fingerprint of a string, for use in in-memory cache keys."""
+    return f'{len(text):x}-{hash(text) & 0xffffffffffffffff:016x}'
+
+
+class PayloadCache:
+    """Size-limited cache of encoded payloads, evicting least recently used.
+
+    Sizes are counted in characters. A payload bigger than the whole limit is
+    not cached at all.
     """
-    Encode JavaScript content to base64 data URL and format as HTML script tag.
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.size = 0
+        self.entries = {}  # key -> payload, least recently used first
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        payload = self.entries.pop(key, None)
+        if payload is not None:
+            self.entries[key] = payload  # Now the most recently used
+        return payload
+
+    def put(self, key, payload):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        if len(payload) > self.max_chars:
+            return
+        self.entries[key] = payload
+        self.size += len(payload)
+        while self.size > self.max_chars:
+            evicted = next(iter(self.entries))
+            self.size -= len(self.entries.pop(evicted))
 
-    Rationale:
-    1. Encode to UTF-8 bytes first to properly handle unicode characters
-    2. Process in chunks (multiple of 3) to work around Brython's b64encode limitations
-    3. Base64 encode each chunk separately, strip intermediate padding, concatenate
-    4. Wrap at 76 characters (RFC 2045 standard for base64 line length)
-    5. Output as ready-to-use HTML script tag with data URL
+
+async def write_parts(writable, parts):
+    """Write a list of page parts to a FileSystemWritableFileStream, in order."""
+    for part in parts:
+        await writable.write(part)
+
+
+def parts_to_blob(parts, mime='text/html'):
+    """Assemble page parts into a single native Blob without joining them."""
+    return window.Blob.new(parts, {'type': mime})
+
+
+def urlname(url):
+    return url.split('/')[-1]
+
+
+def create_script_loader(libname):
+    """Returns a script tag that loads the library, with a fallback to load a local copy."""
+    url = JSLIBS[libname][2]
+    var = JSLIBS[libname][1]
+    return SCRIPT_LOADER_TEMPLATE.render(url=url, var=var, jslibname=urlname(url), **SCRIPT_TAGS)
+
+
+## Codec utilities
+#
+# Brython's base64 module and bytes type are pure Python, so encoding and
+# decoding multi-MB payloads with them is slow. These helpers prefer the
+# browser's native paths, and fall back to pure Python where those are
+# missing (or when running under CPython for testing).
+
+def native(obj, name):
+    """The JS attribute obj.name if the browser provides it, else None."""
+    try:
+        attr = getattr(obj, name, None)
+    except Exception:
+        return None
+    return attr if attr else None
+
+
+class Pending:
+    """Work in progress, which can be awaited until done() is called.
+
+    Waits on a native Promise; where there is none (CPython tests), wait()
+    returns at once.
+    """
+
+    def __init__(self):
+        self.resolve = None
+        self.promise = None
+        if native(window, 'Promise') is not None:
+            self.promise = window.Promise.new(
+                lambda resolve, reject: setattr(self, 'resolve', resolve))
+
+    def done(self):
+        if self.resolve is not None:
+            self.resolve(True)
+
+    async def wait(self):
+        if self.promise is not None:
+            await self.promise
+
+
+class TextReader:
+    """Reads text in chunks: the text of a File or Blob as it comes off the
+    disk, where the browser has streams, else all at once; or a string."""
+
+    def __init__(self, source):
+        self.source = source
+        self.reader = None
+        self.done = False
+        stream = native(source, 'stream')
+        if stream is not None and native(window, 'TextDecoderStream') is not None:
+            self.reader = stream().pipeThrough(window.TextDecoderStream.new()).getReader()
+
+    async def read(self):
+        """The next chunk of text, or '' at the end."""
+        if self.done:
+            return ''
+        if self.reader is None:
+            self.done = True
+            return self.source if isinstance(self.source, str) else await self.source.text()
+        result = await self.reader.read()
+        if result.done:
+            self.done = True
+            return ''
+        return result.value
+
+
+def parse_json(text):
+    """Parse JSON into Python dicts and lists, with the browser's native
+    JSON.parse where there is one."""
+    js_parse = native(window.JSON, 'parse')
+    if js_parse is None:
+        import json
+        return json.loads(text)
+    return js_to_py(js_parse(text))
+
+
+def manifest_json(manifest):
+    """JSON for a manifest embedded in a script block, which mustn't contain
+    a closing tag."""
+    import json
+    return json.dumps(manifest, separators=(',', ':')).replace('<', '\\u003c')
+
+
+def js_to_py(value):
+    """Convert a JS value made of objects, arrays and primitives to Python."""
+    if window.Array.isArray(value):
+        return [js_to_py(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return {key: js_to_py(item) for key, item in window.Object.entries(value)}
+
+
+def b64encode_chunked(text, chunk_size=1023):
+    """Pure-Python base64 of the UTF-8 encoding of text.
+
+    Encodes in chunks (a multiple of 3 bytes) to work around Brython's
+    b64encode limitations, stripping intermediate padding before joining.
     """
     # Convert unicode string to UTF-8 bytes
-    utf8_bytes = js_content.encode('utf-8')
+    utf8_bytes = text.encode('utf-8')
 
     # Ensure chunk_size is multiple of 3 for proper base64 encoding
     chunk_size = chunk_size - (chunk_size % 3)
@@ -245,33 +604,154 @@ def encode_js_for_html(js_content, chunk_size=1023):
         encoded_parts.append(encoded_chunk)
 
     # Concatenate all encoded chunks
-    encoded_str = ''.join(encoded_parts)
+    return ''.join(encoded_parts)
+
+
+def b64encode_utf8(text, chunk_size=1023):
+    """Base64 of the UTF-8 encoding of text, natively if possible.
+
+    Uses TextEncoder + Uint8Array.toBase64 where available, otherwise the
+    classic btoa(unescape(encodeURIComponent(text))) UTF-8 round trip, and
+    only falls back to the chunked pure-Python encoder without either.
+    """
+    uint8array = native(window, 'Uint8Array')
+    if uint8array and native(uint8array.prototype, 'toBase64') and native(window, 'TextEncoder'):
+        return window.TextEncoder.new().encode(text).toBase64()
+    if native(window, 'btoa'):
+        return window.btoa(window.unescape(window.encodeURIComponent(text)))
+    return b64encode_chunked(text, chunk_size)
+
+
+def b64decode_utf8(b64):
+    """Decode base64 holding UTF-8 text back into a string, natively if possible."""
+    uint8array = native(window, 'Uint8Array')
+    if uint8array and native(uint8array, 'fromBase64') and native(window, 'TextDecoder'):
+        return window.TextDecoder.new('utf-8', {'fatal': True}).decode(uint8array.fromBase64(b64))
+    if native(window, 'atob'):
+        return window.decodeURIComponent(window.escape(window.atob(b64)))
+    return base64.b64decode(b64).decode('utf-8')
+
+
+def _hex_digest(digest):
+    digest_bytes = window.Uint8Array.new(digest)
+    return ''.join(f'{digest_bytes[i]:02x}' for i in range(digest_bytes.length))
+
+
+async def sha256_hex(text):
+    """Hex SHA-256 of the UTF-8 encoding of text, natively if possible."""
+    crypto = native(window, 'crypto')
+    if crypto and native(crypto, 'subtle') and native(window, 'TextEncoder'):
+        digest = await crypto.subtle.digest('SHA-256', window.TextEncoder.new().encode(text))
+        return _hex_digest(digest)
+    import hashlib
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+async def blob_sha256_hex(blob):
+    """Hex SHA-256 of the contents of a Blob, natively if possible."""
+    buffer = await blob.arrayBuffer()
+    crypto = native(window, 'crypto')
+    if crypto and native(crypto, 'subtle'):
+        return _hex_digest(await crypto.subtle.digest('SHA-256', buffer))
+    array = window.Uint8Array.new(buffer)
+    import hashlib
+    return hashlib.sha256(bytes(array[i] for i in range(array.length))).hexdigest()
+
+
+async def data_url_to_blob(data_url):
+    """Decode a data URL into a native Blob, or None where there are no Blobs."""
+    if not (native(window, 'fetch') and native(window, 'Blob')):
+        return None
+    response = await window.fetch(data_url)
+    return await response.blob()
+
+
+def data_url_payload(data_url):
+    """The base64 payload of a data URL."""
+    return data_url.split(',', 1)[1]
+
+
+async def blob_to_data_url(blob):
+    """Read a Blob (or File) as a base64 data URL with the native FileReader.
+
+    Returns None if the read fails.
+    """
+    reader = window.FileReader.new()
+    reader.readAsDataURL(blob)
+    event = await aio.event(reader, 'load', 'error')
+    if event.type == 'error':
+        return None
+    return reader.result
+
 
-    # Manually wrap at 76 characters for readability
-    col_wrap = 76
-    wrapped_lines = []
-    for i in range(0, len(encoded_str), col_wrap):
-        wrapped_lines.append(encoded_str[i:i + col_wrap])
+def encode_js_for_html(js_content, chunk_size=1023):
+    """
+    Encode JavaScript content to base64 data URL and format as HTML script tag.
+
+    Rationale:
+    1. Encode to UTF-8 and then base64, natively where the browser allows
+       (chunk_size only applies to the pure-Python fallback)
+    2. Wrap at 76 characters (RFC 2045 standard for base64 line length)
+    3. Output as ready-to-use HTML script tag with data URL
+    """
+    encoded_str = b64encode_utf8(js_content, chunk_size)
 
     # Format as HTML script tag with data URL
     script_tag = '<' + 'script' + ' src="data:text/javascript;base64,' + \
-        '\n'.join(wrapped_lines) + '"' + '></' + 'script>'
+        wrap_base64(encoded_str) + '"' + '></' + 'script>'
 
     return script_tag
 
 
-def urlname(url):
-    return url.split('/')[-1]
+def wrap_base64(encoded_str, col_wrap=76):
+    """Wrap base64 text at 76 characters (RFC 2045) for readability."""
+    return '\n'.join(encoded_str[i:i + col_wrap] for i in range(0, len(encoded_str), col_wrap))
 
 
-def create_script_loader(libname):
-    """Returns a script tag that loads the library, with a fallback to load a local copy."""
-    url = JSLIBS[libname][2]
-    var = JSLIBS[libname][1]
-    jslibname = urlname(url)
-    s = f'%script% type="text/javascript" src="{url}" crossorigin="anonymous">%endscript%\n'
-    s += f'%script%> typeof {var} === "undefined" && document.write("%script% src=\\"{jslibname}\\">\\x3C/script>")%endscript%'
-    return s
+def gzip_b64(text):
+    """gzip the UTF-8 encoding of text, and base64 encode the result.
+
+    Pure Python; see gzip_b64_native.
+    """
+    import gzip
+    return base64.b64encode(gzip.compress(text.encode('utf-8'), mtime=0)).decode('ascii')
+
+
+async def gzip_b64_native(text):
+    """gzip_b64 with the native CompressionStream and FileReader, if available."""
+    CompressionStream = native(window, 'CompressionStream')
+    if CompressionStream:
+        stream = window.Blob.new([text]).stream().pipeThrough(CompressionStream.new('gzip'))
+        data_url = await blob_to_data_url(await window.Response.new(stream).blob())
+        if data_url is not None:
+            return data_url_payload(data_url)
+    return gzip_b64(text)
+
+
+def gunzip_b64(encoded_str):
+    """Undo gzip_b64: base64 decode, gunzip, and decode the UTF-8 text.
+
+    Pure Python; see gunzip_b64_native.
+    """
+    import gzip
+    return gzip.decompress(base64.b64decode(encoded_str)).decode('utf-8')
+
+
+async def gunzip_b64_native(encoded_str):
+    """gunzip_b64 with the native DecompressionStream, if available."""
+    DecompressionStream = native(window, 'DecompressionStream')
+    if DecompressionStream:
+        blob = await data_url_to_blob('data:application/gzip;base64,' + encoded_str)
+        if blob is not None:
+            stream = blob.stream().pipeThrough(DecompressionStream.new('gzip'))
+            return await window.Response.new(stream).text()
+    return gunzip_b64(encoded_str)
+
+
+def compressed_js_for_html(libname, encoded_str):
+    """Format gzip_b64 output as an inert script block for LIBRARY_INFLATER."""
+    return (SCRIPT_TAGS['script'] + f' type="{COMPRESSED_LIBRARY_MIME}" data-lib="{libname}">\n'
+            + wrap_base64(encoded_str) + '\n' + SCRIPT_TAGS['endscript'])
 
 
 ## Brython html utilities
@@ -285,6 +765,53 @@ def add_option(select, title, value):
         select <= option
 
 
+SETTINGS_PREFIX = 'pywebedit.'
+
+
+def load_setting(name, default):
+    """A JSON value remembered in localStorage, or default if unset or unavailable."""
+    storage = native(window, 'localStorage')
+    if not storage:
+        return default
+    try:
+        value = storage.getItem(SETTINGS_PREFIX + name)
+        return default if value is None else parse_json(value)
+    except Exception:
+        return default
+
+
+def save_setting(name, value):
+    """Remember a JSON-serializable value in localStorage, if available."""
+    storage = native(window, 'localStorage')
+    if storage:
+        import json
+        try:
+            storage.setItem(SETTINGS_PREFIX + name, json.dumps(value))
+        except Exception as e:
+            console.log(f'Unable to save setting {name}: {e}')
+
+
+def served_over_http():
+    """Whether the editor was loaded over http(s), rather than from a file."""
+    location = native(window, 'location')
+    return bool(location) and str(location.protocol).startswith('http')
+
+
+def page_base_href():
+    """The URL of the directory the editor was loaded from."""
+    href = str(window.location.href).split('#')[0].split('?')[0]
+    return href[:href.rindex('/') + 1]
+
+
+def when_idle(callback):
+    """Run callback once the browser is idle (or soon, if it can't tell us)."""
+    request_idle = native(window, 'requestIdleCallback')
+    if request_idle:
+        request_idle(lambda deadline: callback())
+    else:
+        window.setTimeout(callback, 0)
+
+
 def msg(title, text, top=None, left=None):
     return InfoDialog(title, text, ok='Ok', top=top, left=left)
 
@@ -297,30 +824,25 @@ def erropen():
     return err('This browser does not support opening and saving local files. Try Chrome.')
 
 
-async def pick_file_to_open(**file_picker_args):
+async def pick_files_to_open(**file_picker_args):
+    """Show the open file picker; returns the chosen handles ([] if cancelled)."""
     try:
         args = {'id': PICKER_ID} # Use same id between pickers to save folder
         args.update(file_picker_args)
-        file_handles = await window.showOpenFilePicker(args)
-        if len(file_handles) == 0:
-            return None
+        return list(await window.showOpenFilePicker(args))
     except AttributeError:
         erropen()
-        return None
+        return []
     except JavascriptError:
         # User cancelled
-        return None
-    return file_handles[0]
+        return []
 
 
-async def read_file_as_data_url(file_handle):
-    file = await file_handle.getFile()  # Get the actual File object first
-    reader = window.FileReader.new()
-    reader.readAsDataURL(file)  # Pass the File object, not the handle
-    event = await aio.event(reader, 'load', 'error')
-    if event.type == 'error':
+async def pick_file_to_open(**file_picker_args):
+    file_handles = await pick_files_to_open(**file_picker_args)
+    if len(file_handles) == 0:
         return None
-    return reader.result # the data_url
+    return file_handles[0]
 
 
 class AwaitableDialog(Dialog):
@@ -376,6 +898,890 @@ class AwaitableEntryDialog(EntryDialog):
         document.bind("dialog_close", on_dialog_close)
 
 
+## Performance tracing
+#
+# The hot paths below are decorated with traced(), which times each call as a
+# span, when tracing is turned on in the timings panel. Spans also go to the
+# browser's performance timeline, as performance.measure entries named
+# 'pwe:<name>', and can be downloaded as a Chrome trace-event file. While
+# tracing is off, a traced call costs one extra call and an attribute check.
+
+TRACE_MAX_SPANS = 500  # Most recent spans kept
+CO_COROUTINE = 0x80    # code.co_flags bit of an async def
+
+
+class Span:
+    """One timed call. size, if set, is the number of bytes it handled."""
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.size = None
+        self.start = 0.0
+        self.duration = 0.0
+
+    def __enter__(self):
+        self.start = self.tracer.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = self.tracer.clock() - self.start
+        self.tracer.record(self)
+        return False
+
+
+class _NoSpan:
+    """Stands in for a Span while tracing is off."""
+    size = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class Tracer:
+    """Keeps the most recent spans, in ms from page load."""
+
+    def __init__(self):
+        self.performance = native(window, 'performance')
+        self.clock = self.performance.now if self.performance else (lambda: 0.0)
+        self.enabled = False
+        self.spans = []
+        self.on_span = None  # Called with each span recorded
+
+    def span(self, name):
+        """A context manager timing its block as a span called name."""
+        return Span(self, name) if self.enabled else _NoSpan()
+
+    def record(self, span):
+        self.spans.append(span)
+        if len(self.spans) > TRACE_MAX_SPANS:
+            del self.spans[:len(self.spans) - TRACE_MAX_SPANS]
+        if self.performance:
+            try:
+                self.performance.measure('pwe:' + span.name,
+                                         {'start': span.start, 'end': span.start + span.duration,
+                                          'detail': {'size': span.size}})
+            except Exception:
+                pass  # Browsers before 2020 only measure between marks
+        if self.on_span is not None:
+            self.on_span(span)
+
+    def clear(self):
+        self.spans = []
+
+    def trace_events(self):
+        """The spans as Chrome trace-event JSON, for chrome://tracing or Perfetto."""
+        events = []
+        for span in self.spans:
+            events.append({'name': span.name, 'cat': 'pywebedit', 'ph': 'X',
+                           'ts': round(span.start * 1000), 'dur': round(span.duration * 1000),
+                           'pid': 1, 'tid': 1,
+                           'args': {} if span.size is None else {'size': span.size}})
+        import json
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+
+TRACER = Tracer()
+TRACER.enabled = load_setting('tracing', False)  # Set in the timings panel
+
+
+def traced(name, size=None):
+    """Decorator timing each call of a function, or async function, as a span.
+
+    size(result, args), if given, returns the bytes the call handled, from
+    its result and positional arguments (self first, for methods).
+    """
+    def decorate(fn):
+        if fn.__code__.co_flags & CO_COROUTINE:
+            async def wrapper(*args, **kwargs):
+                if not TRACER.enabled:
+                    return await fn(*args, **kwargs)
+                with TRACER.span(name) as span:
+                    result = await fn(*args, **kwargs)
+                    if size is not None:
+                        span.size = size(result, args)
+                return result
+        else:
+            def wrapper(*args, **kwargs):
+                if not TRACER.enabled:
+                    return fn(*args, **kwargs)
+                with TRACER.span(name) as span:
+                    result = fn(*args, **kwargs)
+                    if size is not None:
+                        span.size = size(result, args)
+                return result
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorate
+
+
+def parts_size(parts):
+    """Total size of page parts: the length of strings, the size of Blobs."""
+    return sum(len(part) if isinstance(part, (str, bytes)) else part.size for part in parts)
+
+
+class TimingsDialog(Dialog):
+    """Shows the most recent spans, updated as they come in, with controls to
+    turn tracing on and off, clear the spans, and download them as a trace."""
+    ROWS = 40
+
+    def __init__(self, top=100, left=200):
+        super().__init__('Timings', ok_cancel=False, top=top, left=left)
+        container = html.DIV(style="width: 500px;")
+        enabled = html.INPUT(type="checkbox", id="trace_enabled")
+        enabled.checked = TRACER.enabled
+        enabled.bind('change', lambda evt: self.set_enabled(evt.target.checked))
+        label = html.LABEL("Record timings", style="margin-left: 8px;")
+        label.attrs['for'] = enabled.id
+        container <= html.DIV(enabled + label, style="margin-bottom: 10px;")
+        self.table = html.TABLE(style="width: 100%; border-collapse: collapse;")
+        container <= html.DIV(self.table, style="max-height: 400px; overflow-y: auto;")
+        clear_button = html.BUTTON("Clear", style="margin-top: 10px; margin-right: 5px;")
+        clear_button.bind('click', lambda evt: (TRACER.clear(), self.populate()))
+        download_button = html.BUTTON("Download trace", style="margin-top: 10px;")
+        download_button.bind('click', lambda evt: self.download())
+        container <= clear_button + download_button
+        self.panel <= container
+        self.populate()
+
+        TRACER.on_span = lambda span: self.populate()
+
+        def on_dialog_close(evt):
+            if evt.dialog == self:
+                TRACER.on_span = None
+                document.unbind('dialog_close', on_dialog_close)
+
+        document.bind('dialog_close', on_dialog_close)
+
+    def set_enabled(self, enabled):
+        TRACER.enabled = enabled
+        save_setting('tracing', enabled)
+
+    def populate(self):
+        """Show the most recent spans, newest first."""
+        self.table.clear()
+        self.table <= html.TR(html.TH("Name", style="text-align: left;")
+                              + html.TH("Time", style="text-align: right;")
+                              + html.TH("Size", style="text-align: right;"))
+        for span in reversed(TRACER.spans[-self.ROWS:]):
+            size = '' if span.size is None else f'{round(span.size / 1024, 1)} kB'
+            self.table <= html.TR(html.TD(span.name, style="padding: 2px 5px;")
+                                  + html.TD(f'{span.duration:.1f} ms',
+                                            style="padding: 2px 5px; text-align: right;")
+                                  + html.TD(size, style="padding: 2px 5px; text-align: right;"))
+
+    def download(self):
+        """Save the spans as a Chrome trace-event JSON file."""
+        blob = window.Blob.new([TRACER.trace_events()], {'type': 'application/json'})
+        url = window.URL.createObjectURL(blob)
+        link = html.A(href=url, download='pywebedit-trace.json')
+        link.click()
+        window.setTimeout(lambda: window.URL.revokeObjectURL(url), 0)
+
+
+## Library fetching
+
+# How long to wait without any progress before giving up on a source, in ms.
+# The local copy is only reachable when the editor is served over http(s),
+# and fails fast otherwise.
+LIBRARY_FETCH_TIMEOUTS = {'cdn': 20000, 'local': 5000}
+
+
+def _promise_of(coro):
+    """A native Promise settled by a coroutine run with aio.run."""
+    return window.Promise.new(
+        lambda resolve, reject: aio.run(coro, onsuccess=resolve, onerror=reject))
+
+
+async def gather(*coros):
+    """Run coroutines concurrently and return their results, in order.
+
+    Brython's aio has no gather, so this goes through native Promises.
+    """
+    return list(await window.Promise.all([_promise_of(coro) for coro in coros]))
+
+
+async def first_success(*coros):
+    """Run coroutines concurrently; the first result that is not None.
+
+    Returns None if all of them finish (or fail) without one.
+    """
+    if not coros:
+        return None
+
+    def executor(resolve, reject):
+        pending = [len(coros)]
+
+        def done(result):
+            pending[0] -= 1
+            if result is not None or pending[0] == 0:
+                resolve(result)  # Only the first call counts
+
+        for coro in coros:
+            aio.run(coro, onsuccess=done, onerror=lambda e: done(None))
+
+    return await window.Promise.new(executor)
+
+
+async def fetch_text(url, timeout_ms, controller, on_progress=None):
+    """Fetch url as text, or None on failure.
+
+    Gives up when timeout_ms passes without progress. The fetch can also be
+    cancelled through controller (an AbortController). on_progress(received,
+    total) is called as the body streams in; total is 0 if unknown.
+    """
+    timer = [None]
+
+    def restart_timer():
+        window.clearTimeout(timer[0])
+        timer[0] = window.setTimeout(lambda: controller.abort(), timeout_ms)
+
+    restart_timer()
+    try:
+        response = await window.fetch(url, {'signal': controller.signal})
+        if not response.ok:
+            return None
+        body = native(response, 'body')
+        if on_progress is None or not body:
+            return await response.text()
+        total = int(response.headers.get('Content-Length') or 0)
+        reader = body.getReader()
+        decoder = window.TextDecoder.new()
+        chunks = []
+        received = 0
+        while True:
+            result = await reader.read()
+            if result.done:
+                break
+            restart_timer()
+            received += result.value.length
+            chunks.append(decoder.decode(result.value, {'stream': True}))
+            on_progress(received, total)
+        chunks.append(decoder.decode())
+        return ''.join(chunks)
+    except Exception as e:
+        console.log(f'Unable to fetch {url}: {e}')
+        return None
+    finally:
+        window.clearTimeout(timer[0])
+
+
+def furthest_progress(on_progress):
+    """Wrap on_progress(received, total) for several sources of the same
+    download, passing on only the reports of the one furthest along, so the
+    progress shown doesn't jump between them."""
+    if on_progress is None:
+        return None
+    furthest = [0]
+
+    def report(received, total):
+        if received >= furthest[0]:
+            furthest[0] = received
+            on_progress(received, total)
+
+    return report
+
+
+async def fetch_first(sources, on_progress=None):
+    """Race several (url, timeout_ms) sources, returning the text of the first
+    to succeed (or None if all fail). The others are aborted. on_progress
+    follows whichever source is furthest along."""
+    controllers = [window.AbortController.new() for _ in sources]
+    on_progress = furthest_progress(on_progress)
+    text = await first_success(*[fetch_text(url, timeout_ms, controller, on_progress)
+                                 for (url, timeout_ms), controller in zip(sources, controllers)])
+    for controller in controllers:
+        controller.abort()
+    return text
+
+
+def match_library_files(libnames, filenames):
+    """Match picked files to the libraries they are local copies of.
+
+    Returns {libname: index into filenames}, matching on the file name from
+    the library's URL (case-insensitively, ignoring browser-added ' (1)'
+    style suffixes).
+    """
+    def normalized(filename):
+        stem, dot, ext = filename.lower().rpartition('.')
+        if stem.endswith(')') and ' (' in stem:
+            stem = stem[:stem.rindex(' (')]
+        return stem + dot + ext
+
+    matches = {}
+    for libname in libnames:
+        wanted = urlname(JSLIBS[libname][2]).lower()
+        for i, filename in enumerate(filenames):
+            if normalized(filename) == wanted and i not in matches.values():
+                matches[libname] = i
+                break
+    return matches
+
+
+class LibraryProgressDialog(Dialog):
+    """Shows download progress for each library being fetched."""
+    def __init__(self, libnames, top=100, left=200):
+        super().__init__('Getting libraries...', ok_cancel=False, top=top, left=left)
+        self.bars = {}
+        self.labels = {}
+        table = html.TABLE(style="width: 400px;")
+        for libname in libnames:
+            self.bars[libname] = html.PROGRESS(style="width: 200px;")
+            self.labels[libname] = html.TD('waiting', style="text-align: right;")
+            table <= html.TR(html.TD(libname) + html.TD(self.bars[libname]) + self.labels[libname])
+        self.panel <= table
+
+    def update(self, libname, received, total):
+        if total:
+            self.bars[libname].max = total
+            self.bars[libname].value = min(received, total)
+        self.labels[libname].textContent = f'{round(received / 1024)} kB'
+
+    def finish(self, libname, ok):
+        self.bars[libname].max = 1
+        self.bars[libname].value = 1 if ok else 0
+        self.labels[libname].textContent = 'done' if ok else 'not found'
+
+
+## Examples
+
+# Global object that the file of each example (see examples.py) adds the
+# example to, gzipped and base64 encoded, by id
+EXAMPLE_PAYLOADS = 'EXAMPLES_PAYLOADS'
+
+
+def example_index():
+    """Dict of example id to its entry in the index loaded by examples.js:
+    its title ('help'), size, and the file ('src') holding it."""
+    # global variable window.EXAMPLES_INDEX is defined in examples.js
+    return {example['id']: example
+            for category in window.EXAMPLES_INDEX for example in category['examples']}
+
+
+async def load_script(src):
+    """Run the script at src by adding a script element for it, which works
+    even when the editor is opened from a file. Returns whether it loaded."""
+    script = document.createElement('script')
+
+    def executor(resolve, reject):
+        script.bind('load', lambda evt: resolve(True))
+        script.bind('error', lambda evt: resolve(False))
+
+    loaded = window.Promise.new(executor)
+    script.src = src
+    document.head <= script
+    ok = await loaded
+    script.remove()
+    return ok
+
+
+async def load_example_html(example):
+    """The html of an example, loaded from its file, or None on failure."""
+    if not await load_script(example['src']):
+        return None
+    payloads = getattr(window, EXAMPLE_PAYLOADS)
+    encoded = payloads[example['id']]
+    window.Reflect.deleteProperty(payloads, example['id'])  # Only needed once decoded
+    return await gunzip_b64_native(encoded)
+
+
+## Persistent library store
+
+class LibraryStore:
+    """Keeps fetched JSLIBS libraries across editor sessions.
+
+    Uses Cache Storage when the editor is served over http(s), and IndexedDB
+    otherwise (file:// pages can't use Cache Storage). Entries are keyed by
+    the library URL in JSLIBS, which includes its version, and store the
+    SHA-256 of their contents, which is checked on every read. Without
+    either backend, reads miss and writes are dropped.
+    """
+    CACHE_NAME = 'pywebedit-libraries'
+    DB_NAME = 'pywebedit'
+    DB_STORE = 'libraries'
+    DIGEST_HEADER = 'X-Pywebedit-Sha256'
+
+    def __init__(self):
+        self.db = None
+        self.backend = None
+        if served_over_http() and native(window, 'caches'):
+            self.backend = 'cache'
+        elif native(window, 'indexedDB'):
+            self.backend = 'indexeddb'
+
+    async def get(self, libname):
+        """The stored contents of a library, or None if missing or corrupt."""
+        url = JSLIBS[libname][2]
+        try:
+            entry = await self._read(url)
+            if entry is None:
+                return None
+            text, digest = entry
+            if digest != await sha256_hex(text):
+                console.log(f'Stored copy of {libname} is corrupt; discarding it')
+                await self._delete(url)
+                return None
+            return text
+        except Exception as e:
+            console.log(f'Unable to read stored {libname}: {e}')
+            return None
+
+    async def put(self, libname, text):
+        url = JSLIBS[libname][2]
+        try:
+            await self._write(url, text, await sha256_hex(text))
+        except Exception as e:
+            console.log(f'Unable to store {libname}: {e}')
+
+    async def _read(self, url):
+        if self.backend == 'cache':
+            cache = await window.caches.open(self.CACHE_NAME)
+            response = await cache.match(url)
+            if not response:
+                return None
+            return await response.text(), response.headers.get(self.DIGEST_HEADER)
+        if self.backend == 'indexeddb':
+            request = (await self._open_db()).transaction(self.DB_STORE).objectStore(self.DB_STORE).get(url)
+            await self._wait(request, 'success')
+            record = request.result
+            if not record:
+                return None
+            return record.text, record.sha256
+        return None
+
+    async def _write(self, url, text, digest):
+        if self.backend == 'cache':
+            cache = await window.caches.open(self.CACHE_NAME)
+            await cache.put(url, window.Response.new(
+                text, {'headers': {'Content-Type': 'text/javascript',
+                                   self.DIGEST_HEADER: digest}}))
+        elif self.backend == 'indexeddb':
+            transaction = (await self._open_db()).transaction(self.DB_STORE, 'readwrite')
+            transaction.objectStore(self.DB_STORE).put({'text': text, 'sha256': digest}, url)
+            await self._wait(transaction, 'complete')
+
+    async def _delete(self, url):
+        if self.backend == 'cache':
+            cache = await window.caches.open(self.CACHE_NAME)
+            await cache.delete(url)
+        elif self.backend == 'indexeddb':
+            transaction = (await self._open_db()).transaction(self.DB_STORE, 'readwrite')
+            transaction.objectStore(self.DB_STORE).delete(url)
+            await self._wait(transaction, 'complete')
+
+    async def _open_db(self):
+        if self.db is None:
+            request = window.indexedDB.open(self.DB_NAME, 1)
+
+            def on_upgrade(evt):
+                request.result.createObjectStore(self.DB_STORE)
+
+            request.addEventListener('upgradeneeded', on_upgrade)
+            await self._wait(request, 'success')
+            self.db = request.result
+        return self.db
+
+    async def _wait(self, target, success):
+        event = await aio.event(target, success, 'error')
+        if event.type == 'error':
+            raise IOError(f'IndexedDB request failed: {target.error}')
+
+
+## Stdlib tree-shaking
+
+# brython_stdlib.js is a virtual file system (VFS): a JSON object of module name
+# to [extension, source, imports, is_package], with the imports already
+# resolved to absolute module names (.js modules have none).
+STDLIB_VFS_START = 'var scripts = '
+STDLIB_VFS_END = '__BRYTHON__.update_VFS(scripts)'
+
+# Modules the exported page needs beyond what the user's code imports: the
+# error reporter's sys and the traceback it prints through, plus modules the
+# Brython runtime imports on its own.
+STDLIB_RUNTIME_MODULES = ['sys', 'traceback', 'browser', 'encodings', 'encodings.utf_8',
+                          '_aio', '_typing', 'typing', 'copyreg']
+
+
+def parse_stdlib_vfs(stdlib_js):
+    """Split brython_stdlib.js into (prefix, modules dict, suffix)."""
+    start = stdlib_js.index(STDLIB_VFS_START) + len(STDLIB_VFS_START)
+    end = stdlib_js.rindex(STDLIB_VFS_END)
+    import json
+    scripts = json.loads(stdlib_js[start:end].strip().rstrip(';'))
+    return stdlib_js[:start], scripts, '\n' + stdlib_js[end:]
+
+
+def python_imports(code):
+    """Names of the modules a piece of python code may import.
+
+    An over-approximation: every import statement counts, wherever it is,
+    and for "from a import b" both a and a.b are included. Calls to
+    __import__ or import_module with a literal name count too. Returns None
+    if the code cannot be parsed, as its imports are then unknown.
+    """
+    import ast
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or not node.module:
+                continue
+            names.add(node.module)
+            names.update(f'{node.module}.{alias.name}' for alias in node.names)
+        elif isinstance(node, ast.Call) and node.args:
+            func = getattr(node.func, 'id', None) or getattr(node.func, 'attr', None)
+            arg = node.args[0]
+            if (func in ('__import__', 'import_module')
+                    and isinstance(arg, ast.Constant) and isinstance(arg.value, str)):
+                names.add(arg.value)
+    return names
+
+
+def stdlib_closure(scripts, roots):
+    """All the VFS modules reachable from the given module names.
+
+    Follows each module's imports and includes the parent packages of every
+    module. Names not in the VFS (user modules, modules built into brython.js)
+    are skipped.
+    """
+    reachable = set()
+    pending = list(roots)
+    while pending:
+        name = pending.pop()
+        parts = name.split('.')
+        pending += ['.'.join(parts[:i]) for i in range(1, len(parts))]
+        if name in reachable or name not in scripts:
+            continue
+        reachable.add(name)
+        entry = scripts[name]
+        if len(entry) > 2:
+            pending += entry[2]
+    return reachable
+
+
+def stdlib_subset_js(stdlib_js, python_sources):
+    """A brython_stdlib.js with only the modules the given python code can reach.
+
+    Returns (js, module count, total module count); js is the full stdlib if
+    any of the sources cannot be parsed.
+    """
+    prefix, scripts, suffix = parse_stdlib_vfs(stdlib_js)
+    total = sum(1 for name in scripts if not name.startswith('$'))
+    roots = list(STDLIB_RUNTIME_MODULES)
+    for code in python_sources:
+        names = python_imports(code)
+        if names is None:
+            return stdlib_js, total, total
+        roots += names
+    keep = stdlib_closure(scripts, roots)
+    subset = {name: entry for name, entry in scripts.items()
+              if name in keep or name.startswith('$')}
+    import json
+    return prefix + json.dumps(subset, separators=(',', ':')) + suffix, len(keep), total
+
+
+## Saved page parsing
+
+# Version of the saved page layout. Version 2 keeps the assets in a JSON
+# manifest and a payload block, rather than in python dict literals.
+PAGE_FORMAT_VERSION = 2
+
+# Markers of the structure of a page made from PAGE_TEMPLATE
+PAGE_BODY_START = '<body onload="__brython_pre_then_code()">'
+PYTHON_SCRIPT_START = '<' + 'script type="text/python" id="'
+PRECODE_START = PYTHON_SCRIPT_START + 'brythonpre">'
+MANIFEST_START = '<' + 'script type="application/json" id="__pwe-manifest">'
+PAYLOAD_START = '<' + 'script type="text/plain" id="__pwe-assets">'
+SCRIPT_END = '<' + '/script>'
+MODULE_ID_PREFIX = '__pwe_'
+MAIN_ID = 'pythoncode'
+
+
+@dataclass
+class PageLayout:
+    """Where the parts of a saved page are, as (start, end) offsets into it."""
+    body: tuple[int, int]
+    precode: tuple[int, int]
+    modules: dict[str, tuple[int, int]]  # Module name -> its code; main first
+    manifest: tuple[int, int] | None = None  # The asset manifest, since version 2
+    payload: tuple[int, int] | None = None   # The asset payload block it points into
+
+
+def _after_newline(page, i):
+    """Offset past the line break at page[i], if there is one."""
+    if page.startswith('\r\n', i):
+        return i + 2
+    return i + 1 if page.startswith('\n', i) else i
+
+
+def _before_newline(page, i):
+    """Offset of the line break ending at page[i], if there is one."""
+    if page.startswith('\r\n', i - 2):
+        return i - 2
+    return i - 1 if page.startswith('\n', i - 1) else i
+
+
+def _block_after(page, i, end, tag):
+    """Offset just past tag, if it follows whitespace from page[i]; else -1."""
+    while i < end and page[i].isspace():
+        i += 1
+    return i + len(tag) if page.startswith(tag, i, end) else -1
+
+
+def _python_block_id(page, i, end):
+    """The id of the python script block whose tag follows whitespace from
+    page[i], and the offset just past the tag; or (None, -1)."""
+    i = _block_after(page, i, end, PYTHON_SCRIPT_START)
+    if i < 0:
+        return None, -1
+    i_end = page.find('">', i, end)
+    if i_end < 0:
+        return None, -1
+    return page[i:i_end], i_end + 2
+
+
+def scan_page(page, end=None):
+    """Find the body, precode and python modules of a saved page, or of
+    page[:end], without copying any of it.
+
+    The libraries in the head and the precode are written by pywebedit, and
+    python blocks can't contain a closing script tag, but the html body can
+    contain anything. So the body start is found from the top, then the
+    python blocks are found working back from the end, each ending at the
+    closing tag before the next, until the precode. Whatever is between is
+    the body. Each part of the page is searched at most twice. Pages saved
+    since version 2 end with the asset manifest and payload blocks, which
+    are written by pywebedit too.
+
+    Raises ValueError if the page isn't laid out like PAGE_TEMPLATE.
+    """
+    if end is None:
+        end = len(page)
+    body_start = page.index(PAGE_BODY_START, 0, end) + len(PAGE_BODY_START)
+    body_start = _after_newline(page, body_start)
+    block_end = page.rindex(SCRIPT_END, body_start, end)
+    tail = {}
+    for name, tag in (('payload', PAYLOAD_START), ('manifest', MANIFEST_START)):
+        prev_end = page.rfind(SCRIPT_END, body_start, block_end)
+        start = -1 if prev_end < 0 else _block_after(page, prev_end + len(SCRIPT_END), block_end, tag)
+        if start < 0:
+            continue
+        tail[name] = (start, block_end)
+        block_end = prev_end
+    if 'payload' in tail and 'manifest' not in tail:
+        raise ValueError('Asset payload without a manifest')
+    blocks = []  # (name, (start, end)), last first
+    while True:
+        prev_end = page.rfind(SCRIPT_END, body_start, block_end)
+        if prev_end < 0:
+            break
+        block_id, code_start = _python_block_id(page, prev_end + len(SCRIPT_END), block_end)
+        # Blocks other than the precode start right after the one before
+        if not blocks and block_id == MAIN_ID:
+            name = 'main'
+        elif blocks and block_id is not None and block_id.startswith(MODULE_ID_PREFIX):
+            name = block_id[len(MODULE_ID_PREFIX):]
+        else:
+            break
+        blocks.append((name, (_after_newline(page, code_start), _before_newline(page, block_end))))
+        block_end = prev_end
+    if not blocks:
+        raise ValueError('No main python block')
+    precode_start = page.rindex(PRECODE_START, body_start, block_end)
+    main, *modules = blocks
+    return PageLayout(body=(body_start, _before_newline(page, precode_start)),
+                      precode=(precode_start + len(PRECODE_START), block_end),
+                      modules=dict([main, *reversed(modules)]),
+                      **tail)
+
+
+def scan_page_code(page, search_from=0):
+    """Scan a page that is still being read, as far as its asset manifest.
+
+    Returns the layout of the page up to the end of the manifest, once it
+    has been read, else None; and the offset to search on from next time.
+    Pages saved before version 2 have no manifest, so need reading to the
+    end before they can be scanned.
+    """
+    while True:
+        i = page.find(MANIFEST_START, search_from)
+        if i < 0:
+            return None, max(search_from, len(page) - len(MANIFEST_START) + 1)
+        j = page.find(SCRIPT_END, i)
+        if j < 0:
+            return None, i
+        try:
+            return scan_page(page, j + len(SCRIPT_END)), i
+        except ValueError:
+            search_from = i + 1  # The tag was text in the body
+
+
+def page_code(page, layout):
+    """The html body and the dict of python modules of a scanned page."""
+    body = page[layout.body[0]:layout.body[1]]
+    modules = {name: page[start:end] for name, (start, end) in layout.modules.items()}
+    return body, modules
+
+
+## Module precompiling
+
+@dataclass
+class CompiledModule:
+    """A module compiled to JavaScript by Brython, and what it was compiled from."""
+    sha256: str   # Of the module source
+    brython: str  # The Brython build, from brython_build()
+    js: str
+
+
+def brython_build():
+    """Names the running Brython build, or None if there is no Brython to
+    compile with. Code it compiles only runs on this same build."""
+    brython = native(window, '__BRYTHON__')
+    if brython is None or native(brython, 'py2js') is None:
+        return None
+    return f"{'.'.join(str(part) for part in brython.implementation)} {brython.compiled_date}"
+
+
+def module_script_names(name):
+    """The python block id, Brython module name and file name for a module."""
+    if name == 'main':
+        return MAIN_ID, MAIN_ID, 'main.py'
+    return MODULE_ID_PREFIX + name, name, f'{name}.py'
+
+
+def compile_module(name, source):
+    """Compile a module to JavaScript with the running Brython, as Brython does
+    before it runs a module. Raises SyntaxError if the source doesn't compile."""
+    _, module_name, filename = module_script_names(name)
+    brython = window.__BRYTHON__
+    brython.url2name[filename] = module_name
+    return brython.py2js({'src': source, 'filename': filename}, module_name, module_name).to_js()
+
+
+def source_sha256(source):
+    """Hex SHA-256 of a module source, as the page checks it before running
+    the module precompiled."""
+    import hashlib
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+## Asset store
+
+class AssetStore:
+    """Content-addressed store of asset data, keyed by the SHA-256 of its bytes.
+
+    Each distinct asset is kept once, however many sounds, images or
+    resources refer to it. Where the browser has Blobs, the data is kept as
+    a native Blob, previewed through an object URL, and only base64 encoded
+    when a page is written. Otherwise it is kept as a data URL.
+    """
+    def __init__(self):
+        self.entries = {}      # key -> Blob, or data URL
+        self.object_urls = {}  # key -> object URL of a Blob entry
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    async def add_blob(self, blob):
+        """Store a Blob (or File), if not already stored, and return its key."""
+        key = await blob_sha256_hex(blob)
+        self.entries.setdefault(key, blob)
+        return key
+
+    async def add_data_url(self, data_url, key=None):
+        """Store the data in a data URL, as a Blob if possible, and return its key.
+
+        key is the SHA-256 of the data, if already known, to save hashing it.
+        """
+        if key in self.entries:
+            return key
+        blob = await data_url_to_blob(data_url)
+        if blob is not None:
+            if key is None:
+                return await self.add_blob(blob)
+            self.entries[key] = blob
+            return key
+        if key is None:
+            import hashlib
+            key = hashlib.sha256(base64.b64decode(data_url_payload(data_url))).hexdigest()
+        self.entries.setdefault(key, data_url)
+        return key
+
+    @traced('asset_add', size=lambda key, args: args[0].size(key))
+    async def add(self, data):
+        """Store a Blob or a data URL, and return its key."""
+        if isinstance(data, str):
+            return await self.add_data_url(data)
+        return await self.add_blob(data)
+
+    def url(self, key):
+        """A URL to preview an asset with, valid while the asset is stored."""
+        entry = self.entries.get(key)
+        if entry is None or isinstance(entry, str):
+            return entry
+        if key not in self.object_urls:
+            self.object_urls[key] = window.URL.createObjectURL(entry)
+        return self.object_urls[key]
+
+    def size(self, key):
+        """Size of an asset in bytes."""
+        entry = self.entries[key]
+        if isinstance(entry, str):
+            payload = data_url_payload(entry)
+            return len(payload) * 3 // 4 - (len(payload) - len(payload.rstrip('=')))
+        return entry.size
+
+    def mime(self, key):
+        """The MIME type of an asset, or '' if unknown."""
+        entry = self.entries.get(key)
+        if entry is None or isinstance(entry, str):
+            return resource_mime(entry)
+        return entry.type
+
+    async def text(self, key):
+        """The contents of an asset, decoded as UTF-8."""
+        entry = self.entries[key]
+        if isinstance(entry, str):
+            return b64decode_utf8(data_url_payload(entry))
+        return await entry.text()
+
+    def stored_data_urls(self, keys):
+        """Dict of key to data URL, for assets stored as data URLs. Raises
+        ValueError for a Blob, which needs encoding first (see data_urls)."""
+        urls = {}
+        for key in keys:
+            entry = self.entries[key]
+            if not isinstance(entry, str):
+                raise ValueError(f'Asset {key} is a Blob; encode it with data_urls')
+            urls[key] = entry
+        return urls
+
+    async def data_urls(self, keys):
+        """Dict of key to base64 data URL, encoding Blobs with the native FileReader."""
+        urls = {}
+        for key in keys:
+            entry = self.entries[key]
+            urls[key] = entry if isinstance(entry, str) else await blob_to_data_url(entry)
+        return urls
+
+    def prune(self, live_keys):
+        """Drop every asset whose key is not in live_keys, revoking its object URL."""
+        for key in [key for key in self.entries if key not in live_keys]:
+            del self.entries[key]
+            object_url = self.object_urls.pop(key, None)
+            if object_url is not None:
+                window.URL.revokeObjectURL(object_url)
+
+
 ## UI workflow fragment utilities
 
 async def rename_asset(initial_name: str,
@@ -472,20 +1878,35 @@ class ViewInfo:
     cursor_head: int
 
 
+@dataclass
+class ExportOptions:
+    """How to bundle libraries when exporting html."""
+    stdlib_subset: bool = False  # Only bundle the stdlib modules the project can import
+    compress: bool = False       # Bundle libraries gzipped, to be inflated on page load
+    precompile: bool = False     # Store the modules compiled to JavaScript, to skip compiling on load
+    size_budget_mb: float = 5.0  # Warn when an export is bigger than this (0: never)
+
+
 class UI:
     def __init__(self, app):
         self.app = app
         self.app_window = None
+        self.app_url = None  # Object URL of the page shown in app_window
+        self.loaded_file = None  # Name shown in the title bar
+        self.modified = False  # Whether the title bar shows the project as modified
+        self._setting_contents = False  # Editor changes made by code, not by typing
+        on_update = window.EditorView.updateListener.of(self._on_editor_update)
         self.html_editor = window.EditorView(
             {'parent': document['html_editor'],
-             'extensions': [window.basicSetup,
-                            window.html(),
+             'extensions': [window.editorSetup,
+                            window.html(),  # Loads the HTML mode when first used
                             window.indentUnit.of('    '),
-                            window.keymap.of([window.indentWithTab])]})
+                            window.keymap.of([window.indentWithTab]),
+                            on_update]})
         self.python_editor = window.EditorView(
             {'parent': document['python_editor'],
              'extensions': [
-                 window.basicSetup,
+                 window.editorSetup,
                  window.python(),
                  window.indentUnit.of('    '),
                  window.keymap.of(
@@ -493,7 +1914,8 @@ class UI:
                       {'key': 'Alt-j', 'preventDefault': True,
                        'run': lambda e: self.incr_module(-1)},
                       {'key': 'Alt-l', 'preventDefault': True,
-                       'run': lambda e: self.incr_module(+1)}])]})
+                       'run': lambda e: self.incr_module(+1)}]),
+                 on_update]})
 
         self._init_examples()
         self._init_pyfiles()
@@ -507,16 +1929,23 @@ class UI:
         document['examples'].bind('change', self.on_example_select)
         document['pyfiles'].bind('change', self.on_pyfiles_select)
         document['btnhelp'].bind('click', self.on_help)
+        document['btntimings'].bind('click', lambda e: TimingsDialog())
         window.addEventListener('beforeunload', self._close_app_window)
 
     def _close_app_window(self, evt):
+        self._revoke_app_url()
         return self.app_window.close() if self.app_window else None
 
+    def _revoke_app_url(self):
+        if self.app_url is not None:
+            window.URL.revokeObjectURL(self.app_url)
+            self.app_url = None
+
     def _init_examples(self):
         select = document['examples']
         add_option(select, 'Load example...', '')
-        # global variable window.EXAMPLES_DATA is defined in examples.js
-        for category in window.EXAMPLES_DATA:
+        # global variable window.EXAMPLES_INDEX is defined in examples.js
+        for category in window.EXAMPLES_INDEX:
             group = html.OPTGROUP()
             group.attrs['label'] = category['category']
             for example in category['examples']:
@@ -532,7 +1961,10 @@ class UI:
         # Pass through application layer first
         self.app.run(self.contents_html(), self.contents_python())
 
-    def run_html_in_new_window(self, html):
+    def run_html_in_new_window(self, page_parts):
+        """Open a new window right away (while handling the click, so it is not
+        blocked as a popup), then show the page in it once page_parts, an
+        awaitable list of page parts, is ready."""
         try:
             if self.app_window:
                 self.app_window.close()
@@ -542,8 +1974,7 @@ class UI:
             pass
 
         self.app_window = window.open()
-        self.app_window.document.write(html)
-        self.app_window.document.close()
+        aio.run(self._show_in_app_window(self.app_window, page_parts))
 
         # Download to a file - user has to click on it, but works
         # blob = window.Blob.new([build_html()], {'type': 'text/html' })
@@ -552,6 +1983,20 @@ class UI:
         # a.download = 'generated.html'
         # a.click()
 
+    @traced('run')
+    async def _show_in_app_window(self, app_window, page_parts):
+        """Navigate to the page as a Blob URL. Pages from a file:// editor get
+        an opaque origin that such a URL can't be opened from, so they are
+        written in instead."""
+        parts = await page_parts
+        if served_over_http():
+            self._revoke_app_url()
+            self.app_url = window.URL.createObjectURL(parts_to_blob(parts))
+            app_window.location.replace(self.app_url)
+        else:
+            app_window.document.write(''.join(parts))
+            app_window.document.close()
+
     def on_open_precheck(self, evt):
         self.warn_if_modified(onok=self.on_open())
 
@@ -562,7 +2007,8 @@ class UI:
             return
         await self.app.open_file(file_handle)
 
-    async def on_save(self, force_picker=False, libs_to_bundle=None):
+    async def on_save(self, force_picker=False, libs_to_bundle=None, options=None):
+        """Save, picking a file if needed. Returns True if the file was written."""
         handle = self.app.file_handle
         if force_picker or not self.app.has_file():
             name = 'myprogram.html'
@@ -576,13 +2022,14 @@ class UI:
                               'accept': {'text/html': ['.html']}}]})
             except AttributeError:
                 erropen()
-                return
+                return False
             except JavascriptError:
                 # User cancelled
-                return
+                return False
         await self.app.save_file(handle, self.contents_html(),
                                  self.contents_python(), self.viewinfo_python(),
-                                 libs_to_bundle=libs_to_bundle)
+                                 libs_to_bundle=libs_to_bundle, options=options)
+        return True
 
     async def on_save_as(self):
         await self.on_save(force_picker=True)
@@ -693,6 +2140,11 @@ class UI:
         if hasattr(self, 'resources_dialog') and self.resources_dialog:
             self.resources_dialog.populate_table()
 
+    def update_asset_dialogs(self):
+        self.update_sound_dialog()
+        self.update_image_dialog()
+        self.update_resource_dialog()
+
     def _current_module_index(self):
         modnames = list(self.app.modules.keys())
         i_name = modnames.index(self.app.active_module)
@@ -714,7 +2166,7 @@ class UI:
         return msg('Help', HELP, top=100, left=200)
 
     def warn_if_modified(self, onok):
-        if self.app.anything_modified(self.contents_html(), self.contents_python()):
+        if self.app.anything_modified():
             d = Dialog('Warning...', ok_cancel=('Proceed', 'Cancel'))
             d.panel <= html.DIV('Code changes will be lost. Proceed anyway? '
                                 'Or, cancel (so you can then save first)?')
@@ -778,13 +2230,41 @@ class UI:
                         cursor_head=self.python_editor.state.selection.main.head)
 
     def set_loaded_file(self, file_name):
-        document.getElementById('filename').innerHTML = f'&lt;pywebedit&gt; {file_name}'
-        document.title = f'<pywebedit> {file_name}'
+        self.loaded_file = file_name
+        self._show_title()
+
+    def set_modified(self, modified):
+        """Mark the project as modified (or not) in the title bar."""
+        if modified != self.modified:
+            self.modified = modified
+            self._show_title()
+
+    def _show_title(self):
+        title = '<pywebedit>'
+        if self.loaded_file is not None:
+            title += f' {self.loaded_file}'
+        if self.modified:
+            title += ' (modified)'
+        document.getElementById('filename').textContent = title
+        document.title = title
+
+    def _on_editor_update(self, update):
+        # Typing in either editor modifies the project; setting the contents doesn't
+        if update.docChanged and not self._setting_contents:
+            self.app.touch()
+
+    def _dispatch_contents(self, editor, transaction):
+        self._setting_contents = True
+        try:
+            editor.dispatch(transaction)
+        finally:
+            self._setting_contents = False
 
     def set_contents_html(self, code):
-        self.html_editor.dispatch({'changes': {'from': 0,
-                                               'to': self.html_editor.state.doc.length,
-                                               'insert': code}})
+        self._dispatch_contents(self.html_editor,
+                                {'changes': {'from': 0,
+                                             'to': self.html_editor.state.doc.length,
+                                             'insert': code}})
 
     def set_contents_python(self, code, viewinfo=None):
         transaction = {'changes': {'from': 0,
@@ -793,7 +2273,7 @@ class UI:
         if viewinfo is not None:
             transaction['selection'] = {'anchor': viewinfo.cursor_anchor,
                                         'head': viewinfo.cursor_head}
-        self.python_editor.dispatch(transaction)
+        self._dispatch_contents(self.python_editor, transaction)
 
         if viewinfo is not None:
               self.python_editor.scrollDOM.scrollTop = viewinfo.scrolltop
@@ -852,7 +2332,7 @@ class UI:
             lib_div = html.DIV(style="margin-bottom: 10px; display: flex; align-items: center;")
 
             checkbox = html.INPUT(type="checkbox", id=f"lib_{lib_name.replace('.', '_')}")
-            # TODO: remember the ones that have been checked
+            checkbox.checked = lib_name in self.app.export_libs
 
             label_text = f"{lib_name} - {desc}"
             label = html.LABEL(label_text, style="margin-left: 8px; flex: 1;")
@@ -863,42 +2343,141 @@ class UI:
 
             checkboxes[lib_name] = checkbox             # Store the checkbox reference
 
+        subset_div = html.DIV(style="margin-top: 15px; display: flex; align-items: center;")
+        subset_checkbox = html.INPUT(type="checkbox", id="export_stdlib_subset")
+        subset_checkbox.checked = self.app.export_options.stdlib_subset
+        subset_label = html.LABEL("Only bundle the stdlib modules this project imports "
+                                  "(smaller file, but modules imported by computed name will be missing)",
+                                  style="margin-left: 8px; flex: 1;")
+        subset_label.attrs["for"] = subset_checkbox.id
+        subset_div <= subset_checkbox + subset_label
+        container <= subset_div
+
+        compress_div = html.DIV(style="margin-top: 10px; display: flex; align-items: center;")
+        compress_checkbox = html.INPUT(type="checkbox", id="export_compress")
+        compress_checkbox.checked = self.app.export_options.compress
+        compress_label = html.LABEL("Compress bundled libraries "
+                                    "(several times smaller, but needs a browser from 2023 or later)",
+                                    style="margin-left: 8px; flex: 1;")
+        compress_label.attrs["for"] = compress_checkbox.id
+        compress_div <= compress_checkbox + compress_label
+        container <= compress_div
+
+        precompile_div = html.DIV(style="margin-top: 10px; display: flex; align-items: center;")
+        precompile_checkbox = html.INPUT(type="checkbox", id="export_precompile")
+        precompile_checkbox.checked = self.app.export_options.precompile
+        precompile_label = html.LABEL("Store the Python compiled to JavaScript "
+                                      "(opens faster, but the file is larger)",
+                                      style="margin-left: 8px; flex: 1;")
+        precompile_label.attrs["for"] = precompile_checkbox.id
+        precompile_div <= precompile_checkbox + precompile_label
+        container <= precompile_div
+
+        budget_div = html.DIV(style="margin-top: 10px; display: flex; align-items: center;")
+        budget_input = html.INPUT(type="number", id="export_size_budget", min="0", step="1",
+                                  value=str(self.app.export_options.size_budget_mb),
+                                  style="width: 5em;")
+        budget_label = html.LABEL("Warn when the file is over", style="margin-right: 8px;")
+        budget_label.attrs["for"] = budget_input.id
+        budget_div <= budget_label + budget_input + html.SPAN("MB (0 for never)",
+                                                              style="margin-left: 8px;")
+        container <= budget_div
+
+        sizes = html.DIV(style="margin-top: 15px;")
+        container <= sizes
+
+        def selected_export():
+            selected_libs = [lib_name for lib_name, checkbox in checkboxes.items()
+                             if checkbox.checked]
+            try:
+                budget = max(0.0, float(budget_input.value))
+            except ValueError:
+                budget = self.app.export_options.size_budget_mb
+            options = ExportOptions(stdlib_subset=subset_checkbox.checked,
+                                    compress=compress_checkbox.checked,
+                                    precompile=precompile_checkbox.checked,
+                                    size_budget_mb=budget)
+            return selected_libs, options
+
+        def update_sizes(evt=None):
+            """Show the estimated size of each part of the export."""
+            selected_libs, options = selected_export()
+            estimate = self.app.export_size_estimate(selected_libs, options)
+            total = sum(size for _, size, _ in estimate)
+            approximate = not all(exact for _, _, exact in estimate)
+            table = html.TABLE(style="width: 100%; border-collapse: collapse;")
+            for label, size, exact in sorted(estimate, key=lambda part: -part[1]):
+                table <= html.TR(html.TD(label, style="padding: 1px 5px;")
+                                 + html.TD(('' if exact else '~') + format_size(size),
+                                           style="padding: 1px 5px; text-align: right;"))
+            table <= html.TR(html.TH("Total", style="padding: 1px 5px; text-align: left;")
+                             + html.TH(('~' if approximate else '') + format_size(total),
+                                       style="padding: 1px 5px; text-align: right;"))
+            sizes.clear()
+            sizes <= html.DIV(table, style="max-height: 180px; overflow-y: auto;")
+            if options.size_budget_mb and total > options.size_budget_mb * 1024 * 1024:
+                sizes <= html.P(f"Over the {options.size_budget_mb:g} MB budget: "
+                                "leave out the libraries this project doesn't use.",
+                                style="color: #b00; margin-top: 5px;")
+
+        for checkbox in [*checkboxes.values(), subset_checkbox, compress_checkbox,
+                         precompile_checkbox, budget_input]:
+            checkbox.bind("change", update_sizes)
+        update_sizes()
+
         # Add the container to the dialog
         d.panel <= container
 
         # Handle the OK button click
         @bind(d.ok_button, "click")
         def ok_click(evt):
-            # Get the list of selected libraries
-            selected_libs = [lib_name for lib_name, checkbox in checkboxes.items()
-                             if checkbox.checked]
+            selected_libs, options = selected_export()
+            self.app.set_export_libs(selected_libs)
+            self.app.set_export_options(options)
             d.close()
-            aio.run(self.retrieve_libraries_and_export_html(selected_libs))
+            aio.run(self.retrieve_libraries_and_export_html(selected_libs, options))
 
-    async def retrieve_libraries_and_export_html(self, libs_to_bundle):
+    async def retrieve_libraries_and_export_html(self, libs_to_bundle, options=None):
         """Make sure libraries are cached, then export."""
-        # TODO: try to get all the libraries in parallel
-        for libname in libs_to_bundle:
-            if not await self.app.fetchlib(libname):
-                # Was not able to get it through internet access;
-                # need to get it through direct loading.
-                # TODO: change title to find file.
-                _, _, url = JSLIBS[libname]
-                filename = url[(url.rfind('/')+1):]
-                ok = await amsg('Info', f'Unable to load {filename} from internet. '
-                                f'Opening file browser to find local copy of {filename}.')
-                if not ok:
-                    msg('Info', 'Cancelling HTML export')
-                    return
-                file_handle_of_lib = await pick_file_to_open(
-                    suggestedName=filename,
-                    types=[{'description': 'JavaScript files',
-                            'accept': {'text/js': ['.js']}}])
-                if file_handle_of_lib is None:
-                    msg('Info', 'Cancelling HTML export')
-                    return
-                await self.app.fileloadlib(libname, file_handle_of_lib) # This should succeed
-        await self.on_save(force_picker=True, libs_to_bundle=libs_to_bundle)
+        options = options or ExportOptions()
+        progress = LibraryProgressDialog(libs_to_bundle)
+        missing = await self.app.fetch_libraries(libs_to_bundle, progress.update, progress.finish)
+        progress.close()
+        if missing:
+            # Was not able to get them through internet access; need to get
+            # them through direct loading, all with a single file picker.
+            filenames = [urlname(JSLIBS[libname][2]) for libname in missing]
+            ok = await amsg('Find local copies', f'Unable to load {", ".join(filenames)} from internet. '
+                            'Opening file browser to find local copies (select them all at once).')
+            if not ok:
+                msg('Info', 'Cancelling HTML export')
+                return
+            handles = await pick_files_to_open(
+                multiple=True,
+                types=[{'description': 'JavaScript files',
+                        'accept': {'text/js': ['.js']}}])
+            matches = match_library_files(missing, [handle.name for handle in handles])
+            for libname, i in matches.items():
+                await self.app.fileloadlib(libname, handles[i]) # This should succeed
+            still_missing = [urlname(JSLIBS[libname][2]) for libname in missing
+                             if libname not in matches]
+            if still_missing:
+                msg('Info', f'Cancelling HTML export: no local copy of {", ".join(still_missing)} chosen.')
+                return
+        saved = await self.on_save(force_picker=True, libs_to_bundle=libs_to_bundle, options=options)
+        if not saved:
+            return
+        size = self.app.saved_size
+        report = f'Exported {self.app.file_name}: {format_size(size)}.'
+        if options.stdlib_subset and 'brython_stdlib' in libs_to_bundle:
+            js, count, total = self.app.stdlib_subset()
+            saved_mb = (len(self.app.libraries['brython_stdlib']) - len(js)) / 1024 / 1024
+            report += (f' Bundled {count} of {total} stdlib modules, '
+                       f'leaving out {saved_mb:.1f} MB of stdlib source.')
+        if options.size_budget_mb and size > options.size_budget_mb * 1024 * 1024:
+            report += (f' This is over the {options.size_budget_mb:g} MB budget set in the '
+                       'export dialog: consider leaving out libraries the project does not use.')
+        msg('Export', report)
 
 
 class AssetDialog(Dialog):
@@ -925,6 +2504,8 @@ class AssetDialog(Dialog):
         # Add explanation at the top
         div_help = html.DIV(self.helptext(), style="margin-bottom: 10px;")
         container.appendChild(div_help)
+        self.progress = html.DIV(style="margin-bottom: 10px;")
+        container.appendChild(self.progress)
 
         # Create table for sounds
         self.main_table = html.TABLE(style="width: 100%; border-collapse: collapse;")
@@ -949,24 +2530,32 @@ class AssetDialog(Dialog):
             while len(self.main_table.childNodes) > 1:
                 self.main_table.removeChild(self.main_table.lastChild)
 
+    @traced('asset_dialog')
     def populate_table(self):
         """Fill the table with assets."""
         self.clear_table()
+        self.show_progress()
 
         for name in self.names():
             row = html.TR(style="border-bottom: 1px solid #ddd;")
             row <= self.row_cells(name)
             self.main_table.appendChild(row)
 
+    def show_progress(self):
+        """Show how many of the assets of a project being opened have loaded."""
+        self.progress.clear()
+        if self.app.asset_progress is not None:
+            done, total = self.app.asset_progress
+            self.progress <= html.PROGRESS(value=done, max=total)
+            self.progress <= html.SPAN(f' Loading files from the project: {done} of {total}')
+
     def cell(self, contents, align=None):
         alignstr = '' if align is None else f' text-align: {align}'
         return html.TD(contents, style=f"padding: 5px;{alignstr}")
 
-    def size_cell(self, data_url):
-        # Calculate size in kB
-        # Remove the data:audio/* prefix to get the raw base64
-        base64_data = data_url.split(',')[1]
-        size_kb = round(len(base64_data) * 3 / 4 / 1024, 1)  # Approximate size in kB
+    def size_cell(self, key):
+        """Cell with the size in kB of the asset with the given key."""
+        size_kb = round(self.app.assets.size(key) / 1024, 1)
         return self.cell(f'{size_kb} kB', align='right')
 
     def row_buttons(self, name):
@@ -1050,15 +2639,13 @@ class SoundsDialog(AssetDialog):
         self.app.delete_sound(name)
 
     async def on_add(self, name, file_handle):
-        data_url = await read_file_as_data_url(file_handle)
-        if data_url is not None:
-            self.app.add_sound(name, data_url)
+        await self.app.add_sound(name, await file_handle.getFile())
 
     def row_cells(self, name):
-        data_url = self.app.get_sound(name)
+        url = self.app.get_sound(name)
 
         name_cell = self.cell(name)
-        size_cell = self.size_cell(data_url)
+        size_cell = self.size_cell(self.app.sounds[name])
         duration_cell = self.cell('...', align='right')
         actions_cell = self.cell('', align='center')
         play_button = html.BUTTON("▶️", style="margin-right: 5px;")
@@ -1072,13 +2659,13 @@ class SoundsDialog(AssetDialog):
         actions_cell <= play_button + stop_button + self.row_buttons(name)
 
         # Calculate duration asynchronously
-        self.load_duration(name, data_url, duration_cell)
+        self.load_duration(name, url, duration_cell)
 
         return name_cell + size_cell + duration_cell + actions_cell
 
-    def load_duration(self, name, data_url, duration_cell):
+    def load_duration(self, name, url, duration_cell):
         """Load the duration of a sound and update the cell."""
-        audio = window.Audio.new(data_url)
+        audio = window.Audio.new(url)
 
         def on_loaded(evt):
             duration = round(audio.duration, 1)
@@ -1154,19 +2741,17 @@ class ImageDialog(AssetDialog):
         self.app.delete_image(name)
 
     async def on_add(self, name, file_handle):
-        data_url = await read_file_as_data_url(file_handle)
-        if data_url is not None:
-            self.app.add_image(name, data_url)
+        await self.app.add_image(name, await file_handle.getFile())
 
     def row_cells(self, name):
-        data_url = self.app.get_image(name)
+        url = self.app.get_image(name)
 
         name_cell = self.cell(name)
-        size_cell = self.size_cell(data_url)
+        size_cell = self.size_cell(self.app.images[name])
         image_size_cell = self.cell('...', align='right')
         thumb_cell = self.cell('', align='right')
         thumb = html.IMG(
-            src=data_url,
+            src=url,
             style='cursor: pointer; width: 50px; height: 50px; object-fit: cover;')
         thumb.title = "View image"
         thumb_cell <= thumb
@@ -1175,20 +2760,20 @@ class ImageDialog(AssetDialog):
         actions_cell <= self.row_buttons(name)
 
         # Calculate image size asynchronously
-        self.load_image_size(name, data_url, image_size_cell)
+        self.load_image_size(name, url, image_size_cell)
 
         return name_cell + size_cell + image_size_cell + thumb_cell + actions_cell
 
-    def load_image_size(self, name, data_url, cell):
+    def load_image_size(self, name, url, cell):
         """Load and display the dimensions of an image.
 
         Args:
             name: The image name
-            data_url: The data URL of the image
+            url: The URL of the image
             cell: The table cell to update with the dimensions
         """
         # Create a temporary image to get dimensions
-        img = html.IMG(src=data_url)
+        img = html.IMG(src=url)
 
         def on_load(evt):
             # Get dimensions
@@ -1703,15 +3288,13 @@ class ResourceDialog(AssetDialog):
         self.app.delete_resource(name)
 
     async def on_add(self, name, file_handle):
-        data_url = await read_file_as_data_url(file_handle)
-        if data_url is not None:
-            self.app.add_resource(name, data_url)
+        await self.app.add_resource(name, await file_handle.getFile())
 
     def row_cells(self, name):
-        data_url = self.app.get_resource(name)
+        key = self.app.resources[name]
         name_cell = self.cell(name)
-        size_cell = self.size_cell(data_url)
-        type_cell = self.cell(resource_mime(data_url) or '—', align='right')
+        size_cell = self.size_cell(key)
+        type_cell = self.cell(self.app.assets.mime(key) or '—', align='right')
         actions_cell = self.cell('', align='center')
 
         view_button = html.BUTTON("🔍", style="margin-right: 5px;")
@@ -1729,11 +3312,12 @@ class ResourceViewDialog(Dialog):
         super().__init__(f'Preview: {name}', ok_cancel=False, top=top, left=left)
         self.app = app
         self.name = name
-        self.data_url = app.get_resource(name)
+        self.key = app.resources[name]
+        self.url = app.get_resource(name)
         self.init_ui()
 
     def init_ui(self):
-        mime = resource_mime(self.data_url)
+        mime = self.app.assets.mime(self.key)
         container = html.DIV(style="width: 640px; max-height: 600px; overflow: auto;")
         container <= html.DIV(f'Type: {mime or "unknown"}',
                               style="margin-bottom: 8px; font-family: monospace; color: #555;")
@@ -1748,7 +3332,7 @@ class ResourceViewDialog(Dialog):
     def _font_preview(self):
         family = 'pwepreview_' + ''.join(c for c in self.name if c.isalnum())
         document.head <= html.STYLE(
-            "@font-face { font-family: '" + family + "'; src: url('" + self.data_url + "'); }")
+            "@font-face { font-family: '" + family + "'; src: url('" + self.url + "'); }")
         div = html.DIV(style=f"font-family: '{family}';")
         for size in (16, 24, 36, 48):
             div <= html.DIV('The quick brown fox jumps over the lazy dog 0123',
@@ -1756,14 +3340,17 @@ class ResourceViewDialog(Dialog):
         return div
 
     def _text_preview(self):
+        pre = html.PRE(style=("white-space: pre-wrap; background: #f4f4f4; "
+                              "padding: 8px; border: 1px solid #ddd; "
+                              "max-height: 480px; overflow: auto;"))
+        aio.run(self._load_text(pre))
+        return pre
+
+    async def _load_text(self, pre):
         try:
-            b64 = self.data_url.split(',', 1)[1]
-            text = base64.b64decode(b64).decode('utf-8')
+            pre.text = await self.app.assets.text(self.key)
         except Exception:
-            text = '(unable to decode this file as text)'
-        return html.PRE(text, style=("white-space: pre-wrap; background: #f4f4f4; "
-                                     "padding: 8px; border: 1px solid #ddd; "
-                                     "max-height: 480px; overflow: auto;"))
+            pre.text = "(unable to decode this file as text)"
 
 
 class App:
@@ -1773,35 +3360,48 @@ class App:
         self.current_example = None  # Track which example is currently loaded
         self.modules: dict[str, str] = {'main': INITIAL_PYTHON}
         self.modules_viewinfo: dict[str, ViewInfo] = {}
-        self.sounds: dict[str, str] = {} # Name -> base64 encoded sound as a data URL
-        self.images: dict[str, str] = {} # Name -> base64 encoded image as a data URL
-        self.resources: dict[str, str] = {} # Name -> base64 encoded file as a data URL
+        self.modules_compiled: dict[str, CompiledModule] = {} # Last compiled JS of each module
+        self.assets = AssetStore() # Key -> asset data, as a Blob where possible
+        self.sounds: dict[str, str] = {} # Name -> key of the sound in assets
+        self.images: dict[str, str] = {} # Name -> key of the image in assets
+        self.resources: dict[str, str] = {} # Name -> key of the file in assets
         self.libraries: dict[str, str] = {} # Name -> contents of javascript library (cache)
+        self.library_payloads = PayloadCache(LIBRARY_PAYLOAD_CACHE_CHARS) # Encoded script tags
+        self.library_store = LibraryStore() # Persistent copy of libraries, across sessions
+        self.export_libs: list[str] = load_setting('export_libs', []) # Last bundled libraries
+        self.export_options = ExportOptions(**load_setting('export_options', {}))
+        self._stdlib_subset = None # (key, stdlib_subset_js result) for the last export
+        self.saved_size = 0 # Size of the last page saved or exported
         self.active_module = 'main'
-        self.orig_body = INITIAL_HTML
-        self._remember_saved_state()
+        self.version = 0 # Bumped on every change to the project
+        self.saved_version = 0 # Version when last saved or loaded
+        self.loads = 0 # Count of projects opened, to stop loading the last one's assets
+        self.asset_progress = None # (loaded, total) assets, while a project is loading
+        self.loading = None # Pending, while a project is being opened
         self.save_on_run = False
         self.show_save_on_run = True
 
         self.ui = UI(self)
 
-        self.ui.set_contents_html(self.orig_body)
+        self.ui.set_contents_html(INITIAL_HTML)
         self.update_ui(update_python_text=True)
 
-    def _remember_saved_state(self):
-        """Snapshot modules and assets as the baseline for change detection."""
-        self.orig_modules = dict(self.modules)
-        self.orig_sounds = dict(self.sounds)
-        self.orig_images = dict(self.images)
-        self.orig_resources = dict(self.resources)
-
-    def anything_modified(self, current_body, current_python):
-        self.modules[self.active_module] = current_python
-        return (current_body != self.orig_body
-                or self.modules != self.orig_modules
-                or self.sounds != self.orig_sounds
-                or self.images != self.orig_images
-                or self.resources != self.orig_resources)
+        # Have the libraries we'll likely export with ready before they're needed
+        when_idle(lambda: aio.run(self.prefetch_libraries()))
+
+    def touch(self):
+        """Note a change to the html, a module or an asset."""
+        self.version += 1
+        self.ui.set_modified(True)
+
+    def _remember_saved_state(self, version=None):
+        """Take the current version, or the given one, as the baseline for
+        change detection."""
+        self.saved_version = self.version if version is None else version
+        self.ui.set_modified(self.anything_modified())
+
+    def anything_modified(self):
+        return self.version != self.saved_version
 
     def has_file(self):
         return self.file_handle != None
@@ -1823,27 +3423,30 @@ class App:
 
     async def load_example(self, name):
         # Assumes overwrite check has already been completed
-        # All examples have been loaded as part of examples.js into window.EXAMPLES_DATA
-        # Find the example in window.EXAMPLES_DATA
-        for category in window.EXAMPLES_DATA:
-            for example in category['examples']:
-                if example['id'] == name:
-                    try:
-                        if self.load_html(base64.b64decode(example['content']).decode('utf-8')):
-                            self.file_handle = None
-                            self.file_name = f'{name}.html'
-                            self.current_example = name  # Track the current example
-                            self.reset_save_on_run()
-                            self.ui.set_loaded_file(f'{name}.html')
-                            self.ui.set_example_choice(name)  # Update dropdown to show current example
-                        else:
-                            err(f'Parsing error when loading example {name}.')
-                        return
-                    except Exception as e:
-                        console.log(str(e))
-                        err(f'Unable to load example {name}.')
-                        return
-        err(f'Unable to find example {name} in loaded examples.')
+        # Only the index of the examples is loaded with the editor, from
+        # examples.js; each example is loaded from its own file when chosen
+        example = example_index().get(name)
+        if example is None:
+            err(f'Unable to find example {name} in loaded examples.')
+            return
+
+        def loaded():
+            self.file_handle = None
+            self.file_name = f'{name}.html'
+            self.current_example = name  # Track the current example
+            self.reset_save_on_run()
+            self.ui.set_loaded_file(f'{name}.html')
+            self.ui.set_example_choice(name)  # Update dropdown to show current example
+
+        try:
+            contents = await load_example_html(example)
+            if contents is None:
+                err(f'Unable to load example {name}.')
+            elif not await self.load_html(contents, loaded):
+                err(f'Parsing error when loading example {name}.')
+        except Exception as e:
+            console.log(str(e))
+            err(f'Unable to load example {name}.')
 
     def reset_save_on_run(self):
         self.save_on_run = False
@@ -1854,192 +3457,600 @@ class App:
         self.show_save_on_run = not dont_show_again
 
     async def open_file(self, file_handle):
-        f = await file_handle.getFile()
-        contents = await f.text()
-        if not self.load_html(contents):
-            return
-        # File load successful
-        self.file_handle = file_handle
-        self.file_name = file_handle.name
-        console.log(f'Opened {file_handle.name}.')
-        self.reset_save_on_run()
-        self.ui.set_loaded_file(self.file_name)
+        def opened():
+            self.file_handle = file_handle
+            self.file_name = file_handle.name
+            console.log(f'Opened {file_handle.name}.')
+            self.reset_save_on_run()
+            self.ui.set_loaded_file(self.file_name)
 
-    def load_html(self, contents):
+        await self.load_html(TextReader(await file_handle.getFile()), opened)
+
+    @traced('load_html')
+    async def load_html(self, contents, on_code=None):
+        """Load saved html, from a string or a TextReader.
+
+        The html body and python modules go into the editors as soon as
+        they've been read. Once the whole page has been read, on_code() is
+        called, then the assets are read and stored, while the editors can be
+        used, with the progress shown in the asset dialogs. The baseline for
+        change detection is set once they're all stored. If the page can't be
+        read, the project that was open is put back. Returns whether the html
+        loaded.
+        """
+        reader = contents if isinstance(contents, TextReader) else TextReader(contents)
+        pending = self.loading = Pending()
         try:
-            body, modules, sounds, images, resources = self.split_html(contents)
-        except Exception as e:
-            console.log(e)
-            err('Looks like this file was not saved by pywebedit. Unable to load.')
-            return False
-        self.orig_body = body
+            text = ''
+            search_from = 0
+            shown = None
+            while True:
+                chunk = await reader.read()
+                if not chunk:
+                    break
+                text += chunk
+                if shown is None:
+                    layout, search_from = scan_page_code(text, search_from)
+                    if layout is not None:
+                        shown = self._show_code(*page_code(text, layout))
+            try:
+                body, modules, assets, sounds, images, resources, hashed = self.read_page(text)
+            except Exception as e:
+                console.log(e)
+                err('Looks like this file was not saved by pywebedit. Unable to load.')
+                if shown is not None:
+                    self._restore_code(shown[2])
+                return False
+            if shown is None:
+                shown = self._show_code(body, modules)
+            load, baseline, _ = shown
+            if on_code is not None:
+                on_code()
+            if await self._load_assets(load, assets, hashed, sounds, images, resources):
+                self._remember_saved_state(baseline)  # baseline for change detection
+            return True
+        finally:
+            if self.loading is pending:
+                self.loading = None
+            pending.done()
+
+    def _show_code(self, body, modules):
+        """Show a project's html and modules, without its assets yet.
+
+        Returns the number of this load, the version of the project to take
+        as saved once its assets are stored, and the project shown before,
+        for _restore_code.
+        """
+        self.modules[self.active_module] = self.ui.contents_python()
+        previous = (self.ui.contents_html(), self.modules, self.active_module,
+                    self.modules_viewinfo, self.sounds, self.images, self.resources,
+                    self.current_example, self.version - self.saved_version)
+        self.loads += 1
         self.modules = dict(modules)
         self.active_module = 'main'
         self.modules_viewinfo = {}
-        self.sounds = sounds
-        self.images = images
-        self.resources = resources
-        self._remember_saved_state()  # baseline for change detection
-        # Load successful
+        self.sounds = {}
+        self.images = {}
+        self.resources = {}
         self.ui.set_contents_html(body)
         self.update_ui(update_python_text=True)
-        return True
-
+        return self.loads, self.version, previous
+
+    def _restore_code(self, previous):
+        """Put back the project shown before _show_code, which has its assets
+        still stored as they're only pruned once the new ones are loaded."""
+        (body, self.modules, self.active_module, self.modules_viewinfo, self.sounds,
+         self.images, self.resources, example, unsaved) = previous
+        self.loads += 1  # Stops the assets of an earlier load still being stored
+        self.asset_progress = None
+        self.ui.set_contents_html(body)
+        self.update_ui(update_python_text=True)
+        if example is not None:
+            self.current_example = example
+            self.ui.set_example_choice(example)
+        self.saved_version = self.version - unsaved
+        self.ui.set_modified(self.anything_modified())
+        self.ui.update_asset_dialogs()
+
+    async def _load_assets(self, load, assets, hashed, sounds, images, resources):
+        """Store the assets of the project being loaded, one by one, adding
+        the names that refer to each as it's stored. Returns False if another
+        project was opened meanwhile."""
+        refs = {}  # Key in the file -> (dict, name) of each name referring to it
+        for names, saved in ((self.sounds, sounds), (self.images, images),
+                             (self.resources, resources)):
+            for name, key in saved.items():
+                refs.setdefault(key, []).append((names, name))
+        self._prune_assets()  # Those of the project open before
+        self.asset_progress = (0, len(assets))
+        self.ui.update_asset_dialogs()
+        try:
+            for i, (key, data_url) in enumerate(assets.items()):
+                stored = await self.assets.add_data_url(data_url, key if hashed else None)
+                if load != self.loads:
+                    return False
+                for names, name in refs.get(key, []):
+                    names.setdefault(name, stored)  # Unless the user added one meanwhile
+                self.asset_progress = (i + 1, len(assets))
+                self.ui.update_asset_dialogs()
+            # Back in the order they were saved in
+            for names, saved in ((self.sounds, sounds), (self.images, images),
+                                 (self.resources, resources)):
+                ordered = {name: names[name] for name in saved if name in names}
+                ordered.update(names)
+                names.clear()
+                names.update(ordered)
+            self._prune_assets()
+            return True
+        finally:
+            if load == self.loads:  # Else the progress is that of a later load
+                self.asset_progress = None
+                self.ui.update_asset_dialogs()
+
+    @traced('split_html', size=lambda result, args: len(args[1]))
     def split_html(self, contents):
-        """Split out header, python scripts, sounds, images from saved html."""
-        body_and_scripts = contents.split('<body onload="__brython_pre_then_code()">')[1]
+        """Split out header, python scripts, sounds, images from saved html.
 
-        body, precode, *modfragments, script_and_foot = body_and_scripts.split(
-            '<' + 'script type="text/python" id=')
-
-        # Body has extra line - remove it
-        body = '\n'.join(body.splitlines()[1:])
+        Assets are returned as dicts of name to data URL.
+        """
+        body, modules, assets, sounds, images, resources, _ = self.read_page(contents)
+        return (body, modules,
+                {name: assets[key] for name, key in sounds.items()},
+                {name: assets[key] for name, key in images.items()},
+                {name: assets[key] for name, key in resources.items()})
+
+    @traced('read_page', size=lambda result, args: len(args[1]))
+    def read_page(self, contents):
+        """Split saved html into its body, python modules and assets.
+
+        Returns (body, modules, assets, sounds, images, resources, hashed).
+        assets maps keys to data URLs, and sounds, images and resources map
+        names to those keys. hashed is whether the keys are the SHA-256 of
+        the assets, as they are when there's a manifest.
+        """
+        layout = scan_page(contents)
+        body, modules = page_code(contents, layout)
+
+        if layout.manifest is not None:
+            manifest = parse_json(contents[layout.manifest[0]:layout.manifest[1]])
+            if manifest['version'] > PAGE_FORMAT_VERSION:
+                raise ValueError(f"Saved by a newer pywebedit (format {manifest['version']})")
+            base = layout.payload[0]
+            assets = {asset['sha256']: contents[base + asset['offset']:
+                                                base + asset['offset'] + asset['length']]
+                      for asset in manifest['assets']}
+            return (body, modules, assets, manifest['sounds'], manifest['images'],
+                    manifest['resources'], True)
 
         # Extract embedded resources from precode. Each block is guarded so
         # files saved by older versions (no RESOURCES, or no assets at all)
         # still load.
-        sounds = {}
-        images = {}
-        resources = {}
-        if 'window.SOUNDS = {' in precode:
-            sounds = parse_str_str_dict(extract_between(precode, 'window.SOUNDS = {', '}'))
-            images = parse_str_str_dict(extract_between(precode, 'window.IMAGES = {', '}'))
-        if 'window.RESOURCES = {' in precode:
-            resources = parse_str_str_dict(extract_between(precode, 'window.RESOURCES = {', '}'))
-
-        modules = {}
-        lines = script_and_foot.strip().splitlines()
-        script = '\n'.join(lines[1:-3])
-        modules['main'] = script
-
-        for fragment in modfragments:
-            lines = fragment.splitlines()
-            modname = lines[0].replace('"__pwe_', '').replace('">', '')
-            modules[modname] = '\n'.join(lines[1:-2])
-
-        return body, modules, sounds, images, resources
+        pre_start, pre_end = layout.precode
+
+        def precode_dict(token):
+            if contents.find(token, pre_start, pre_end) < 0:
+                return None
+            return parse_str_str_dict(contents, *find_between(contents, token, '}',
+                                                              pre_start, pre_end))
+
+        sounds = precode_dict('window.SOUNDS = {') or {}
+        images = precode_dict('window.IMAGES = {') or {}
+        resources = precode_dict('window.RESOURCES = {') or {}
+        # Files saved by older versions have data URLs in the dicts, so use
+        # those as keys
+        assets = {url: url for url in [*sounds.values(), *images.values(),
+                                       *resources.values()]}
+        return body, modules, assets, sounds, images, resources, False
 
     def run(self, html_body, python_code):
-        html = self.build_html(html_body, python_code)
+        # The base keeps the local copies of libraries resolving next to the
+        # editor, wherever the page is shown from
+        page_parts = self.render_html_parts(html_body, python_code, base_href=page_base_href())
         if self.save_on_run:
             assert self.file_handle is not None
             aio.run(self.save_file(self.file_handle, html_body, python_code,
                                    self.modules_viewinfo[self.active_module], quiet=True))
-        self.ui.run_html_in_new_window(html)
+        self.ui.run_html_in_new_window(page_parts)
 
-    async def fetchlib(self, libname):
+    @traced('fetchlib', size=lambda ok, args: len(args[0].libraries.get(args[1], '')))
+    async def fetchlib(self, libname, on_progress=None):
         """Attempt to fetch and cache javascript library.
 
-        Start with CDN (and the browser cache). If that doesn't work,
-        try to fetch a local copy (which will fail if offline due to
-        CORS).
+        Races the CDN (and the browser cache) against a local copy next to the
+        editor (which will fail if offline due to CORS), each with its own
+        timeout. on_progress(received, total) reports download progress.
 
         Returns True if successfully able to fetch and cache the library.
         """
         desc, globalvar, url = JSLIBS[libname]
-        localurl = url[(url.rfind('/')+1):]
-        for url_to_try in [url, localurl]:
-            response = await aio.get(url, cache=True)
-            # TODO: fix correct syntax here
-            if response.status == 200:
-                self.libraries[libname] = response.data
-                return True
-        return False
+        content = await fetch_first([(url, LIBRARY_FETCH_TIMEOUTS['cdn']),
+                                     (urlname(url), LIBRARY_FETCH_TIMEOUTS['local'])],
+                                    on_progress)
+        if content is None:
+            return False
+        self.cache_library(libname, content)
+        return True
 
     async def fileloadlib(self, libname, lib_file_handle):
         """Loads library from a file handle."""
         f = await lib_file_handle.getFile()
-        self.libraries[libname] = await f.text()
+        self.cache_library(libname, await f.text())
+        return True
+
+    def cache_library(self, libname, content, persist=True):
+        """Cache a library's contents, and encode it for export once idle.
+
+        Unless persist is False, the library is also kept in the library store
+        for later sessions.
+        """
+        self.libraries[libname] = content
+        if persist and self.library_store.backend:
+            aio.run(self.library_store.put(libname, content))
+        when_idle(lambda: self.library_payload(libname))
+
+    async def load_stored_library(self, libname):
+        """Cache a library from the persistent store. Returns True on success."""
+        content = await self.library_store.get(libname)
+        if content is None:
+            return False
+        self.cache_library(libname, content, persist=False)
         return True
 
+    async def ensure_library(self, libname, on_progress=None):
+        """Make sure a library is cached, without user interaction.
+
+        Tries memory, then the persistent store, then the network. Returns
+        True if the library is now cached.
+        """
+        return (self.is_lib_cached(libname)
+                or await self.load_stored_library(libname)
+                or await self.fetchlib(libname, on_progress))
+
+    async def fetch_libraries(self, libnames, on_progress=None, on_done=None):
+        """Make sure all the given libraries are cached, fetching concurrently.
+
+        on_progress(libname, received, total) reports download progress and
+        on_done(libname, ok) each library's outcome. Returns the names of the
+        libraries that could not be loaded.
+        """
+        async def fetch_one(libname):
+            progress = None
+            if on_progress is not None:
+                progress = lambda received, total: on_progress(libname, received, total)
+            ok = await self.ensure_library(libname, progress)
+            if on_done is not None:
+                on_done(libname, ok)
+            return ok
+
+        results = await gather(*[fetch_one(libname) for libname in libnames])
+        return [libname for libname, ok in zip(libnames, results) if not ok]
+
+    async def prefetch_libraries(self):
+        """Quietly cache the libraries selected for the last export."""
+        libnames = [libname for libname in self.export_libs if libname in JSLIBS]
+        for libname in await self.fetch_libraries(libnames):
+            console.log(f'Unable to prefetch {libname}')
+
+    def set_export_libs(self, libnames):
+        """Remember which libraries to bundle (and prefetch) next time."""
+        self.export_libs = list(libnames)
+        save_setting('export_libs', self.export_libs)
+
+    def set_export_options(self, options):
+        """Remember the export options for next time."""
+        self.export_options = options
+        save_setting('export_options', vars(options))
+
     def is_lib_cached(self, libname):
         return libname in self.libraries
 
-    def build_html(self, html_body, python_code, libs_to_bundle=None):
+    def library_payload(self, libname, content=None, compressed=False):
+        """The encoded script tag for a cached library, or for other content
+        standing in for it. If compressed, a block for LIBRARY_INFLATER instead.
+
+        Memoized by library name and content hash, so exporting again only
+        re-encodes libraries whose contents have changed.
+        """
+        if content is None:
+            content = self.libraries[libname]
+        key = (libname, content_hash(content), compressed)
+        payload = self.library_payloads.get(key)
+        if payload is None:
+            if compressed:
+                payload = compressed_js_for_html(libname, gzip_b64(content))
+            else:
+                payload = encode_js_for_html(content)
+            self.library_payloads.put(key, payload)
+        return payload
+
+    async def compress_library_payloads(self, libs_to_bundle, options):
+        """Compress the libraries an export bundles with the browser's native
+        gzip, ahead of build_html_parts (which falls back to pure Python)."""
+        if not self.compresses_bundle(libs_to_bundle, options):
+            return
+        for libname in libs_to_bundle:
+            content = self.bundled_library(libname, options)
+            key = (libname, content_hash(content), True)
+            if key not in self.library_payloads:
+                encoded = await gzip_b64_native(content)
+                self.library_payloads.put(key, compressed_js_for_html(libname, encoded))
+
+    def compresses_bundle(self, libs_to_bundle, options):
+        """Whether to compress the bundled libraries.
+
+        Compressed libraries run after all the other scripts in the head, so
+        not when a bundled brython would be needed by a stdlib from the CDN.
+        """
+        return (options.compress and bool(libs_to_bundle)
+                and not ('brython' in libs_to_bundle and 'brython_stdlib' not in libs_to_bundle))
+
+    def bundled_library(self, libname, options):
+        """The contents of a cached library, as bundled with the given options."""
+        if libname == 'brython_stdlib' and options.stdlib_subset:
+            return self.stdlib_subset()[0]
+        return self.libraries[libname]
+
+    def stdlib_subset(self):
+        """The cached stdlib cut down to what the project's modules can import.
+
+        Returns (js, module count, total module count), memoized on the stdlib
+        and module contents.
+        """
+        key = self._stdlib_subset_key()
+        if self._stdlib_subset is None or self._stdlib_subset[0] != key:
+            stdlib = self.libraries['brython_stdlib']
+            self._stdlib_subset = (key, stdlib_subset_js(stdlib, self.modules.values()))
+        return self._stdlib_subset[1]
+
+    def _stdlib_subset_key(self):
+        return ((content_hash(self.libraries['brython_stdlib']),)
+                + tuple(content_hash(code) for code in self.modules.values()))
+
+    def export_size_estimate(self, libs_to_bundle, options):
+        """Estimate the size of each part of an export, without building it.
+
+        Returns a list of (label, size, exact). Sizes come from what is
+        already cached: a library's encoded payload if an export made it, else
+        its source (or typical size, if not fetched yet) as it would encode;
+        the stdlib subset of the last export, if the project hasn't changed;
+        the modules' compiled JavaScript, if compiled; and the assets' sizes
+        as data URLs. exact is False where a size is an estimate.
+        """
+        compressed = self.compresses_bundle(libs_to_bundle, options)
+        page = ''.join(text for is_key, text in PAGE_TEMPLATE.segments if not is_key)
+        parts = [('Page', len(page), True)]
+        for libname in libs_to_bundle:
+            label = libname
+            content = self.libraries.get(libname)
+            exact = content is not None
+            if content is not None and libname == 'brython_stdlib' and options.stdlib_subset:
+                label = 'brython_stdlib (subset)'
+                subset = self._stdlib_subset
+                if subset is not None and subset[0] == self._stdlib_subset_key():
+                    content = subset[1][0]
+                else:
+                    exact = False  # At most the whole stdlib
+            if content is None:
+                size = JSLIB_TYPICAL_SIZES.get(libname, 0)
+            else:
+                payload = self.library_payloads.get((libname, content_hash(content), compressed))
+                if payload is not None:
+                    parts.append((label, len(payload), exact))
+                    continue
+                size = len(content)
+            if compressed:
+                parts.append((label, round(size * COMPRESSED_SIZE_RATIO), False))
+            else:
+                parts.append((label, base64_size(size), exact))
+        for name, code in self.modules.items():
+            size = len(code)
+            exact = True
+            if options.precompile:
+                compiled = self.modules_compiled.get(name)
+                if compiled is not None and compiled.sha256 == source_sha256(code):
+                    size += len(compiled.js)
+                else:
+                    size += len(code) * PRECOMPILED_SIZE_RATIO
+                    exact = False
+            parts.append((f'{name}.py', size, exact))
+        counted = set()
+        for kind, assets in (('sound', self.sounds), ('image', self.images),
+                             ('file', self.resources)):
+            for name, key in assets.items():
+                if key not in counted:
+                    counted.add(key)
+                    url_prefix = len(f'data:{self.assets.mime(key)};base64,')
+                    parts.append((f'{kind} {name}', url_prefix + base64_size(self.assets.size(key)),
+                                  True))
+        return parts
+
+    def compiled_modules(self):
+        """The modules compiled to JavaScript by the running Brython, as name:
+        CompiledModule.
+
+        Only modules whose source or Brython changed since they were last
+        compiled are compiled again. Modules that don't compile are left out,
+        so the page compiles them on load, and reports the error then.
+        """
+        brython = brython_build()
+        if brython is None:
+            return {}
+        compiled = {}
+        for name, code in self.modules.items():
+            sha256 = source_sha256(code)
+            module = self.modules_compiled.get(name)
+            if module is None or (module.sha256, module.brython) != (sha256, brython):
+                try:
+                    module = CompiledModule(sha256, brython, compile_module(name, code))
+                except Exception as e:
+                    console.log(f'Not precompiling module {name}: {e}')
+                    continue
+            compiled[name] = module
+        self.modules_compiled = compiled
+        return compiled
+
+    def compiled_modules_parts(self):
+        """The block of the modules compiled to JavaScript, with its loader,
+        as parts of the page head; none if nothing compiled."""
+        compiled = self.compiled_modules()
+        if not compiled:
+            return []
+        stored = {'brython': next(iter(compiled.values())).brython, 'modules': {}}
+        for name, module in compiled.items():
+            block_id, module_name, filename = module_script_names(name)
+            stored['modules'][block_id] = {'sha256': module.sha256, 'name': module_name,
+                                           'filename': filename, 'js': module.js}
+        return [COMPILED_MODULES_LOADER,
+                f'{SCRIPT_TAGS["script"]} type="application/json" id="{COMPILED_MODULES_ID}">',
+                manifest_json(stored), SCRIPT_TAGS['endscript'], '\n']
+
+    def build_html(self, html_body, python_code, libs_to_bundle=None, options=None):
         """Build the full html text, inserting the user editable sections into the template.
 
         Optionally inlines complete javascript libraries for complete standaloneness.
         """
+        return ''.join(self.build_html_parts(html_body, python_code, libs_to_bundle, options))
+
+    async def render_html(self, html_body, python_code, libs_to_bundle=None, options=None):
+        """build_html, with the assets encoded as data URLs."""
+        return ''.join(await self.render_html_parts(html_body, python_code, libs_to_bundle, options))
+
+    async def render_html_parts(self, html_body, python_code, libs_to_bundle=None, options=None,
+                                base_href=None):
+        """build_html_parts, with the assets encoded as data URLs."""
+        asset_urls = await self.assets.data_urls(self._asset_keys())
+        return self.build_html_parts(html_body, python_code, libs_to_bundle, options,
+                                     asset_urls, base_href)
+
+    @traced('build_html', size=lambda parts, args: parts_size(parts))
+    def build_html_parts(self, html_body, python_code, libs_to_bundle=None, options=None,
+                         asset_urls=None, base_href=None):
+        """Build the page as an ordered list of parts, without joining them.
+
+        Parts are template fragments, library payloads, module blocks and
+        asset blocks. Writing them one by one (write_parts) or handing them
+        to a Blob (parts_to_blob) avoids ever copying the multi-MB bundled
+        libraries into one big string.
+
+        asset_urls maps asset keys to the data URLs to embed (see
+        AssetStore.data_urls). It can only be left out where no asset is a
+        Blob, as a page must never embed an object URL, which breaks once the
+        session ends; render_html_parts encodes them. base_href, if given,
+        sets the URL that relative URLs in the page resolve against.
+        """
         self.modules[self.active_module] = python_code
+        options = options or ExportOptions()
 
         console.log('Building html with libs_to_bundle:', libs_to_bundle)
-        if libs_to_bundle is None:
-            libs_to_bundle = []
+        # Copy, as the bundling below consumes the list
+        libs_to_bundle = list(libs_to_bundle or [])
 
         # Handle library bundling - need to respect the order for bython
         for lib in libs_to_bundle:
             assert lib in self.libraries
-        libtxt = ''
+        compress = self.compresses_bundle(libs_to_bundle, options)
+
+        def payload(lib):
+            return self.library_payload(lib, self.bundled_library(lib, options), compress)
+
+        libparts = []
+        if base_href is not None:
+            href = base_href.replace('"', '%22')
+            libparts.append(f'<base href="{href}">\n')
 
         # Brython has a special case - it needs to be loaded first with an additional shim
         if 'brython' in libs_to_bundle:
-            libtxt += SCRIPT_LOCAL_BRYTHON_SHIM
-            libtxt += encode_js_for_html(self.libraries['brython']) + '\n'
+            libparts.append(SCRIPT_LOCAL_BRYTHON_SHIM)
+            libparts += [payload('brython'), '\n']
             libs_to_bundle.remove('brython')
         else:
-            libtxt += create_script_loader('brython') + '\n'
+            libparts.append(create_script_loader('brython') + '\n')
 
         # We also have to load the standard library no matter what, as our error handler currently relies on it
         if 'brython_stdlib' in libs_to_bundle:
-            libtxt += encode_js_for_html(self.libraries['brython_stdlib']) + '\n'
+            libparts += [payload('brython_stdlib'), '\n']
             libs_to_bundle.remove('brython_stdlib')
         else:
-            libtxt += create_script_loader('brython_stdlib') + '\n'
+            libparts.append(create_script_loader('brython_stdlib') + '\n')
 
-        libtxt += '\n'.join(encode_js_for_html(self.libraries[lib]) + '\n'
-                            for lib in libs_to_bundle)
+        for i, lib in enumerate(libs_to_bundle):
+            if i > 0:
+                libparts.append('\n')
+            libparts += [payload(lib), '\n']
+
+        if compress:
+            libparts.append(LIBRARY_INFLATER)
 
         # Convert modules to script blocks
-        module_texts = []
+        module_parts = []
         for module_name, module_code in self.modules.items():
             if module_name == 'main':
                 continue
-            tagmap = {'script':    '<' + 'script',
-                      'endscript': '<' + '/script>',
-                      'modulecode': module_code,
-                      'moduleid': f'__pwe_{module_name}'}
-            m = MODULE_TEMPLATE
-            for key, value in tagmap.items():
-                m = m.replace('%' + key + '%', value)
-            module_texts.append(m)
-
-        # Save embedded sounds, images, and other file resources
-        sounds = "{" + ",\n".join(f"'{key}':'{val}'" for key,val in self.sounds.items()) + "}"
-        images = "{" + ",\n".join(f"'{key}':'{val}'" for key,val in self.images.items()) + "}"
-        resources = "{" + ",\n".join(f"'{key}':'{val}'" for key,val in self.resources.items()) + "}"
-
-        # Note this is order dependent
-        tagmap = {'libraries':       libtxt,
-                  'brython_version': BRYTHON_VERSION,
+            if module_parts:
+                module_parts.append('\n\n')
+            module_parts += MODULE_TEMPLATE.render_parts(
+                dict(SCRIPT_TAGS, modulecode=module_code, moduleid=f'__pwe_{module_name}'))
+
+        # Save embedded sounds, images, and other file resources. Each distinct
+        # data URL is written once, and referred to by key.
+        if asset_urls is None:
+            asset_urls = self.assets.stored_data_urls(self._asset_keys())
+        manifest, payload = self.asset_manifest(asset_urls)
+
+        import json
+        tagmap = {'libraries':       libparts,
+                  'compiled_modules': self.compiled_modules_parts() if options.precompile else [],
                   'html_body':       html_body,
                   'python_code':     self.modules['main'],
-                  'script':          '<' + 'script',
-                  'endscript':       '<' + '/script>',
-                  'modules':         ', '.join(f"'__pwe_{m}'" for m in self.modules if m != 'main'),
-                  'modulescripts':   '\n\n'.join(module_texts),
-                  'sounds':          sounds,
-                  'images':          images,
-                  'resources':       resources}
-        p = PAGE_TEMPLATE
-        for key, value in tagmap.items():
-            p = p.replace('%' + key + '%', value)
-
-        return p
-
+                  'modules':         json.dumps([[name, source_sha256(code)]
+                                                 for name, code in self.modules.items()
+                                                 if name != 'main']),
+                  'modulescripts':   module_parts,
+                  'manifest':        manifest_json(manifest),
+                  'asset_payload':   payload}
+        return PAGE_TEMPLATE.render_parts(dict(SCRIPT_TAGS, **tagmap))
+
+    def asset_manifest(self, asset_urls):
+        """The manifest of the assets, and the payload of their data URLs as
+        a list of parts, each at the offset the manifest gives for it."""
+        entries = []
+        payload = []
+        offset = 0
+        for key in self._asset_keys():
+            url = asset_urls[key]
+            entries.append({'sha256': key, 'type': self.assets.mime(key),
+                            'size': self.assets.size(key), 'offset': offset,
+                            'length': len(url)})
+            payload.append(url)
+            offset += len(url)
+        manifest = {'version': PAGE_FORMAT_VERSION,
+                    'assets': entries,
+                    'sounds': dict(self.sounds),
+                    'images': dict(self.images),
+                    'resources': dict(self.resources)}
+        return manifest, payload
+
+    @traced('save_file')
     async def save_file(self, file_handle, html_body, python_code, python_viewinfo,
-                        libs_to_bundle=None, quiet=False):
+                        libs_to_bundle=None, quiet=False, options=None):
+        while self.loading is not None:  # Wait for the project to finish loading
+            await self.loading.wait()
         self.modules[self.active_module] = python_code
         self.modules_viewinfo[self.active_module] = python_viewinfo
         self.file_handle = file_handle
         self.file_name = file_handle.name
-        full_html = self.build_html(html_body, python_code, libs_to_bundle)
+        version = self.version  # Edits made while the file is written aren't saved
+        if options is not None:
+            await self.compress_library_payloads(libs_to_bundle or [], options)
+        asset_urls = await self.assets.data_urls(self._asset_keys())
+        parts = self.build_html_parts(html_body, python_code, libs_to_bundle, options, asset_urls)
+        self.saved_size = parts_size(parts)
         writable = await file_handle.createWritable()
-        await writable.write(full_html)
+        await write_parts(writable, parts)
         await writable.close()
         console.log(f'Wrote {self.file_name}')
         # Update known saved version
-        self.orig_body = html_body
-        self._remember_saved_state()
+        self._remember_saved_state(version)
         self.update_ui(update_python_text=True)
         if not quiet and self.show_save_on_run:
             self.ui.show_save_on_run_dialog(self.save_on_run)
@@ -2050,6 +4061,7 @@ class App:
         self.modules_viewinfo[self.active_module] = python_viewinfo
         self.active_module = name
         self.modules[name] = ''
+        self.touch()
         self.update_ui(update_python_text=True)
 
     async def import_module(self, name, file_handle, current_python_code):
@@ -2059,6 +4071,7 @@ class App:
         self.modules[name] = contents.replace('\t', '    ')
         self.active_module = name
         console.log(f'Imported {file_handle.name} as {name}')
+        self.touch()
         self.update_ui(update_python_text=True)
 
     async def export_module(self, file_handle, current_python_code):
@@ -2077,12 +4090,14 @@ class App:
         del self.modules[old_name]
         self.active_module = new_name
         console.log(f'Module {old_name} renamed to {new_name}')
+        self.touch()
         self.update_ui(update_python_text=False)
 
     def remove_module(self):
         assert len(self.modules) > 1
         del self.modules[self.active_module]
         self.active_module = 'main'
+        self.touch()
         self.update_ui(update_python_text=True)
 
     def select_module(self, name, current_python_code, python_viewinfo):
@@ -2098,12 +4113,14 @@ class App:
         return list(self.sounds.keys())
 
     def get_sound(self, name):
-        """Get a sound by name."""
-        return self.sounds.get(name)
-
-    def add_sound(self, name, data_url):
-        """Add a new sound. If name already in sounds, replace that sound."""
-        self.sounds[name] = data_url
+        """Get a URL to play a sound by name."""
+        return self.assets.url(self.sounds.get(name))
+
+    async def add_sound(self, name, data):
+        """Add a new sound from a Blob or data URL. If name already in sounds, replace that sound."""
+        self.sounds[name] = await self.assets.add(data)
+        self._prune_assets()
+        self.touch()
         self.ui.update_sound_dialog()
 
     def rename_sound(self, old_name, new_name):
@@ -2112,12 +4129,15 @@ class App:
         assert new_name not in self.sounds
         self.sounds[new_name] = self.sounds[old_name]
         del self.sounds[old_name]
+        self.touch()
         self.ui.update_sound_dialog()
 
     def delete_sound(self, name):
         """Delete a sound."""
         assert name in self.sounds
         del self.sounds[name]
+        self._prune_assets()
+        self.touch()
         self.ui.update_sound_dialog()
 
     # Image management
@@ -2126,12 +4146,14 @@ class App:
         return list(self.images.keys())
 
     def get_image(self, name):
-        """Get an image by name."""
-        return self.images.get(name)
-
-    def add_image(self, name, data_url):
-        """Add a new image. If name already in images, replace that image."""
-        self.images[name] = data_url
+        """Get a URL to show an image by name."""
+        return self.assets.url(self.images.get(name))
+
+    async def add_image(self, name, data):
+        """Add a new image from a Blob or data URL. If name already in images, replace that image."""
+        self.images[name] = await self.assets.add(data)
+        self._prune_assets()
+        self.touch()
         self.ui.update_image_dialog()
 
     def rename_image(self, old_name, new_name):
@@ -2140,12 +4162,15 @@ class App:
         assert new_name not in self.images
         self.images[new_name] = self.images[old_name]
         del self.images[old_name]
+        self.touch()
         self.ui.update_image_dialog()
 
     def delete_image(self, name):
         """Delete an image."""
         assert name in self.images
         del self.images[name]
+        self._prune_assets()
+        self.touch()
         self.ui.update_image_dialog()
 
     # Resource (generic file) management
@@ -2153,11 +4178,13 @@ class App:
         return list(self.resources.keys())
 
     def get_resource(self, name):
-        return self.resources.get(name)
+        return self.assets.url(self.resources.get(name))
 
-    def add_resource(self, name, data_url):
-        """Add a file resource. If name already in resources, replace it."""
-        self.resources[name] = data_url
+    async def add_resource(self, name, data):
+        """Add a file resource from a Blob or data URL. If name already in resources, replace it."""
+        self.resources[name] = await self.assets.add(data)
+        self._prune_assets()
+        self.touch()
         self.ui.update_resource_dialog()
 
     def rename_resource(self, old_name, new_name):
@@ -2165,12 +4192,24 @@ class App:
         assert new_name not in self.resources
         self.resources[new_name] = self.resources[old_name]
         del self.resources[old_name]
+        self.touch()
         self.ui.update_resource_dialog()
 
     def delete_resource(self, name):
         assert name in self.resources
         del self.resources[name]
+        self._prune_assets()
+        self.touch()
         self.ui.update_resource_dialog()
 
+    def _asset_keys(self):
+        """Keys of all the assets in use, each once, in order."""
+        return list(dict.fromkeys([*self.sounds.values(), *self.images.values(),
+                                   *self.resources.values()]))
+
+    def _prune_assets(self):
+        """Forget asset data no longer referred to by any sound, image or resource."""
+        self.assets.prune(set(self._asset_keys()))
+
 
 app = App()
@@ -0,0 +1,2 @@
+// All of it: the html chunk takes @codemirror/autocomplete from here
+export * from "@codemirror/autocomplete"
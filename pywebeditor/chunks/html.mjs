@@ -0,0 +1,2 @@
+// The HTML mode (with its embedded CSS and JavaScript modes)
+export {html} from "@codemirror/lang-html"
@@ -0,0 +1 @@
+export {highlightSelectionMatches, openSearchPanel, searchKeymap} from "@codemirror/search"
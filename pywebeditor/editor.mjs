@@ -1,13 +1,109 @@
-import {basicSetup} from "codemirror"
-import {EditorState, Prec} from "@codemirror/state"
-import {EditorView, keymap} from "@codemirror/view"
-import {indentUnit} from "@codemirror/language"
-import {indentWithTab} from "@codemirror/commands"
+import * as state from "@codemirror/state"
+import * as view from "@codemirror/view"
+import * as language from "@codemirror/language"
+import * as common from "@lezer/common"
+import * as highlight from "@lezer/highlight"
+import * as lr from "@lezer/lr"
+import {Compartment, EditorState, Prec} from "@codemirror/state"
+import {EditorView, ViewPlugin, keymap, lineNumbers, highlightActiveLineGutter,
+        highlightSpecialChars, drawSelection, dropCursor, rectangularSelection,
+        crosshairCursor, highlightActiveLine} from "@codemirror/view"
+import {indentUnit, foldGutter, indentOnInput, syntaxHighlighting,
+        defaultHighlightStyle, bracketMatching, foldKeymap} from "@codemirror/language"
+import {defaultKeymap, history, historyKeymap, indentWithTab} from "@codemirror/commands"
 import {python} from "@codemirror/lang-python"
-import {html} from "@codemirror/lang-html"
+
+// The core bundle: the editor itself and the Python mode. The HTML mode,
+// autocompletion and search are separate chunks (see chunks/), loaded with
+// script tags -- which, unlike import(), also work from file:// -- when first
+// needed. Chunks take the packages below from here, so that there is only ever
+// one copy of each, as CodeMirror requires.
+window.pywebeditorShared = {state, view, language, common, highlight, lr};
+
+// Chunks sit next to this script
+const chunkBase = document.currentScript ? document.currentScript.src.replace(/[^/]*$/, "") : "";
+const chunkDeps = {html: ["autocomplete"]};
+const chunkLoads = {};
+
+function loadChunk(name) {
+    if (!chunkLoads[name]) {
+        chunkLoads[name] = Promise.all((chunkDeps[name] || []).map(loadChunk)).then(() =>
+            new Promise((resolve, reject) => {
+                const script = document.createElement("script");
+                script.src = `${chunkBase}pywebeditor-${name}.min.js`;
+                script.onload = () => resolve(window.pywebeditorChunks[name]);
+                script.onerror = () => {
+                    delete chunkLoads[name];  // Let a later use retry
+                    reject(new Error(`Could not load ${script.src}`));
+                };
+                document.head.appendChild(script);
+            }));
+    }
+    return chunkLoads[name];
+}
+
+const whenIdle = window.requestIdleCallback
+    ? (f) => window.requestIdleCallback(f, {timeout: 2000})
+    : (f) => setTimeout(f, 200);
+
+// An extension that is empty until chunk `name` loads, then configure(chunk).
+// Loads when the editor first takes focus, when one of `keys` is pressed (which
+// then runs with the chunk), or else once the browser is idle.
+function onDemand(name, configure, keys = []) {
+    const compartment = new Compartment();
+    const empty = [];
+    const load = (editor) => loadChunk(name).then((chunk) => {
+        if (compartment.get(editor.state) === empty) {
+            editor.dispatch({effects: compartment.reconfigure(configure(chunk))});
+        }
+        return chunk;
+    });
+    const loadQuietly = (editor) => { load(editor).catch(() => {}); };
+    return [
+        compartment.of(empty),
+        ViewPlugin.define((editor) => { whenIdle(() => loadQuietly(editor)); return {}; }),
+        EditorView.domEventHandlers({focus: (event, editor) => loadQuietly(editor)}),
+        keymap.of(keys.map(({key, run}) => ({
+            key,
+            run: (editor) => {
+                load(editor).then((chunk) => run(editor, chunk)).catch(() => {});
+                return true;
+            },
+        }))),
+    ];
+}
+
+// codemirror's basicSetup, minus what the chunks bring. Those come first, so
+// their keymaps take precedence, as in basicSetup.
+const editorSetup = [
+    onDemand("autocomplete", (chunk) => [
+        chunk.closeBrackets(),
+        chunk.autocompletion(),
+        keymap.of([...chunk.closeBracketsKeymap, ...chunk.completionKeymap]),
+    ]),
+    onDemand("search", (chunk) => [
+        chunk.highlightSelectionMatches(),
+        keymap.of(chunk.searchKeymap),
+    ], [{key: "Mod-f", run: (editor, chunk) => chunk.openSearchPanel(editor)}]),
+    lineNumbers(),
+    highlightActiveLineGutter(),
+    highlightSpecialChars(),
+    history(),
+    foldGutter(),
+    drawSelection(),
+    dropCursor(),
+    EditorState.allowMultipleSelections.of(true),
+    indentOnInput(),
+    syntaxHighlighting(defaultHighlightStyle, {fallback: true}),
+    bracketMatching(),
+    rectangularSelection(),
+    crosshairCursor(),
+    highlightActiveLine(),
+    keymap.of([...defaultKeymap, ...historyKeymap, ...foldKeymap]),
+];
 
 // Explicitly assign to window to prevent tree-shaking
-window.basicSetup    = basicSetup;
+window.editorSetup   = editorSetup;
 window.EditorState   = EditorState;
 window.Prec          = Prec;
 window.EditorView    = EditorView;
@@ -15,4 +111,4 @@ window.keymap        = keymap;
 window.indentUnit    = indentUnit;
 window.indentWithTab = indentWithTab;
 window.python        = python;
-window.html          = html;
+window.html          = () => onDemand("html", (chunk) => chunk.html());
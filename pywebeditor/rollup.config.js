@@ -1,24 +1,76 @@
+import {gzipSync} from 'node:zlib'
 import terser from '@rollup/plugin-terser'
 import {nodeResolve} from '@rollup/plugin-node-resolve'
 
-export default {
-    input: 'editor.mjs',
-    output: {
-        file: '../dist/pywebeditor.min.js',
-        format: 'iife'
-    },
-    plugins: [
-        nodeResolve(),
-        terser({
-            format: {
-                comments: false
-            },
-            compress: {
-                dead_code: true,
-                drop_console: true,
-                drop_debugger: true,
-                pure_funcs: ['console.log']
+// Packages the core bundle shares with the chunks, and where the chunks find them
+const SHARED = {
+    '@codemirror/state': 'pywebeditorShared.state',
+    '@codemirror/view': 'pywebeditorShared.view',
+    '@codemirror/language': 'pywebeditorShared.language',
+    '@lezer/common': 'pywebeditorShared.common',
+    '@lezer/highlight': 'pywebeditorShared.highlight',
+    '@lezer/lr': 'pywebeditorShared.lr',
+}
+
+// Chunks loaded by editor.mjs when first needed, and what each takes from other chunks
+const CHUNKS = {
+    html: {'@codemirror/autocomplete': 'pywebeditorChunks.autocomplete'},
+    autocomplete: {},
+    search: {},
+}
+
+// Prints the raw and gzipped size of each file written
+function sizeReport() {
+    const kb = (n) => `${(n / 1024).toFixed(1)} KB`.padStart(10)
+    return {
+        name: 'size-report',
+        writeBundle(options, bundle) {
+            for (const [file, output] of Object.entries(bundle)) {
+                const code = Buffer.from(output.type === 'chunk' ? output.code : output.source)
+                console.log(`${file.padEnd(34)}${kb(code.length)}${kb(gzipSync(code).length)} gzipped`)
             }
-        })
-    ]
+        }
+    }
 }
+
+const plugins = [
+    nodeResolve(),
+    terser({
+        format: {
+            comments: false
+        },
+        compress: {
+            dead_code: true,
+            drop_console: true,
+            drop_debugger: true,
+            pure_funcs: ['console.log']
+        }
+    }),
+    sizeReport()
+]
+
+export default [
+    {
+        input: 'editor.mjs',
+        output: {
+            file: '../dist/pywebeditor.min.js',
+            format: 'iife'
+        },
+        plugins
+    },
+    ...Object.entries(CHUNKS).map(([name, fromChunks]) => {
+        const globals = {...SHARED, ...fromChunks}
+        return {
+            input: `chunks/${name}.mjs`,
+            external: Object.keys(globals),
+            output: {
+                file: `../dist/pywebeditor-${name}.min.js`,
+                format: 'iife',
+                name: `pywebeditorChunks.${name}`,
+                extend: true,
+                globals
+            },
+            plugins
+        }
+    })
+]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Benchmark: base64-encoding a real library for export, three ways.
+
+  chunked      the pure-Python fallback, b64encode over 1023-byte chunks
+               (the original workaround for Brython's b64encode bugs)
+  non-chunked  a single b64encode over the whole UTF-8 encoding
+  native       the browser paths the codec layer prefers: TextEncoder +
+               Uint8Array.toBase64, btoa(unescape(encodeURIComponent())),
+               and FileReader.readAsDataURL on a Blob
+
+The input is the real ``dist/brython_stdlib.js`` (run ``make`` first), or a
+path given on the command line.
+
+Under plain CPython only chunked/non-chunked can be timed, and CPython's
+base64 is C, so those numbers say little about Brython. When Playwright and a
+built ``dist/`` are available, all three are also timed inside the offline
+editor page, where chunked/non-chunked run as real Brython code.
+
+Run:  python test/bench/bench_codec.py [path/to/library.js]
+"""
+
+import base64
+import inspect
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from browser_stub import REPO_ROOT, import_pywebedit  # noqa: E402
+
+pwe = import_pywebedit()
+
+DIST = os.path.join(REPO_ROOT, "dist")
+DEFAULT_INPUT = os.path.join(DIST, "brython_stdlib.js")
+CHUNK_SIZES = (1023, 3 * 1023, 30 * 1023)
+
+
+def _ms(fn, number=3):
+    best = None
+    for _ in range(number):
+        t0 = time.perf_counter()
+        fn()
+        dt = 1000 * (time.perf_counter() - t0)
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def bench_cpython(text):
+    rows = [(f"chunked ({n} B)", _ms(lambda n=n: pwe.b64encode_chunked(text, n)))
+            for n in CHUNK_SIZES]
+    rows.append(("non-chunked", _ms(lambda: base64.b64encode(text.encode("utf-8")).decode())))
+    return rows
+
+
+# Runs inside the editor page as Brython code; leaves timings on window.
+_BRYTHON_BENCH = """
+import base64
+from browser import window
+{chunked_source}
+text = window.__bench_text
+timings = {{}}
+for n in {chunk_sizes}:
+    t0 = window.performance.now()
+    b64encode_chunked(text, n)
+    timings['chunked (%d B)' % n] = window.performance.now() - t0
+t0 = window.performance.now()
+base64.b64encode(text.encode('utf-8')).decode()
+timings['non-chunked'] = window.performance.now() - t0
+window.__bench_brython = timings
+"""
+
+_NATIVE_BENCH_JS = """
+async (text) => {
+  const out = {};
+  let t0 = performance.now();
+  btoa(unescape(encodeURIComponent(text)));
+  out['native btoa'] = performance.now() - t0;
+  if (Uint8Array.prototype.toBase64) {
+    t0 = performance.now();
+    new TextEncoder().encode(text).toBase64();
+    out['native toBase64'] = performance.now() - t0;
+  }
+  t0 = performance.now();
+  await new Promise((resolve) => {
+    const reader = new FileReader();
+    reader.onload = resolve;
+    reader.readAsDataURL(new Blob([text]));
+  });
+  out['native FileReader'] = performance.now() - t0;
+  return out;
+}
+"""
+
+
+def bench_browser(text):
+    """Time Brython and native encoders in the offline editor page, or None."""
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        return None
+    if not os.path.exists(os.path.join(DIST, "index.html")):
+        return None
+    source = _BRYTHON_BENCH.format(chunked_source=inspect.getsource(pwe.b64encode_chunked),
+                                   chunk_sizes=list(CHUNK_SIZES))
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch()
+        context = browser.new_context()
+        context.set_offline(True)
+        page = context.new_page()
+        page.goto(Path(DIST, "index.html").as_uri())
+        page.wait_for_selector(".cm-editor", timeout=25000)
+        page.evaluate("(text) => { window.__bench_text = text; }", text)
+        page.evaluate("(src) => __BRYTHON__.runPythonSource(src, 'bench_codec')", source)
+        timings = page.evaluate("() => JSON.stringify(window.__bench_brython)")
+        rows = [(f"brython {k}", v) for k, v in json.loads(timings).items()]
+        rows += list(page.evaluate(_NATIVE_BENCH_JS, text).items())
+        browser.close()
+    return rows
+
+
+def _print(title, rows):
+    print(title)
+    for name, ms in rows:
+        print(f"  {name:<28} {ms:>10.1f} ms")
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_INPUT
+    if not os.path.exists(path):
+        sys.exit(f"Input not found: {path} (run `make` to fetch dist/brython_stdlib.js)")
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    print(f"Input: {path} ({len(text) / 1024 / 1024:.1f} MB)")
+    _print("CPython:", bench_cpython(text))
+    rows = bench_browser(text)
+    if rows is None:
+        print("Browser: skipped (needs Playwright and a built dist/)")
+    else:
+        _print("Browser (Chromium, offline editor page):", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Benchmark: the editor as a user meets it, in the browser (the perf tier).
+
+Each run opens the built editor from ``file://`` in a fresh browser context,
+as the e2e tests do, and records:
+
+  time_to_interactive  from navigation until both CodeMirror panes are mounted
+                       and the examples menu is populated
+  run_to_output        from clicking Run until the program has written its
+                       output in the window it opens
+  save                 from clicking Save until the page is written
+  export_bundled       from clicking the Export dialog's button, with brython
+                       and brython_stdlib ticked, until the page is written
+  example_load         from choosing an example until it's in the editors
+
+Nothing reaches the network: the CDN copies of the libraries are answered with
+the ones in ``dist/``, as a warm browser cache would, and all else is blocked.
+The file pickers are stood in for by fakes that count what is written.
+
+Prints, and with ``-o`` writes, JSON with the median and p95 of each metric, in
+ms, over the runs. Needs Playwright and a built ``dist/`` (run ``make``).
+
+Run:  python test/bench/bench_editor.py [--runs 10] [-o results.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+from pathlib import Path
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from browser_stub import REPO_ROOT  # noqa: E402
+
+DIST = os.path.join(REPO_ROOT, "dist")
+INDEX_URL = Path(DIST, "index.html").as_uri()
+EXAMPLE = "clock"
+TIMEOUT = 60000
+
+# In every page: note the time of each click and change, and stand in for the
+# save picker with a handle that notes when it has been written.
+_INIT_JS = """
+(() => {
+  window.__perf = {};
+  const now = () => performance.timeOrigin + performance.now();
+  document.addEventListener('click', () => { window.__perf.clicked = now(); }, true);
+  document.addEventListener('change', () => { window.__perf.changed = now(); }, true);
+  window.showSaveFilePicker = async (options) => ({
+    name: options.suggestedName,
+    createWritable: async () => {
+      let size = 0;
+      return {
+        write: async (data) => { size += data.size ?? data.length ?? data.byteLength ?? 0; },
+        close: async () => { window.__perf.written = {at: now(), size}; },
+      };
+    },
+  });
+})();
+"""
+
+_INTERACTIVE = """
+document.querySelectorAll('#html_editor .cm-editor, #python_editor .cm-editor').length === 2
+&& document.querySelectorAll('#examples optgroup').length > 0
+&& performance.now()
+"""
+
+_OUTPUT = """
+document.getElementById('text') && document.getElementById('text').textContent.length > 0
+&& performance.timeOrigin + performance.now()
+"""
+
+_WRITTEN = "window.__perf.written && window.__perf.written.at"
+
+
+def _wait_value(page, expression):
+    """Poll expression every 5 ms until truthy; returns its value."""
+    return page.wait_for_function(expression, polling=5, timeout=TIMEOUT).json_value()
+
+
+def _serve_from_dist(route):
+    """Answer library requests to a CDN from dist/; block everything else."""
+    url = route.request.url
+    if url.startswith("file:"):
+        route.continue_()
+        return
+    local = os.path.join(DIST, url.split("?")[0].rsplit("/", 1)[-1])
+    if url.startswith("https://") and os.path.isfile(local):
+        route.fulfill(path=local, headers={"access-control-allow-origin": "*",
+                                           "content-type": "text/javascript"})
+    else:
+        route.abort()
+
+
+def _close_dialogs(page):
+    """Dismiss the dialog the editor shows after a first save."""
+    for button in page.locator(".brython-dialog-button", has_text="Cancel").all():
+        if button.is_visible():
+            button.click()
+
+
+def measure(browser):
+    """One run of every metric, in a fresh context; returns {metric: ms}."""
+    context = browser.new_context()
+    context.add_init_script(_INIT_JS)
+    context.route("**/*", _serve_from_dist)
+    page = context.new_page()
+    times = {}
+    try:
+        page.goto(INDEX_URL)
+        times["time_to_interactive"] = _wait_value(page, _INTERACTIVE)
+
+        with page.expect_popup(timeout=TIMEOUT) as popup_info:
+            page.click("#btnrun")
+        popup = popup_info.value
+        output = _wait_value(popup, _OUTPUT)
+        times["run_to_output"] = output - page.evaluate("window.__perf.clicked")
+        popup.close()
+
+        page.click("#btnsave")
+        written = _wait_value(page, _WRITTEN)
+        times["save"] = written - page.evaluate("window.__perf.clicked")
+        _close_dialogs(page)
+
+        page.evaluate("window.__perf.written = null")
+        page.click("#btnexport")
+        page.check("#lib_brython")
+        page.check("#lib_brython_stdlib")
+        page.locator(".brython-dialog-button", has_text="Export").click()
+        written = _wait_value(page, _WRITTEN)
+        times["export_bundled"] = written - page.evaluate("window.__perf.clicked")
+        _close_dialogs(page)
+
+        page.select_option("#examples", EXAMPLE)
+        loaded = _wait_value(page, f"document.title.includes('{EXAMPLE}.html') "
+                                   "&& performance.timeOrigin + performance.now()")
+        times["example_load"] = loaded - page.evaluate("window.__perf.changed")
+    finally:
+        context.close()
+    return times
+
+
+def p95(values):
+    """The 95th percentile, by nearest rank."""
+    ordered = sorted(values)
+    return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+
+def summarize(runs):
+    """{metric: {median, p95, runs}} over a list of {metric: ms}."""
+    summary = {}
+    for metric in runs[0]:
+        values = [run[metric] for run in runs]
+        summary[metric] = {"median": round(statistics.median(values), 1),
+                           "p95": round(p95(values), 1),
+                           "runs": [round(v, 1) for v in values]}
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=10, help="runs of each metric")
+    ap.add_argument("-o", "--output", help="also write the JSON here")
+    args = ap.parse_args()
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        sys.exit("Needs Playwright (run `make test-setup`)")
+    if not os.path.exists(os.path.join(DIST, "index.html")):
+        sys.exit("Needs a built dist/ (run `make`)")
+
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch()
+        runs = [measure(browser) for _ in range(args.runs)]
+        version = browser.version
+        browser.close()
+
+    report = {"browser": f"chromium {version}", "python": platform.python_version(),
+              "runs": args.runs, "metrics": summarize(runs)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Benchmark: time to first output when running a page, two ways.
+
+  document.write  open an empty window and write the whole page into it
+                  (the Run path for an editor opened from a file)
+  blob URL        open an empty window and navigate it to an object URL of
+                  the page as a Blob (the Run path for an editor served over
+                  http(s))
+
+The page is the hello-world program with several MB of embedded assets, and
+with Brython and its stdlib inlined from the built ``dist/`` (run ``make``
+first), so no loads go to the network. Time is measured from starting to show
+the page until the program has written its output.
+
+Needs Playwright. The opener page is served from a local http server, as the
+blob URL path needs an http(s) origin. Record the results with the commit of
+any change to the Run path; none have been yet.
+
+Run:  python test/bench/bench_run.py [asset MB ...]
+"""
+
+import asyncio
+import base64
+import contextlib
+import functools
+import http.server
+import os
+import statistics
+import sys
+import tempfile
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from browser_stub import HELLO_BODY, HELLO_PY, REPO_ROOT, import_pywebedit  # noqa: E402
+
+pwe = import_pywebedit()
+
+DIST = os.path.join(REPO_ROOT, "dist")
+LIBS = (("brython", "brython.min.js"), ("brython_stdlib", "brython_stdlib.js"))
+ASSET_MB = (0, 4, 16)
+REPEATS = 5
+
+# Shows the page in a new window and resolves to the ms until #text is filled
+_RUN_JS = """
+async ([html, mode]) => {
+  const t0 = performance.now();
+  const w = window.open();
+  if (mode === 'blob') {
+    w.location.replace(URL.createObjectURL(new Blob([html], {type: 'text/html'})));
+  } else {
+    w.document.write(html);
+    w.document.close();
+  }
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 5));
+    try {
+      const text = w.document.getElementById('text');
+      if (text && text.textContent.length > 0) break;
+    } catch (e) {}  // Mid-navigation
+  }
+  const ms = performance.now() - t0;
+  w.close();
+  return ms;
+}
+"""
+
+
+def build_page(asset_mb):
+    app = pwe.App()
+    for lib, fname in LIBS:
+        with open(os.path.join(DIST, fname), encoding="utf-8") as f:
+            app.libraries[lib] = f.read()
+    if asset_mb:
+        payload = base64.b64encode(os.urandom(asset_mb * 1024 * 1024)).decode()
+        asyncio.run(app.add_resource("bench.bin", "data:application/octet-stream;base64," + payload))
+    return app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=[lib for lib, _ in LIBS])
+
+
+@contextlib.contextmanager
+def _serve(directory):
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+
+
+def main():
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        sys.exit("Needs Playwright (run `make test-setup`)")
+    if not all(os.path.exists(os.path.join(DIST, fname)) for _, fname in LIBS):
+        sys.exit("Needs a built dist/ (run `make`)")
+    sizes = [int(arg) for arg in sys.argv[1:]] or ASSET_MB
+
+    with tempfile.TemporaryDirectory() as root, _serve(root) as url:
+        with open(os.path.join(root, "index.html"), "w") as f:
+            f.write("<!doctype html><title>opener</title>")
+        with sync_playwright() as pw:
+            browser = pw.chromium.launch()
+            page = browser.new_context().new_page()
+            page.goto(url)
+            print(f"{'assets':>8} {'page':>8} {'document.write':>16} {'blob URL':>12}")
+            for asset_mb in sizes:
+                html = build_page(asset_mb)
+                medians = []
+                for mode in ("write", "blob"):
+                    runs = [page.evaluate(_RUN_JS, [html, mode]) for _ in range(REPEATS)]
+                    medians.append(statistics.median(runs))
+                print(f"{asset_mb:>6} MB {len(html) / 1024 / 1024:>5.1f} MB "
+                      f"{medians[0]:>13.0f} ms {medians[1]:>9.0f} ms")
+            browser.close()
+
+
+if __name__ == "__main__":
+    main()
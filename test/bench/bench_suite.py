@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Benchmark suite: the export and load hot paths, against a saved baseline.
+
+Times, under CPython on the same ``browser`` stub as the logic tests:
+
+  build_html          synthetic projects of 1 to 200 modules and 0 to 50 MB of
+                      assets
+  split_html          reading those projects' pages back
+  encode_js_for_html  a 1 and a 4 MB library, at several chunk sizes of the
+                      pure-Python encoder (the one the stub reaches)
+  parse_str_str_dict  the old name -> data URL dict format, 10 to 10000 entries
+
+Each case reports its best time of a few runs. With ``--save`` the results are
+written as a JSON baseline; otherwise they are compared with the baseline, if
+there is one, and the run fails (exit status 1) when any case is slower than
+its baseline by more than the threshold -- ignoring differences under
+``--min-ms``, which are noise. Baselines only compare on the same machine, so
+the default one lives in the git-ignored ``test/output/``.
+
+Run:  python test/bench/bench_suite.py [--save] [--baseline PATH]
+                                       [--threshold 0.25] [-k SUBSTRING] [--quick]
+Or:   make bench / make bench-baseline
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from browser_stub import HELLO_BODY, HELLO_PY, import_pywebedit  # noqa: E402
+
+pwe = import_pywebedit()
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(HERE), "output", "bench_baseline.json")
+MODULES = (1, 20, 200)
+ASSET_MB = (0, 5, 50)
+LIBRARY_MB = (1, 4)
+CHUNK_SIZES = (1023, 3 * 1023, 30 * 1023)
+DICT_ENTRIES = (10, 1000, 10000)
+ASSET_FILE_MB = 5  # Assets come in files of up to this size
+
+
+def _best_ms(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = 1000 * (time.perf_counter() - t0)
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def make_project(modules, asset_mb):
+    """An App with modules modules (main included) and asset_mb MB of resources."""
+    app = pwe.App()
+    for i in range(1, modules):
+        app.modules[f"module{i}"] = f"# module {i}\n" + HELLO_PY * 10
+    remaining = asset_mb * 1024 * 1024
+    for i in range(0, remaining, ASSET_FILE_MB * 1024 * 1024):
+        size = min(ASSET_FILE_MB * 1024 * 1024, remaining - i)
+        payload = base64.b64encode(os.urandom(size)).decode()
+        asyncio.run(app.add_resource(f"asset{i}.bin",
+                                     "data:application/octet-stream;base64," + payload))
+    return app
+
+
+def cases(quick=False):
+    """Yield (name, setup) pairs; setup() returns the function to time."""
+    modules = MODULES[:2] if quick else MODULES
+    asset_mb = ASSET_MB[:2] if quick else ASSET_MB
+    for n in modules:
+        for mb in asset_mb:
+            def build(n=n, mb=mb):
+                app = make_project(n, mb)
+                return lambda: app.build_html(HELLO_BODY, HELLO_PY)
+
+            def split(n=n, mb=mb):
+                html = make_project(n, mb).build_html(HELLO_BODY, HELLO_PY)
+                return lambda: pwe.App().split_html(html)
+
+            yield f"build_html modules={n} assets={mb}MB", build
+            yield f"split_html modules={n} assets={mb}MB", split
+    for mb in LIBRARY_MB[:1] if quick else LIBRARY_MB:
+        for chunk_size in CHUNK_SIZES:
+            def encode(mb=mb, chunk_size=chunk_size):
+                library = "var x = 'é';\n" * (mb * 1024 * 1024 // 16)
+                return lambda: pwe.encode_js_for_html(library, chunk_size)
+
+            yield f"encode_js_for_html library={mb}MB chunk={chunk_size}", encode
+    for entries in DICT_ENTRIES[:2] if quick else DICT_ENTRIES:
+        def parse(entries=entries):
+            s = "{" + ", ".join(f"'name{i}': 'data:text/plain;base64,{'QUFB' * 64}'"
+                                for i in range(entries)) + "}"
+            return lambda: pwe.parse_str_str_dict(s)
+
+        yield f"parse_str_str_dict entries={entries}", parse
+
+
+def run(quick=False, keyword=None, repeat=5):
+    """Time the cases; returns {name: best ms}."""
+    results = {}
+    for name, setup in cases(quick):
+        if keyword and keyword not in name:
+            continue
+        results[name] = _best_ms(setup(), repeat)
+    return results
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Rows of (name, ms, baseline ms or None, regressed) for the results."""
+    rows = []
+    for name, ms in results.items():
+        base = baseline.get(name)
+        regressed = base is not None and ms > base * (1 + threshold) and ms - base > min_ms
+        rows.append((name, ms, base, regressed))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    ap.add_argument("--save", action="store_true", help="write the results as the baseline")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="fail when a case is this fraction slower than its baseline")
+    ap.add_argument("--min-ms", type=float, default=1.0,
+                    help="ignore slowdowns smaller than this")
+    ap.add_argument("-k", dest="keyword", help="only run cases whose name contains this")
+    ap.add_argument("--quick", action="store_true", help="skip the largest cases")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per case; the best counts")
+    args = ap.parse_args()
+
+    results = run(args.quick, args.keyword, args.repeat)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, f, indent=2)
+            f.write("\n")
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    rows = compare(results, baseline, args.threshold, args.min_ms)
+    width = max(len(name) for name, *_ in rows) if rows else 0
+    print(f"{'case':<{width}} {'ms':>10} {'baseline':>10} {'change':>8}")
+    for name, ms, base, regressed in rows:
+        if base is None:
+            print(f"{name:<{width}} {ms:>10.2f} {'-':>10} {'-':>8}")
+        else:
+            mark = "  REGRESSED" if regressed else ""
+            print(f"{name:<{width}} {ms:>10.2f} {base:>10.2f} {(ms / base - 1) * 100:>+7.0f}%{mark}")
+
+    if args.save:
+        print(f"Saved baseline to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline} (save one with --save)")
+    regressions = [name for name, *_, regressed in rows if regressed]
+    if regressions:
+        sys.exit(f"{len(regressions)} case(s) over {args.threshold:.0%} slower than the baseline")
+
+
+if __name__ == "__main__":
+    main()
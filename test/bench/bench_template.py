@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark: page template rendering vs. size of the bundled libraries.
+
+``build_html`` used to fill ``PAGE_TEMPLATE`` with one ``str.replace`` per
+placeholder. Once ``%libraries%`` was substituted, every later replace
+rescanned and copied the whole multi-MB page, so render time grew with
+(number of tags) x (library size). ``Template`` parses the template once and
+renders in a single pass, splicing the library payload in as a part.
+
+This times both on the real ``PAGE_TEMPLATE`` with fake library payloads of
+increasing size. The single-pass column should stay flat.
+
+Run:  python test/bench/bench_template.py
+"""
+
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from browser_stub import HELLO_BODY, HELLO_PY, import_pywebedit  # noqa: E402
+
+pwe = import_pywebedit()
+
+SIZES_MB = (0, 1, 4, 16)
+
+
+def _tagmap(libraries):
+    """Values for every placeholder of PAGE_TEMPLATE: the libraries and the
+    hello-world program, and empty values for the rest (no modules or
+    assets), so the map keeps up with the template."""
+    tagmap = dict.fromkeys(pwe.PAGE_TEMPLATE.keys(), "")
+    tagmap.update(pwe.SCRIPT_TAGS, libraries=libraries, html_body=HELLO_BODY,
+                  python_code=HELLO_PY)
+    return tagmap
+
+
+def _page_template_text():
+    """The page template as raw text, placeholders intact."""
+    return "".join(f"%{text}%" if is_key else text
+                   for is_key, text in pwe.PAGE_TEMPLATE.segments)
+
+
+def render_replace_loop(text, tagmap):
+    """The previous approach: one full-page str.replace per placeholder."""
+    for key, value in tagmap.items():
+        text = text.replace("%" + key + "%", value)
+    return text
+
+
+def render_single_pass(tagmap):
+    return pwe.PAGE_TEMPLATE.render_parts(dict(tagmap, libraries=[tagmap["libraries"]]))
+
+
+def bench(number=5):
+    """Return [(size_mb, replace_loop_ms, single_pass_ms)]."""
+    text = _page_template_text()
+    rows = []
+    for size_mb in SIZES_MB:
+        tagmap = _tagmap("x" * (size_mb * 1024 * 1024))
+        t_replace = timeit.timeit(lambda: render_replace_loop(text, tagmap), number=number)
+        t_single = timeit.timeit(lambda: render_single_pass(tagmap), number=number)
+        rows.append((size_mb, 1000 * t_replace / number, 1000 * t_single / number))
+    return rows
+
+
+def main():
+    print(f"{'libraries':>10} {'replace loop':>14} {'single pass':>13}")
+    for size_mb, t_replace, t_single in bench():
+        print(f"{size_mb:>7} MB {t_replace:>11.3f} ms {t_single:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,20 @@ CDN-with-local-fallback wiring that lets everything work with no internet.
   8. test_font_resource_applies_offline ..... an embedded font, reached via
                                      window.RESOURCES, loads via @font-face offline.
   9. test_add_file_and_preview ...... a loaded file keeps its name and previews.
+ 10. test_compressed_export_runs_offline .... an export with gzipped libraries
+                                     and a tree-shaken stdlib inflates them
+                                     natively and runs offline.
+ 11. test_example_loads_when_chosen ......... choosing an example loads its own
+                                     gzipped file, from disk, into the editors.
+ 12. test_editor_runs_precompiled ........... the editor runs the JavaScript
+                                     precompiled at build time, and still comes
+                                     up from its source when that is missing.
+ 13. test_editor_chunks_load_on_demand ...... the HTML mode and search, split out
+                                     of the CodeMirror bundle, load from disk
+                                     when first used.
+ 14. test_hosted_editor_works_offline ....... served over http, the editor
+                                     caches itself with its service worker, and
+                                     then starts with the network gone.
 
 Requires Playwright + its Chromium browser, and a built ``dist/`` (run ``make``).
 Tests skip cleanly, with guidance, if either is missing.
@@ -45,11 +59,15 @@ Run directly:  test/.venv/bin/python test/test_e2e.py
 Or via:        test/.venv/bin/python test/run.py
 """
 
+import asyncio
 import base64
 import os
 import contextlib
+import functools
+import http.server
 import struct
 import sys
+import threading
 import unittest
 import zlib
 from pathlib import Path
@@ -74,7 +92,12 @@ REQUIRED_DIST = [
     "brython.min.js",
     "brython_stdlib.js",
     "pywebeditor.min.js",
+    "pywebeditor-html.min.js",
+    "pywebeditor-autocomplete.min.js",
+    "pywebeditor-search.min.js",
     "examples.js",
+    "pywebedit.compiled.js",
+    "sw.js",
 ]
 
 # Brython reports errors to an on-screen div rather than throwing, but a working
@@ -92,15 +115,28 @@ def _dist_ready():
     return all(os.path.exists(os.path.join(DIST, f)) for f in REQUIRED_DIST)
 
 
-def _standalone(body, py, resources=None):
+def _standalone(body, py, resources=None, options=None):
     """Build a standalone HTML file via the real export path (Brython inlined)."""
     app = pwe.App()
     for lib, fname in (("brython", "brython.min.js"), ("brython_stdlib", "brython_stdlib.js")):
         with open(os.path.join(DIST, fname), encoding="utf-8") as f:
             app.libraries[lib] = f.read()
-    if resources:
-        app.resources = resources
-    return app.build_html(body, py, libs_to_bundle=["brython", "brython_stdlib"])
+    for name, data_url in (resources or {}).items():
+        asyncio.run(app.add_resource(name, data_url))
+    return app.build_html(body, py, libs_to_bundle=["brython", "brython_stdlib"], options=options)
+
+
+@contextlib.contextmanager
+def _serve(directory):
+    """Serve a directory over http on localhost; yields its url."""
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
 
 
 def _data_url(mime, raw_bytes):
@@ -139,7 +175,7 @@ def _tiny_png(w, h, rgba=(220, 40, 40, 255)):
 
 # Stand in for the File System Access picker (a native dialog Playwright can't
 # drive). Returns a handle whose getFile() yields the bytes we hand it, so the
-# real read_file_as_data_url -> add_sound/add_image path runs unchanged. Also
+# real getFile -> add_sound/add_image path runs unchanged. Also
 # spies on HTMLMediaElement play()/pause() so the sound test can confirm both.
 _FAKE_PICKER_JS = """
 ([b64, name, mime]) => {
@@ -366,6 +402,85 @@ class BrowserE2E(unittest.TestCase):
                 "() => document.body.innerText.includes('PREVIEW-MARKER')", timeout=10000
             )
 
+    # --- 10. A compressed, tree-shaken export still runs offline -------------
+    def test_compressed_export_runs_offline(self):
+        options = pwe.ExportOptions(stdlib_subset=True, compress=True)
+        html = _standalone(HELLO_BODY, HELLO_PY, options=options)
+        self.assertLess(len(html), len(_standalone(HELLO_BODY, HELLO_PY)) / 3)
+        out = _write_output("standalone_compressed.html", html)
+        with self._offline_file_page(out) as (page, external, errors):
+            page.wait_for_function(TEXT_READY, timeout=25000)
+            self.assertEqual(
+                page.eval_on_selector("#text", "el => el.textContent"), "Hello, World!"
+            )
+            self.assertEqual(external, [], f"file made external requests: {external}")
+            self.assertEqual(errors, [], f"unexpected page errors: {errors}")
+
+    # --- 11. An example is loaded from its own file when chosen -------------
+    def test_example_loads_when_chosen(self):
+        with self._editor_page() as (page, errors):
+            self.assertFalse(page.evaluate("'EXAMPLES_PAYLOADS' in window"))
+            page.select_option("#examples", "clock")
+            page.wait_for_function("document.title.includes('clock.html')", timeout=25000)
+            self.assertIn("clock", page.inner_text("#python_editor").lower())
+            self.assertEqual(errors, [], f"unexpected page errors: {errors}")
+
+    # --- 12. The editor runs precompiled, with the source as fallback -------
+    def test_editor_runs_precompiled(self):
+        with self._editor_page() as (page, errors):
+            self.assertTrue(page.evaluate("typeof pywebeditPrecompiled === 'function'"))
+            self.assertIn("Hello, World!", page.inner_text("#python_editor"))
+            self.assertEqual(errors, [], f"unexpected page errors: {errors}")
+
+        context = self._offline_context()
+        context.route("**/pywebedit.compiled.js*", lambda route: route.abort())
+        page = context.new_page()
+        errors = []
+        page.on("pageerror", lambda e: errors.append(str(e)))
+        try:
+            page.goto(INDEX_URL)
+            page.wait_for_selector(".cm-editor", timeout=25000)
+            self.assertFalse(page.evaluate("typeof pywebeditPrecompiled === 'function'"))
+            self.assertIn("Hello, World!", page.inner_text("#python_editor"))
+            self.assertEqual(errors, [], f"unexpected page errors: {errors}")
+        finally:
+            context.close()
+
+    # --- 13. CodeMirror chunks load when first used --------------------------
+    def test_editor_chunks_load_on_demand(self):
+        with self._editor_page() as (page, errors):
+            page.click("#html_editor .cm-content")
+            page.wait_for_function("window.pywebeditorChunks && pywebeditorChunks.html", timeout=10000)
+            self.assertTrue(page.evaluate("!!pywebeditorChunks.autocomplete"))  # html needs it
+            page.click("#python_editor .cm-content")
+            page.keyboard.press("ControlOrMeta+f")
+            page.wait_for_selector("#python_editor .cm-search", timeout=10000)
+            self.assertEqual(errors, [], f"unexpected page errors: {errors}")
+
+    # --- 14. Served over http, the editor then works offline ----------------
+    def test_hosted_editor_works_offline(self):
+        with _serve(DIST) as url:
+            context = self.browser.new_context()
+            # Stand in for the CDN, which the worker answers with the local copies
+            context.route("https://**/*", lambda route: route.abort())
+            page = context.new_page()
+            errors = []
+            page.on("pageerror", lambda e: errors.append(str(e)))
+            try:
+                page.goto(url)
+                page.wait_for_selector(".cm-editor", timeout=25000)
+                page.evaluate("navigator.serviceWorker.ready")
+                page.reload()  # Now under the worker
+                page.wait_for_selector(".cm-editor", timeout=25000)
+                self.assertTrue(page.evaluate("!!navigator.serviceWorker.controller"))
+                context.set_offline(True)
+                page.reload()
+                page.wait_for_selector(".cm-editor", timeout=25000)
+                self.assertIn("Hello, World!", page.inner_text("#python_editor"))
+                self.assertEqual(errors, [], f"unexpected page errors: {errors}")
+            finally:
+                context.close()
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
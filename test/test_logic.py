@@ -8,18 +8,40 @@ behind a fake ``browser`` module (see ``browser_stub``).
 Covered:
   * importing the Brython app under CPython
   * ``build_html`` -> ``split_html`` round-trip (body, modules, sounds, images)
+  * the linear, copy-free scan of saved pages, robust to script-like text
+  * the JSON asset manifest (format 2), and loading pages saved before it
+  * opening progressively: code first, then the assets, with progress
+  * the single-pass ``Template`` renderer used for the page and module templates
   * ``encode_js_for_html`` base64 round-trip (ascii, unicode, >1 chunk)
+  * the codec layer's native-first routing and its pure-Python fallbacks
   * the small string helpers (parse_str_str_dict / extract_between / ...)
   * standalone export shape: libraries inlined as ``data:`` URLs, no http(s)
-  * the build scripts that assemble the editor (examples.py, tagreplace.py)
+  * streaming export: the page as an ordered list of parts (build_html_parts)
+  * the size-limited cache of encoded library payloads
+  * the content-addressed asset store: each distinct asset stored and saved once,
+    kept as Blobs in the browser and only encoded as data URLs when written
+  * the persistent library store (integrity check) and background prefetch
+  * concurrent library fetching and matching picked files to libraries
+  * bundling only the reachable part of the Brython stdlib
+  * gzip-compressed library bundles, inflated in order by the page
+  * modules stored precompiled to JavaScript, compiled once per source
+  * estimating an export's size per library, module and asset, without a build
+  * loading an example from its own file only when it's chosen
+  * timing the hot paths as trace spans, only while tracing is on
+  * the build scripts that assemble the editor (examples.py, tagreplace.py,
+    precompile.py, serviceworker.py)
+  * change tracking by version counter (anything_modified, the title bar mark)
 
 Run directly:  python test/test_logic.py
 Or via:        python test/run.py --logic-only
 """
 
+import ast
 import asyncio
 import base64
 import contextlib
+import gzip
+import hashlib
 import importlib.util
 import io
 import json
@@ -45,6 +67,20 @@ def _decode_data_url_scripts(html):
     return out
 
 
+def _v1_page(html, asset_precode):
+    """The page as saved before the asset manifest: asset_precode (python
+    dict literals) in the precode, and no manifest or payload blocks."""
+    start = html.index("# The manifest lists")
+    end = html.index("# Now run main code")
+    tail = html.index('\n<script type="application/json" id="__pwe-manifest">')
+    return html[:start] + asset_precode + html[end:tail] + "\n</body>\n</html>"
+
+
+def _manifest(html):
+    layout = pwe.scan_page(html)
+    return json.loads(html[layout.manifest[0]:layout.manifest[1]])
+
+
 @contextlib.contextmanager
 def _stub_dialogs(typed=(), events=None, picked_name=None):
     """Drive pywebedit's async name workflows without a browser.
@@ -90,6 +126,69 @@ def _stub_dialogs(typed=(), events=None, picked_name=None):
             setattr(pwe, name, value)
 
 
+class _Promise:
+    """Enough of a native Promise, on asyncio, to run pywebedit's
+    Promise-based helpers as they are."""
+
+    def __init__(self, executor):
+        self.future = asyncio.get_running_loop().create_future()
+        executor(self._resolve, self._reject)
+
+    def _resolve(self, value):
+        if not self.future.done():
+            self.future.set_result(value)
+
+    def _reject(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+    def __await__(self):
+        return self.future.__await__()
+
+    new = classmethod(lambda cls, executor: cls(executor))
+    all = staticmethod(lambda promises: asyncio.gather(*(p.future for p in promises)))
+
+
+@contextlib.contextmanager
+def _asyncio_promises():
+    """Give pywebedit native Promises, AbortControllers and aio.run, on asyncio."""
+
+    def run(coro, onsuccess, onerror):
+        def done(task):
+            if task.exception() is not None:
+                onerror(task.exception())
+            else:
+                onsuccess(task.result())
+
+        asyncio.ensure_future(coro).add_done_callback(done)
+
+    saved = {n: getattr(pwe, n) for n in ("window", "aio")}
+    controller = lambda: SimpleNamespace(abort=lambda: None)
+    try:
+        pwe.window = SimpleNamespace(Promise=_Promise,
+                                     AbortController=SimpleNamespace(new=controller))
+        pwe.aio = SimpleNamespace(run=run)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(pwe, name, value)
+
+
+@contextlib.contextmanager
+def _asyncio_gather():
+    """Run pywebedit's Promise-based gather on asyncio instead."""
+    saved = pwe.gather
+
+    async def _gather(*coros):
+        return list(await asyncio.gather(*coros))
+
+    pwe.gather = _gather
+    try:
+        yield
+    finally:
+        pwe.gather = saved
+
+
 class StringHelpers(unittest.TestCase):
     def test_strip_extension(self):
         self.assertEqual(pwe.strip_extension("game.html"), "game")
@@ -101,6 +200,12 @@ class StringHelpers(unittest.TestCase):
         with self.assertRaises(ValueError):
             pwe.extract_between("nope", "[", "]")
 
+    def test_find_between_is_bounded(self):
+        s = "[a] [b] [c]"
+        self.assertEqual(pwe.find_between(s, "[", "]", 3), (5, 6))
+        with self.assertRaises(ValueError):
+            pwe.find_between(s, "[", "]", 3, 6)  # closing token is past the end
+
     def test_urlname(self):
         self.assertEqual(
             pwe.urlname("https://cdn.example.com/a/b/lib.min.js"), "lib.min.js"
@@ -115,6 +220,55 @@ class StringHelpers(unittest.TestCase):
         self.assertEqual(pwe.parse_str_str_dict(""), {})
         self.assertEqual(pwe.parse_str_str_dict("   "), {})
 
+    def test_parse_str_str_dict_in_place(self):
+        s = "x = {'a':'1',\n'b':'2'}; y = {'c':'3'}"
+        i, j = pwe.find_between(s, "x = {", "}")
+        self.assertEqual(pwe.parse_str_str_dict(s, i, j), {"a": "1", "b": "2"})
+
+
+class TemplateRendering(unittest.TestCase):
+    def test_parses_placeholders_once(self):
+        t = pwe.Template("a %x% b %y_z%%x%")
+        self.assertEqual(t.keys(), {"x", "y_z"})
+        self.assertEqual(t.render(x="1", y_z="2"), "a 1 b 21")
+
+    def test_lone_percent_is_literal(self):
+        t = pwe.Template("100% of %name%, 5 % 3")
+        self.assertEqual(t.keys(), {"name"})
+        self.assertEqual(t.render(name="it"), "100% of it, 5 % 3")
+
+    def test_values_are_not_rescanned(self):
+        # The old replace loop substituted placeholders that appeared inside
+        # earlier values (e.g. user html mentioning %sounds%).
+        t = pwe.Template("%a%|%b%")
+        self.assertEqual(t.render(a="%b%", b="B"), "%b%|B")
+
+    def test_render_parts_splices_lists(self):
+        t = pwe.Template("<%lib%>")
+        self.assertEqual(t.render_parts({"lib": ["p1", "", "p2"]}), ["<", "p1", "p2", ">"])
+
+    def test_missing_value_raises(self):
+        with self.assertRaises(KeyError):
+            pwe.Template("%a%").render()
+
+    def test_user_text_with_placeholders_survives_build(self):
+        app = pwe.App()
+        body = "<p>100% of %sounds% and %script%</p>"
+        html = app.build_html(body, HELLO_PY)
+        self.assertIn(body, html)
+
+    def test_template_benchmark_renders_the_page(self):
+        """bench_template.py fills every placeholder of the real page template."""
+        path = os.path.join(HERE, "bench", "bench_template.py")
+        spec = importlib.util.spec_from_file_location("bench_template", path)
+        bench_template = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(bench_template)
+        tagmap = bench_template._tagmap("var lib;")
+        page = "".join(bench_template.render_single_pass(tagmap))
+        self.assertIn("var lib;", page)
+        self.assertEqual(page, bench_template.render_replace_loop(
+            bench_template._page_template_text(), tagmap))
+
 
 class EncodeJsForHtml(unittest.TestCase):
     def _roundtrip(self, js):
@@ -136,6 +290,59 @@ class EncodeJsForHtml(unittest.TestCase):
         self._roundtrip("x=" + ("ABCDEFGHIJ" * 500) + ";")
 
 
+class Codec(unittest.TestCase):
+    """The codec layer prefers native browser paths; under CPython (no
+    browser) it must fall back to the pure-Python ones."""
+
+    TEXT = "const s = 'héllo • wörld — ✓';" * 100
+
+    def test_fallback_without_browser(self):
+        self.assertIsNone(pwe.native(pwe.window, "btoa"))
+        b64 = pwe.b64encode_utf8(self.TEXT)
+        self.assertEqual(b64, base64.b64encode(self.TEXT.encode("utf-8")).decode())
+        self.assertEqual(pwe.b64decode_utf8(b64), self.TEXT)
+
+    def test_chunked_matches_unchunked(self):
+        for chunk_size in (1, 3, 100, 1023, 10**6):
+            self.assertEqual(pwe.b64encode_chunked(self.TEXT, chunk_size),
+                             base64.b64encode(self.TEXT.encode("utf-8")).decode())
+
+    def test_prefers_btoa_when_available(self):
+        calls = []
+
+        def btoa(binary):
+            calls.append("btoa")
+            return base64.b64encode(binary.encode("latin-1")).decode()
+
+        def atob(b64):
+            calls.append("atob")
+            return base64.b64decode(b64).decode("latin-1")
+
+        # Python stand-ins for the JS UTF-8 <-> "binary string" round trip
+        fake = SimpleNamespace(
+            btoa=btoa, atob=atob,
+            encodeURIComponent=lambda s: s.encode("utf-8").decode("latin-1"),
+            unescape=lambda s: s,
+            escape=lambda s: s,
+            decodeURIComponent=lambda s: s.encode("latin-1").decode("utf-8"))
+        saved = pwe.window
+        try:
+            pwe.window = fake
+            b64 = pwe.b64encode_utf8(self.TEXT)
+            self.assertEqual(pwe.b64decode_utf8(b64), self.TEXT)
+        finally:
+            pwe.window = saved
+        self.assertEqual(calls, ["btoa", "atob"])
+        self.assertEqual(b64, base64.b64encode(self.TEXT.encode("utf-8")).decode())
+
+    def test_gzip_b64_roundtrip(self):
+        self.assertEqual(pwe.gunzip_b64(pwe.gzip_b64(self.TEXT)), self.TEXT)
+        self.assertEqual(asyncio.run(pwe.gunzip_b64_native(pwe.gzip_b64(self.TEXT))), self.TEXT)
+
+    def test_data_url_payload(self):
+        self.assertEqual(pwe.data_url_payload("data:text/css;base64,Ym9keXt9"), "Ym9keXt9")
+
+
 class BuildHtmlBasics(unittest.TestCase):
     def setUp(self):
         self.app = pwe.App()
@@ -151,10 +358,27 @@ class BuildHtmlBasics(unittest.TestCase):
         self.assertIn('<script type="text/python" id="brythonpre">', html)
         self.assertIn("__brython_pre_then_code", html)
 
-    def test_empty_assets_render_empty_dicts(self):
+    def test_modules_registered_for_import_on_demand(self):
+        self.app.modules["util"] = "X = 1\n"
+        self.app.modules["helper"] = "Y = 2\n"
+        html = self.app.build_html(HELLO_BODY, HELLO_PY)
+        # Handed to Brython's importer with the hash of their source, not run up front
+        registered = json.loads(re.search(r"__pwe_register_modules\((\[.*\])\);", html).group(1))
+        self.assertEqual(registered, [["util", hashlib.sha256(b"X = 1\n").hexdigest()],
+                                      ["helper", hashlib.sha256(b"Y = 2\n").hexdigest()]])
+        self.assertNotIn("runPythonSource", html)
+
+    def test_empty_assets_render_empty_manifest(self):
         html = self.app.build_html(HELLO_BODY, HELLO_PY)
-        self.assertIn("window.SOUNDS = {}", html)
-        self.assertIn("window.IMAGES = {}", html)
+        self.assertEqual(_manifest(html), {"version": 2, "assets": [], "sounds": {},
+                                           "images": {}, "resources": {}})
+
+    def test_base_href_precedes_library_loaders(self):
+        html = self.app.build_html_parts(HELLO_BODY, HELLO_PY, base_href="http://host/pwe/")
+        html = "".join(html)
+        self.assertIn('<base href="http://host/pwe/">', html)
+        self.assertLess(html.index("<base "), html.index(pwe.JSLIBS["brython"][2]))
+        self.assertNotIn("<base ", self.app.build_html(HELLO_BODY, HELLO_PY))
 
     def test_unbundled_uses_cdn_loader_with_fallback(self):
         html = self.app.build_html(HELLO_BODY, HELLO_PY)
@@ -170,9 +394,9 @@ class RoundTrip(unittest.TestCase):
 
     def test_full_roundtrip(self):
         app = pwe.App()
-        app.sounds = {"laser": "data:audio/mpeg;base64,QUFBQQ=="}
-        app.images = {"bunny": "data:image/png;base64,Qk1Q"}
-        app.resources = {"style.css": "data:text/css;base64,Ym9keXt9"}
+        asyncio.run(app.add_sound("laser", "data:audio/mpeg;base64,QUFBQQ=="))
+        asyncio.run(app.add_image("bunny", "data:image/png;base64,Qk1Q"))
+        asyncio.run(app.add_resource("style.css", "data:text/css;base64,Ym9keXt9"))
         app.modules["util"] = "PI = 3.14159\n\ndef area(r):\n    return PI * r * r\n"
         html = app.build_html(HELLO_BODY, HELLO_PY)
 
@@ -182,9 +406,9 @@ class RoundTrip(unittest.TestCase):
         self.assertEqual(body.strip(), HELLO_BODY.strip())
         self.assertEqual(modules["main"].strip(), HELLO_PY.strip())
         self.assertEqual(modules["util"].strip(), app.modules["util"].strip())
-        self.assertEqual(sounds, app.sounds)
-        self.assertEqual(images, app.images)
-        self.assertEqual(resources, app.resources)
+        self.assertEqual(sounds, {"laser": app.get_sound("laser")})
+        self.assertEqual(images, {"bunny": app.get_image("bunny")})
+        self.assertEqual(resources, {"style.css": app.get_resource("style.css")})
 
     def test_roundtrip_no_assets(self):
         app = pwe.App()
@@ -199,15 +423,382 @@ class RoundTrip(unittest.TestCase):
     def test_old_file_without_resources_block_loads(self):
         """Files saved before RESOURCES existed must still load (resources empty)."""
         app = pwe.App()
-        app.add_sound("laser", "data:audio/mpeg;base64,QUFBQQ==")
+        asyncio.run(app.add_sound("laser", "data:audio/mpeg;base64,QUFBQQ=="))
         html = app.build_html(HELLO_BODY, HELLO_PY)
-        old = html.replace("window.RESOURCES = {}", "")  # simulate a pre-RESOURCES file
-        self.assertNotIn("window.RESOURCES = {", old)
+        old = _v1_page(html, "window.SOUNDS = {'laser':'data:audio/mpeg;base64,QUFBQQ=='}\n\n"
+                             "window.IMAGES = {}\n\n")  # simulate a pre-RESOURCES file
         _, _, sounds, images, resources = pwe.App().split_html(old)
         self.assertEqual(sounds, {"laser": "data:audio/mpeg;base64,QUFBQQ=="})
         self.assertEqual(resources, {})
 
 
+class _CountingStr(str):
+    """A string that counts the characters its searches look at, and those
+    its slices copy."""
+
+    searched = 0
+    copied = 0
+
+    def _bounds(self, start, end):
+        start = 0 if start is None else start
+        end = len(self) if end is None else end
+        return start, end
+
+    def find(self, sub, start=None, end=None):
+        i = super().find(sub, start, end)
+        start, end = self._bounds(start, end)
+        self.searched += (end - start) if i < 0 else (i + len(sub) - start)
+        return i
+
+    def rfind(self, sub, start=None, end=None):
+        i = super().rfind(sub, start, end)
+        start, end = self._bounds(start, end)
+        self.searched += (end - start) if i < 0 else (end - i)
+        return i
+
+    def index(self, sub, start=None, end=None):
+        i = self.find(sub, start, end)
+        if i < 0:
+            raise ValueError("substring not found")
+        return i
+
+    def rindex(self, sub, start=None, end=None):
+        i = self.rfind(sub, start, end)
+        if i < 0:
+            raise ValueError("substring not found")
+        return i
+
+    def startswith(self, prefix, start=None, end=None):
+        self.searched += len(prefix)
+        return super().startswith(prefix, start, end)
+
+    def __getitem__(self, key):
+        part = super().__getitem__(key)
+        self.copied += len(part)
+        return part
+
+
+class PageScanning(unittest.TestCase):
+    """split_html finds the parts of a page with one linear scan, which skips
+    over the libraries, and isn't fooled by script-like text in the body or
+    the modules."""
+
+    def _export(self, lib_mb):
+        app = pwe.App()
+        app.libraries["brython"] = "x = 1;\n" * (lib_mb * 1024 * 1024 // 7)
+        app.modules["util"] = "N = 1\n"
+        return app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython"])
+
+    def test_body_and_modules_roundtrip_exactly(self):
+        app = pwe.App()
+        app.modules["util"] = "\nPI = 3\n\n"
+        body, modules, *_ = pwe.App().split_html(app.build_html("\n<p>hi</p>\n\n", HELLO_PY))
+        self.assertEqual(body, "\n<p>hi</p>\n\n")
+        self.assertEqual(modules, {"main": HELLO_PY, "util": "\nPI = 3\n\n"})
+
+    def test_stray_script_like_text_roundtrips(self):
+        body = ('<body onload="__brython_pre_then_code()">\n'
+                '<script>let a = 1;</script>\n'
+                '<script type="text/python" id="brythonpre">\n'
+                '<!-- <script type="text/python" id="pythoncode"> --></script>\n'
+                '<textarea><script type="text/python" id="__pwe_x"></textarea>')
+        util = 'TAG = \'<script type="text/python" id="brythonpre">\'\n'
+        main = 'HTML = \'<script type="text/python" id="__pwe_util">\'\nimport util\n'
+        app = pwe.App()
+        asyncio.run(app.add_image("bunny", "data:image/png;base64,Qk1Q"))
+        app.modules["util"] = util
+        html = app.build_html(body, main)
+
+        body2, modules, _, images, _ = pwe.App().split_html(html)
+        self.assertEqual(body2, body)
+        self.assertEqual(modules, {"main": main, "util": util})
+        self.assertEqual(images, {"bunny": "data:image/png;base64,Qk1Q"})
+
+    def test_not_a_saved_page(self):
+        for page in ("<html><body>hi</body></html>",
+                     '<body onload="__brython_pre_then_code()">\n<p>no scripts</p>'):
+            with self.assertRaises(ValueError):
+                pwe.App().split_html(page)
+
+    def test_twenty_mb_export_scans_in_linear_time_without_copying(self):
+        for lib_mb in (2, 20):
+            page = _CountingStr(self._export(lib_mb))
+            body, modules, *_ = pwe.App().split_html(page)
+            self.assertEqual((body, modules["util"]), (HELLO_BODY, "N = 1\n"))
+            # Each part of the page is searched at most twice
+            self.assertLess(page.searched, 2 * len(page) + 1024)
+            # Only the small parts are copied; the library never is
+            self.assertLess(page.copied, 64 * 1024)
+
+
+class AssetDeduplication(unittest.TestCase):
+    """Assets are stored, and saved, once per distinct content."""
+
+    PNG = "data:image/png;base64,iVBORw0KGgo="
+
+    def test_same_data_stored_and_saved_once(self):
+        app = pwe.App()
+        asyncio.run(app.add_image("hero", self.PNG))
+        asyncio.run(app.add_image("hero_copy", self.PNG))
+        asyncio.run(app.add_resource("hero.png", self.PNG))
+        asyncio.run(app.add_sound("laser", "data:audio/wav;base64,UklGRg=="))
+        self.assertEqual(len(app.assets.entries), 2)
+        self.assertEqual(app.images["hero"], app.resources["hero.png"])
+
+        html = app.build_html(HELLO_BODY, HELLO_PY)
+        self.assertEqual(html.count(self.PNG), 1)
+        _, _, sounds, images, resources = pwe.App().split_html(html)
+        self.assertEqual(images, {"hero": self.PNG, "hero_copy": self.PNG})
+        self.assertEqual(resources, {"hero.png": self.PNG})
+        self.assertEqual(sounds, {"laser": "data:audio/wav;base64,UklGRg=="})
+
+    def test_unreferenced_data_is_dropped(self):
+        app = pwe.App()
+        asyncio.run(app.add_image("hero", self.PNG))
+        asyncio.run(app.add_resource("hero.png", self.PNG))
+        app.delete_image("hero")
+        self.assertEqual(app.get_resource("hero.png"), self.PNG)
+        asyncio.run(app.add_resource("hero.png", "data:image/png;base64,AAAA"))  # replaced
+        self.assertEqual(list(app.assets.entries.values()), ["data:image/png;base64,AAAA"])
+
+    def test_keyed_by_sha256_of_bytes(self):
+        store = pwe.AssetStore()
+        key = asyncio.run(store.add("data:text/plain;base64,aGk="))
+        self.assertEqual(key, hashlib.sha256(b"hi").hexdigest())
+        self.assertEqual(store.size(key), 2)
+        self.assertEqual(store.mime(key), "text/plain")
+        self.assertEqual(asyncio.run(store.text(key)), "hi")
+        self.assertEqual(asyncio.run(store.data_urls([key])), {key: "data:text/plain;base64,aGk="})
+
+    def test_pages_embed_the_given_asset_urls(self):
+        app = pwe.App()
+        asyncio.run(app.add_image("hero", self.PNG))
+        key = app.images["hero"]
+        html = app.build_html_parts(HELLO_BODY, HELLO_PY, asset_urls={key: "data:image/png;base64,QQ=="})
+        self.assertIn('id="__pwe-assets">data:image/png;base64,QQ==<', "".join(html))
+        self.assertEqual(asyncio.run(app.render_html(HELLO_BODY, HELLO_PY)),
+                         app.build_html(HELLO_BODY, HELLO_PY))
+
+    def test_file_with_inline_data_urls_loads(self):
+        """Files saved before the asset store existed have data URLs inline."""
+        old_precode = ("window.SOUNDS = {'laser':'data:audio/wav;base64,UklGRg=='}\n\n"
+                       f"window.IMAGES = {{'hero':'{self.PNG}',\n'copy':'{self.PNG}'}}\n\n"
+                       "window.RESOURCES = {}\n")
+        old = _v1_page(pwe.App().build_html(HELLO_BODY, HELLO_PY), old_precode)
+        app = pwe.App()
+        self.assertTrue(asyncio.run(app.load_html(old)))
+        self.assertEqual(app.get_image("copy"), self.PNG)
+        self.assertEqual(app.get_sound("laser"), "data:audio/wav;base64,UklGRg==")
+        self.assertEqual(len(app.assets.entries), 2)
+        self.assertFalse(app.anything_modified())
+
+
+class AssetManifest(unittest.TestCase):
+    """Pages are saved with their assets in a JSON manifest and one payload
+    block (format 2); pages saved before then still load."""
+
+    PNG = "data:image/png;base64,iVBORw0KGgo="
+    WAV = "data:audio/wav;base64,UklGRg=="
+
+    def _app(self):
+        app = pwe.App()
+        asyncio.run(app.add_image("hero", self.PNG))
+        asyncio.run(app.add_image("copy", self.PNG))
+        asyncio.run(app.add_sound("laser", self.WAV))
+        return app
+
+    def test_manifest_locates_each_asset_once(self):
+        app = self._app()
+        html = app.build_html(HELLO_BODY, HELLO_PY)
+        manifest = _manifest(html)
+        self.assertEqual(manifest["images"], {"hero": app.images["hero"], "copy": app.images["hero"]})
+        self.assertEqual([(a["type"], a["size"]) for a in manifest["assets"]],
+                         [("audio/wav", 4), ("image/png", 8)])
+        base = pwe.scan_page(html).payload[0]
+        for asset in manifest["assets"]:
+            url = html[base + asset["offset"]:base + asset["offset"] + asset["length"]]
+            self.assertEqual(app.assets.url(asset["sha256"]), url)
+
+    def test_names_with_quotes_and_tags_roundtrip(self):
+        app = pwe.App()
+        name = "it's \"fun\" </script>.png"
+        asyncio.run(app.add_image(name, self.PNG))
+        html = app.build_html(HELLO_BODY, HELLO_PY)
+        plain = pwe.App().build_html(HELLO_BODY, HELLO_PY)
+        self.assertEqual(html.count("</script>"), plain.count("</script>"))
+        reader = pwe.App()
+        self.assertTrue(asyncio.run(reader.load_html(html)))
+        self.assertEqual(reader.get_image(name), self.PNG)
+
+    def test_load_trusts_manifest_hashes(self):
+        """Keys come from the manifest, so loading doesn't hash the assets."""
+        app = self._app()
+        html = app.build_html(HELLO_BODY, HELLO_PY).replace(app.images["hero"], "f" * 64)
+        reader = pwe.App()
+        self.assertTrue(asyncio.run(reader.load_html(html)))
+        self.assertEqual(reader.images, {"hero": "f" * 64, "copy": "f" * 64})
+        self.assertEqual(reader.get_image("copy"), self.PNG)
+
+    def test_newer_format_is_refused(self):
+        html = self._app().build_html(HELLO_BODY, HELLO_PY).replace('"version":2', '"version":3')
+        self.assertFalse(asyncio.run(pwe.App().load_html(html)))
+
+    def test_parse_json_falls_back_to_json_module(self):
+        self.assertEqual(pwe.parse_json('{"a": [1, "x", null]}'), {"a": [1, "x", None]})
+
+
+class _ChunkReader(pwe.TextReader):
+    """Hands out a string in chunks of a fixed size, keeping count."""
+
+    def __init__(self, text, size):
+        super().__init__(text)
+        self.pos = 0
+        self.size = size
+
+    async def read(self):
+        chunk = self.source[self.pos:self.pos + self.size]
+        self.pos += len(chunk)
+        return chunk
+
+
+class ProgressiveOpen(unittest.TestCase):
+    """The code of a project goes into the editors as soon as it's read; the
+    assets are stored afterwards, and only then is the project unmodified."""
+
+    def _html(self):
+        app = pwe.App()
+        app.modules["util"] = "N = 1\n"
+        for name in ("c", "a", "b"):
+            payload = base64.b64encode(name.encode() * 48000).decode()
+            asyncio.run(app.add_image(name, "data:image/png;base64," + payload))
+        return app, app.build_html(HELLO_BODY, HELLO_PY)
+
+    def _open(self, html, on_code=None, app=None):
+        app = app or pwe.App()
+        reader = _ChunkReader(html, 4096)
+        seen = {}
+
+        def shown(code, viewinfo=None):
+            if not seen:
+                seen.update(read=reader.pos, images=dict(app.images), modules=dict(app.modules))
+
+        app.ui.set_contents_python = shown
+        self.assertTrue(asyncio.run(app.load_html(reader, on_code and (lambda: on_code(app)))))
+        return app, seen
+
+    def test_code_shows_before_the_assets_are_read(self):
+        orig, html = self._html()
+        app, seen = self._open(html)
+        layout = pwe.scan_page(html)
+        self.assertLessEqual(seen["read"], layout.manifest[1] + 4096 + len(pwe.SCRIPT_END))
+        self.assertLess(seen["read"], layout.payload[1])
+        self.assertEqual(seen["modules"], {"main": HELLO_PY, "util": "N = 1\n"})
+        self.assertEqual(seen["images"], {})
+        self.assertEqual(list(app.images.items()), list(orig.images.items()))
+        self.assertFalse(app.anything_modified())
+
+    def test_pages_without_a_manifest_show_code_once_read(self):
+        orig, html = self._html()
+        urls = ",\n".join(f"'{n}':'{orig.get_image(n)}'" for n in orig.images)
+        old = _v1_page(html, f"window.SOUNDS = {{}}\n\nwindow.IMAGES = {{{urls}}}\n\n")
+        app, seen = self._open(old)
+        self.assertEqual(seen["read"], len(old))
+        self.assertEqual(app.images, orig.images)
+
+    def test_manifest_tag_in_body_is_not_taken_for_the_manifest(self):
+        body = '<script type="application/json" id="__pwe-manifest">{}</script>\n<p>hi</p>'
+        orig, _ = self._html()
+        app = pwe.App()
+        bodies = []
+        app.ui.set_contents_html = bodies.append
+        app, seen = self._open(orig.build_html(body, HELLO_PY), app=app)
+        self.assertEqual(bodies, [body])
+        self.assertEqual(seen["modules"]["util"], "N = 1\n")
+        self.assertEqual(app.images, orig.images)
+
+    def test_asset_progress_is_reported(self):
+        _, html = self._html()
+        app = pwe.App()
+        progress = []
+        app.ui.update_asset_dialogs = lambda: progress.append(app.asset_progress)
+        self._open(html, app=app)
+        self.assertEqual(progress, [(0, 3), (1, 3), (2, 3), (3, 3), None])
+
+    def test_edits_while_loading_stay_modified(self):
+        _, html = self._html()
+        app, _ = self._open(html, on_code=lambda app: app.touch())
+        self.assertTrue(app.anything_modified())
+
+    def test_unreadable_page_puts_back_the_open_project(self):
+        orig, html = self._html()
+        app = pwe.App()
+        app.ui.contents_html = lambda: "<p>mine</p>"
+        app.ui.contents_python = lambda: "print('mine')\n"
+        asyncio.run(app.add_resource("mine.css", "data:text/css;base64,AAAA"))
+        asyncio.run(app.load_html(orig.build_html("<p>saved</p>", HELLO_PY)))
+        app.ui.contents_python = lambda: "print('edited')\n"
+        app.touch()
+        bodies = []
+        app.ui.set_contents_html = bodies.append
+        bad = html.replace('"version":2', '"version":3')
+        opened = []
+        self.assertFalse(asyncio.run(app.load_html(_ChunkReader(bad, 4096), lambda: opened.append(1))))
+        self.assertEqual(bodies, [HELLO_BODY, "<p>mine</p>"])  # shown, then put back
+        self.assertEqual(opened, [])
+        self.assertEqual(app.modules, {"main": "print('edited')\n", "util": "N = 1\n"})
+        self.assertEqual(list(app.images), ["c", "a", "b"])
+        self.assertEqual(app.get_image("a"), orig.get_image("a"))
+        self.assertTrue(app.anything_modified())
+        self.assertIsNone(app.asset_progress)
+        self.assertIsNone(app.loading)
+
+    def test_failed_asset_ends_the_load(self):
+        _, html = self._html()
+        app = pwe.App()
+
+        async def corrupt(data_url, key=None):
+            raise ValueError("bad data URL")
+
+        app.assets.add_data_url = corrupt
+        with self.assertRaises(ValueError):
+            asyncio.run(app.load_html(html))
+        self.assertIsNone(app.asset_progress)
+        self.assertIsNone(app.loading)
+
+
+class Examples(unittest.TestCase):
+    """An example is only loaded, from its own file, when it's chosen."""
+
+    def _load(self, name, html):
+        app = pwe.App()
+        requested = []
+
+        async def load_example_html(example):
+            requested.append(example["src"])
+            return html
+
+        saved = pwe.example_index, pwe.load_example_html, pwe.err
+        try:
+            pwe.example_index = lambda: {"hello": {"id": "hello", "src": "examples/hello.js"}}
+            pwe.load_example_html = load_example_html
+            pwe.err = requested.append
+            asyncio.run(app.load_example(name))
+        finally:
+            pwe.example_index, pwe.load_example_html, pwe.err = saved
+        return app, requested
+
+    def test_loads_the_chosen_example(self):
+        app, requested = self._load("hello", pwe.App().build_html(HELLO_BODY, "print('hi')"))
+        self.assertEqual(requested, ["examples/hello.js"])
+        self.assertEqual(app.modules["main"], "print('hi')")
+        self.assertEqual((app.file_name, app.current_example), ("hello.html", "hello"))
+
+    def test_unknown_example(self):
+        app, requested = self._load("nope", "")
+        self.assertEqual(requested, ["Unable to find example nope in loaded examples."])
+        self.assertIsNone(app.current_example)
+
+
 class Assets(unittest.TestCase):
     """Sound/image management at the model level (the browser-free half of
     'load a sound or image'). The play/preview UI is covered by the Tier 2
@@ -216,8 +807,8 @@ class Assets(unittest.TestCase):
 
     def test_add_rename_delete(self):
         app = pwe.App()
-        app.add_sound("laser", "data:audio/wav;base64,UklGRg==")
-        app.add_image("hero", "data:image/png;base64,iVBORw0K")
+        asyncio.run(app.add_sound("laser", "data:audio/wav;base64,UklGRg=="))
+        asyncio.run(app.add_image("hero", "data:image/png;base64,iVBORw0K"))
 
         self.assertEqual(app.get_sound("laser"), "data:audio/wav;base64,UklGRg==")
         self.assertEqual(app.get_sound_names(), ["laser"])
@@ -225,7 +816,7 @@ class Assets(unittest.TestCase):
         self.assertEqual(app.get_image_names(), ["hero"])
 
         # Adding under an existing name replaces it.
-        app.add_sound("laser", "data:audio/wav;base64,QQ==")
+        asyncio.run(app.add_sound("laser", "data:audio/wav;base64,QQ=="))
         self.assertEqual(app.get_sound("laser"), "data:audio/wav;base64,QQ==")
         self.assertEqual(app.get_sound_names(), ["laser"])
 
@@ -238,12 +829,33 @@ class Assets(unittest.TestCase):
         self.assertEqual(app.get_sound_names(), [])
         self.assertEqual(app.get_image_names(), [])
 
+    def test_blob_assets_are_only_written_encoded(self):
+        """A page never embeds a Blob's object URL; render_html encodes it."""
+        app = pwe.App()
+        app.assets.entries["k"] = SimpleNamespace(size=3, type="image/png")  # a Blob
+        app.images["hero"] = "k"
+        with self.assertRaises(ValueError):
+            app.build_html(HELLO_BODY, HELLO_PY)
+
+        async def _encode(blob):
+            return "data:image/png;base64,QUFB"
+
+        saved = pwe.blob_to_data_url
+        pwe.blob_to_data_url = _encode
+        try:
+            html = asyncio.run(app.render_html(HELLO_BODY, HELLO_PY))
+        finally:
+            pwe.blob_to_data_url = saved
+        reader = pwe.App()
+        self.assertTrue(asyncio.run(reader.load_html(html)))
+        self.assertEqual(reader.get_image("hero"), "data:image/png;base64,QUFB")
+
     def test_loaded_assets_survive_save_load(self):
         """A loaded sound/image must be embedded in the saved file and come
         back intact when that file is re-opened."""
         app = pwe.App()
-        app.add_sound("laser", "data:audio/mpeg;base64,QUFBQQ==")
-        app.add_image("bunny", "data:image/png;base64,Qk1Q")
+        asyncio.run(app.add_sound("laser", "data:audio/mpeg;base64,QUFBQQ=="))
+        asyncio.run(app.add_image("bunny", "data:image/png;base64,Qk1Q"))
         html = app.build_html(HELLO_BODY, HELLO_PY)
 
         _, _, sounds, images, _ = pwe.App().split_html(html)
@@ -270,7 +882,7 @@ class Assets(unittest.TestCase):
     def test_rename_sound_collision_reprompts(self):
         self._check_rename_collision(
             pwe.SoundsDialog,
-            lambda app, name, url: app.add_sound(name, url),
+            lambda app, name, url: asyncio.run(app.add_sound(name, url)),
             lambda app: app.get_sound_names(),
             lambda app, name: app.get_sound(name),
         )
@@ -278,7 +890,7 @@ class Assets(unittest.TestCase):
     def test_rename_image_collision_reprompts(self):
         self._check_rename_collision(
             pwe.ImageDialog,
-            lambda app, name, url: app.add_image(name, url),
+            lambda app, name, url: asyncio.run(app.add_image(name, url)),
             lambda app: app.get_image_names(),
             lambda app, name: app.get_image(name),
         )
@@ -286,7 +898,7 @@ class Assets(unittest.TestCase):
     def test_sound_stop_clears_playing(self):
         """Playing tracks each instance; stopping releases them all."""
         app = pwe.App()
-        app.add_sound("laser", "data:audio/wav;base64,AAAA")
+        asyncio.run(app.add_sound("laser", "data:audio/wav;base64,AAAA"))
         dialog = pwe.SoundsDialog(app)
         dialog.play_sound("laser")
         dialog.play_sound("laser")  # two overlapping instances
@@ -296,7 +908,7 @@ class Assets(unittest.TestCase):
 
     def test_resource_add_rename_delete(self):
         app = pwe.App()
-        app.add_resource("style.css", "data:text/css;base64,Ym9keXt9")
+        asyncio.run(app.add_resource("style.css", "data:text/css;base64,Ym9keXt9"))
         self.assertEqual(app.get_resource("style.css"), "data:text/css;base64,Ym9keXt9")
         self.assertEqual(app.get_resource_names(), ["style.css"])
         app.rename_resource("style.css", "theme.css")
@@ -307,7 +919,7 @@ class Assets(unittest.TestCase):
     def test_rename_resource_collision_reprompts(self):
         self._check_rename_collision(
             pwe.ResourceDialog,
-            lambda app, name, url: app.add_resource(name, url),
+            lambda app, name, url: asyncio.run(app.add_resource(name, url)),
             lambda app: app.get_resource_names(),
             lambda app, name: app.get_resource(name),
         )
@@ -408,6 +1020,510 @@ class StandaloneExportShape(unittest.TestCase):
         self.assertIn("__BRYTHON__.brython_path", html)
 
 
+class StreamingExport(unittest.TestCase):
+    """build_html_parts must produce the same page as build_html, but as
+    separate parts, so the big library payloads are never joined."""
+
+    def _app(self):
+        app = pwe.App()
+        app.libraries["brython"] = "/*FAKE-BRYTHON*/ var brython=1;"
+        app.libraries["brython_stdlib"] = "/*FAKE-STDLIB*/ var stdlib=1;"
+        app.modules["util"] = "X = 1\n"
+        asyncio.run(app.add_sound("laser", "data:audio/mpeg;base64,QUFBQQ=="))
+        return app
+
+    def test_parts_join_to_build_html(self):
+        app = self._app()
+        libs = ["brython", "brython_stdlib"]
+        parts = app.build_html_parts(HELLO_BODY, HELLO_PY, libs_to_bundle=libs)
+        self.assertEqual("".join(parts), app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=libs))
+        self.assertEqual(libs, ["brython", "brython_stdlib"])  # caller's list untouched
+
+    def test_library_payloads_are_separate_parts(self):
+        app = self._app()
+        parts = app.build_html_parts(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython"])
+        payload = pwe.encode_js_for_html(app.libraries["brython"])
+        self.assertIn(payload, parts)
+
+    def test_write_parts_writes_in_order(self):
+        written = []
+
+        class _Writable:
+            async def write(self, part):
+                written.append(part)
+
+        parts = self._app().build_html_parts(HELLO_BODY, HELLO_PY)
+        asyncio.run(pwe.write_parts(_Writable(), parts))
+        self.assertEqual(written, parts)
+
+
+class LibraryPayloadCache(unittest.TestCase):
+    """Encoded library payloads are memoized by name + content hash."""
+
+    def _count_encodes(self):
+        calls = []
+        real = pwe.encode_js_for_html
+
+        def counting(js, *args, **kwargs):
+            calls.append(js)
+            return real(js, *args, **kwargs)
+
+        return calls, counting
+
+    def test_export_reuses_encoded_payload(self):
+        app = pwe.App()
+        app.cache_library("brython", "var brython=1;")
+        calls, counting = self._count_encodes()
+        saved = pwe.encode_js_for_html
+        try:
+            pwe.encode_js_for_html = counting
+            first = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython"])
+            second = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython"])
+            self.assertEqual(first, second)
+            self.assertEqual(len(calls), 1)
+
+            # A changed library is encoded again
+            app.cache_library("brython", "var brython=2;")
+            third = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython"])
+        finally:
+            pwe.encode_js_for_html = saved
+        self.assertEqual(len(calls), 2)
+        self.assertIn("var brython=2;", "\n".join(_decode_data_url_scripts(third)))
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = pwe.PayloadCache(max_chars=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")  # b is now the least recently used
+        cache.put("c", "cccc")
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertLessEqual(cache.size, 10)
+
+    def test_cache_skips_oversized_payloads(self):
+        cache = pwe.PayloadCache(max_chars=3)
+        cache.put("big", "xxxx")
+        self.assertNotIn("big", cache)
+        self.assertEqual(cache.size, 0)
+
+
+class _MemoryLibraryStore(pwe.LibraryStore):
+    """A LibraryStore backed by a dict, standing in for Cache Storage/IndexedDB."""
+
+    def __init__(self):
+        super().__init__()
+        self.backend = "memory"
+        self.entries = {}
+
+    async def _read(self, url):
+        return self.entries.get(url)
+
+    async def _write(self, url, text, digest):
+        self.entries[url] = (text, digest)
+
+    async def _delete(self, url):
+        self.entries.pop(url, None)
+
+
+class PersistentLibraryStore(unittest.TestCase):
+    def test_roundtrip_keyed_by_versioned_url(self):
+        store = _MemoryLibraryStore()
+        asyncio.run(store.put("brython", "var brython=1;"))
+        self.assertIn(pwe.JSLIBS["brython"][2], store.entries)
+        self.assertEqual(asyncio.run(store.get("brython")), "var brython=1;")
+        self.assertIsNone(asyncio.run(store.get("pixi")))
+
+    def test_corrupt_entry_is_discarded(self):
+        store = _MemoryLibraryStore()
+        asyncio.run(store.put("brython", "var brython=1;"))
+        url = pwe.JSLIBS["brython"][2]
+        text, digest = store.entries[url]
+        store.entries[url] = (text + "garbage", digest)
+        self.assertIsNone(asyncio.run(store.get("brython")))
+        self.assertNotIn(url, store.entries)
+
+    def test_no_backend_without_browser(self):
+        store = pwe.LibraryStore()
+        self.assertIsNone(store.backend)
+        self.assertIsNone(asyncio.run(store.get("brython")))
+
+    def test_ensure_library_prefers_store_over_network(self):
+        app = pwe.App()
+        app.library_store = _MemoryLibraryStore()
+        asyncio.run(app.library_store.put("pixi", "var PIXI={};"))
+        fetched = []
+
+        async def _fetchlib(libname, on_progress=None):
+            fetched.append(libname)
+            return False
+
+        app.fetchlib = _fetchlib
+        app.export_libs = ["pixi", "three"]
+        with _asyncio_gather():
+            asyncio.run(app.prefetch_libraries())
+        self.assertEqual(app.libraries, {"pixi": "var PIXI={};"})
+        self.assertEqual(fetched, ["three"])  # only what the store didn't have
+
+
+class ConcurrentLibraryFetch(unittest.TestCase):
+    def test_fetches_all_libraries_concurrently(self):
+        app = pwe.App()
+        in_flight = []
+        peak = []
+        progress = []
+        done = []
+
+        async def _fetchlib(libname, on_progress=None):
+            in_flight.append(libname)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            on_progress(10, 20)
+            in_flight.remove(libname)
+            if libname == "three":
+                return False
+            app.libraries[libname] = "/* js */"
+            return True
+
+        app.fetchlib = _fetchlib
+        libs = ["brython", "brython_stdlib", "pixi", "three"]
+        with _asyncio_gather():
+            missing = asyncio.run(app.fetch_libraries(
+                libs,
+                on_progress=lambda lib, received, total: progress.append(lib),
+                on_done=lambda lib, ok: done.append((lib, ok))))
+        self.assertEqual(missing, ["three"])
+        self.assertEqual(max(peak), len(libs))  # all were in flight at once
+        self.assertEqual(sorted(progress), sorted(libs))
+        self.assertIn(("three", False), done)
+
+    def test_gather_runs_concurrently_and_keeps_order(self):
+        events = []
+
+        async def job(name, delay):
+            events.append(f"start {name}")
+            await asyncio.sleep(delay)
+            events.append(f"end {name}")
+            return name
+
+        async def main():
+            return await pwe.gather(job("slow", 0.02), job("fast", 0.0), job("mid", 0.01))
+
+        with _asyncio_promises():
+            self.assertEqual(asyncio.run(main()), ["slow", "fast", "mid"])
+        self.assertEqual(events[:3], ["start slow", "start fast", "start mid"])
+        self.assertEqual(events[3:], ["end fast", "end mid", "end slow"])
+
+    def test_gather_fails_if_any_fails(self):
+        async def fail():
+            raise ValueError("no")
+
+        async def main():
+            return await pwe.gather(asyncio.sleep(0, "ok"), fail())
+
+        with _asyncio_promises(), self.assertRaises(ValueError):
+            asyncio.run(main())
+
+    def test_racing_sources_report_the_progress_of_the_furthest(self):
+        progress = []
+
+        async def _fetch_text(url, timeout_ms, controller, on_progress=None):
+            for received in {"cdn": (50, 60, 70), "local": (5, 10, 100)}[url]:
+                await asyncio.sleep(0.001)
+                on_progress(received, 100)
+            return None if url == "cdn" else url
+
+        saved = pwe.fetch_text
+        pwe.fetch_text = _fetch_text
+        try:
+            with _asyncio_promises():
+                text = asyncio.run(pwe.fetch_first(
+                    [("cdn", 0), ("local", 0)], lambda received, total: progress.append(received)))
+        finally:
+            pwe.fetch_text = saved
+        self.assertEqual(text, "local")
+        self.assertEqual(progress, [50, 60, 70, 100])
+
+    def test_match_picked_files_to_libraries(self):
+        matches = pwe.match_library_files(
+            ["brython", "brython_stdlib", "pixi"],
+            ["brython_stdlib.js", "Brython.min (1).js", "notes.txt"])
+        self.assertEqual(matches, {"brython": 1, "brython_stdlib": 0})
+
+
+class StdlibSubset(unittest.TestCase):
+    """Exports can bundle only the stdlib modules the project can import."""
+
+    SCRIPTS = {
+        "$timestamp": 1,
+        "sys": [".py", "import _sys", ["_sys", "browser"]],
+        "browser": [".py", "", [], 1],
+        "traceback": [".py", "import linecache", ["linecache"]],
+        "linecache": [".py", "", []],
+        "json": [".py", "from json import decoder", ["json.decoder"], 1],
+        "json.decoder": [".py", "import re", ["re"]],
+        "re": [".py", "", []],
+        "math": [".js", "var math = {}"],
+        "email": [".py", "", [], 1],
+        "email.parser": [".py", "", []],
+        "unittest": [".py", "import difflib", ["difflib"], 1],
+        "difflib": [".py", "", []],
+    }
+
+    def _stdlib(self):
+        return ("__BRYTHON__.use_VFS = true;\nvar scripts = " + json.dumps(self.SCRIPTS)
+                + "\n__BRYTHON__.update_VFS(scripts)")
+
+    def _subset(self, *sources):
+        js, count, total = pwe.stdlib_subset_js(self._stdlib(), sources)
+        return pwe.parse_stdlib_vfs(js)[1], count, total
+
+    def test_keeps_only_reachable_modules(self):
+        scripts, count, total = self._subset("import json\nfrom email.parser import Parser")
+        self.assertEqual(sorted(scripts), ["$timestamp", "browser", "email", "email.parser",
+                                           "json", "json.decoder", "linecache", "re",
+                                           "sys", "traceback"])
+        self.assertEqual((count, total), (9, 12))
+        self.assertEqual(scripts["json"], self.SCRIPTS["json"])
+
+    def test_imports_found_anywhere_in_module(self):
+        names = pwe.python_imports(
+            "def f():\n    import math\n"
+            "from . import sibling\n"
+            "mod = importlib.import_module('unittest')\n")
+        self.assertEqual(names, {"math", "unittest"})
+
+    def test_unparseable_code_keeps_full_stdlib(self):
+        js, count, total = pwe.stdlib_subset_js(self._stdlib(), ["import math", "def ("])
+        self.assertEqual(js, self._stdlib())
+        self.assertEqual(count, total)
+
+    def test_export_bundles_subset(self):
+        app = pwe.App()
+        app.libraries["brython_stdlib"] = self._stdlib()
+        app.modules["util"] = "import math\n"
+        html = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython_stdlib"],
+                              options=pwe.ExportOptions(stdlib_subset=True))
+        stdlib = next(js for js in _decode_data_url_scripts(html) if "update_VFS" in js)
+        self.assertIn("math", pwe.parse_stdlib_vfs(stdlib)[1])
+        self.assertNotIn("unittest", pwe.parse_stdlib_vfs(stdlib)[1])
+        # Without the option, the whole stdlib is bundled
+        html = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython_stdlib"])
+        self.assertIn(self._stdlib(), _decode_data_url_scripts(html))
+
+
+class CompressedExport(unittest.TestCase):
+    """Bundled libraries can be stored gzipped, for the page to inflate."""
+
+    def _app(self):
+        app = pwe.App()
+        app.libraries["brython"] = "/*FAKE-BRYTHON*/ var brython=1;" * 100
+        app.libraries["brython_stdlib"] = "/*FAKE-STDLIB*/ var stdlib=1;" * 100
+        app.libraries["pixi"] = "/*FAKE-PIXI*/ var PIXI={};"
+        return app
+
+    def _inflated(self, html):
+        blocks = re.findall(r'type="%s" data-lib="([\w-]+)">\n([A-Za-z0-9+/=\n]+)\n'
+                            % pwe.COMPRESSED_LIBRARY_MIME, html)
+        return [(lib, gzip.decompress(base64.b64decode(b64.replace("\n", ""))).decode("utf-8"))
+                for lib, b64 in blocks]
+
+    def test_libraries_compressed_in_load_order(self):
+        app = self._app()
+        libs = ["pixi", "brython_stdlib", "brython"]
+        html = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=libs,
+                              options=pwe.ExportOptions(compress=True))
+        self.assertEqual(self._inflated(html),
+                         [(lib, app.libraries[lib]) for lib in ["brython", "brython_stdlib", "pixi"]])
+        self.assertEqual(_decode_data_url_scripts(html), [])
+        # The shim runs before the libraries, and the inflater after them all
+        self.assertLess(html.index("__BRYTHON__.brython_path"), html.index(pwe.COMPRESSED_LIBRARY_MIME))
+        self.assertGreater(html.index("__pwe_libs_ready ="), html.rindex('data-lib="'))
+        self.assertLess(len(html), len(app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=libs)))
+
+    def test_not_compressed_when_stdlib_comes_from_cdn(self):
+        # A stdlib from the CDN would run before the inflated brython it needs
+        html = self._app().build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython"],
+                                      options=pwe.ExportOptions(compress=True))
+        self.assertEqual(self._inflated(html), [])
+        self.assertNotIn("__pwe_libs_ready =", html)
+        self.assertEqual(len(_decode_data_url_scripts(html)), 1)
+
+    def test_precompressed_payloads_are_used(self):
+        app = self._app()
+        options = pwe.ExportOptions(compress=True)
+        asyncio.run(app.compress_library_payloads(["pixi"], options))
+        saved = pwe.gzip_b64
+        try:
+            pwe.gzip_b64 = None  # build_html must not need to compress again
+            html = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["pixi"], options=options)
+        finally:
+            pwe.gzip_b64 = saved
+        self.assertEqual(self._inflated(html), [("pixi", app.libraries["pixi"])])
+
+
+class ExportSizeEstimate(unittest.TestCase):
+    """The export dialog's size estimate, from cached data only."""
+
+    def _app(self):
+        app = pwe.App()
+        app.libraries["brython"] = "var brython = 1;\n" * 3000
+        app.modules["util"] = "X = 1\n"
+        asyncio.run(app.add_sound("laser", "data:audio/mpeg;base64,QUFBQQ=="))
+        asyncio.run(app.add_image("same", "data:audio/mpeg;base64,QUFBQQ=="))  # Same data
+        return app
+
+    def test_parts_and_total_close_to_the_export(self):
+        app = self._app()
+        options = pwe.ExportOptions()
+        estimate = app.export_size_estimate(["brython"], options)
+        labels = [label for label, _, _ in estimate]
+        self.assertEqual(labels, ["Page", "brython", "main.py", "util.py", "sound laser"])
+        self.assertTrue(all(exact for _, _, exact in estimate))
+        self.assertEqual(dict((l, s) for l, s, _ in estimate)["util.py"], len("X = 1\n"))
+        html = app.build_html(HELLO_BODY, HELLO_PY, libs_to_bundle=["brython"], options=options)
+        total = sum(size for _, size, _ in estimate)
+        self.assertLess(abs(total - len(html)) / len(html), 0.05)
+        # Once an export has encoded the library, its payload gives the size
+        payload = app.library_payload("brython")
+        self.assertIn(("brython", len(payload), True),
+                      app.export_size_estimate(["brython"], options))
+
+    def test_estimates_flagged(self):
+        app = self._app()
+        estimate = {label: (size, exact) for label, size, exact in
+                    app.export_size_estimate(["pixi"], pwe.ExportOptions(precompile=True))}
+        # Not fetched yet, and not compiled yet
+        self.assertEqual(estimate["pixi"], (pwe.base64_size(pwe.JSLIB_TYPICAL_SIZES["pixi"]), False))
+        self.assertFalse(estimate["util.py"][1])
+
+    def test_size_helpers(self):
+        self.assertEqual(pwe.base64_size(4), len(base64.b64encode(b"xxxx")))
+        self.assertEqual([pwe.format_size(n) for n in (850, 12600, 4718592)],
+                         ["850 B", "12.3 kB", "4.5 MB"])
+
+
+class PrecompiledModules(unittest.TestCase):
+    """Exports can store each module compiled to JavaScript, next to its
+    source, and compile each only once per source and Brython build."""
+
+    def setUp(self):
+        self.compiled = []
+
+        def compile_module(name, source):
+            if "def (" in source:
+                raise SyntaxError("invalid syntax")
+            self.compiled.append(name)
+            return f"/*JS {name}*/ var s = '</script>';"
+
+        self.saved = {n: getattr(pwe, n) for n in ("brython_build", "compile_module")}
+        pwe.brython_build = lambda: "3.13.2.final.0 2025"
+        pwe.compile_module = compile_module
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(pwe, name, value)
+
+    def _export(self, app):
+        return app.build_html(HELLO_BODY, HELLO_PY, options=pwe.ExportOptions(precompile=True))
+
+    def _stored(self, html):
+        start = html.index('id="%s">' % pwe.COMPILED_MODULES_ID) + len('id="%s">' % pwe.COMPILED_MODULES_ID)
+        return json.loads(html[start:html.index("</script>", start)])
+
+    def test_modules_stored_compiled_beside_source(self):
+        app = pwe.App()
+        app.modules["util"] = "def helper():\n    return 42\n"
+        html = self._export(app)
+        stored = self._stored(html)
+        self.assertEqual(stored["brython"], "3.13.2.final.0 2025")
+        self.assertEqual(sorted(stored["modules"]), ["__pwe_util", "pythoncode"])
+        util = stored["modules"]["__pwe_util"]
+        self.assertEqual((util["name"], util["filename"]), ("util", "util.py"))
+        self.assertEqual(util["js"], "/*JS util*/ var s = '</script>';")
+        # The page hashes the text of each python block, less its framing newlines
+        for block_id, module in stored["modules"].items():
+            start = html.index(f'id="{block_id}">') + len(f'id="{block_id}">')
+            source = html[start:html.index("</script>", start)][1:-1]
+            self.assertEqual(module["sha256"], hashlib.sha256(source.encode("utf-8")).hexdigest())
+        # The editor still reads back only the source
+        body, modules, *_ = pwe.App().split_html(html)
+        self.assertEqual(modules, {"main": HELLO_PY, "util": "def helper():\n    return 42\n"})
+
+    def test_compiled_once_per_source(self):
+        app = pwe.App()
+        app.modules["util"] = "X = 1\n"
+        self._export(app)
+        self._export(app)
+        self.assertEqual(sorted(self.compiled), ["main", "util"])
+        app.modules["util"] = "X = 2\n"
+        self._export(app)
+        self.assertEqual(sorted(self.compiled), ["main", "util", "util"])
+        # A new Brython build compiles everything again
+        pwe.brython_build = lambda: "3.14.0.final.0 2026"
+        self.assertEqual(self._stored(self._export(app))["brython"], "3.14.0.final.0 2026")
+        self.assertEqual(len(self.compiled), 5)
+
+    def test_uncompilable_module_left_to_the_page(self):
+        app = pwe.App()
+        app.modules["broken"] = "def (\n"
+        stored = self._stored(self._export(app))
+        self.assertEqual(list(stored["modules"]), ["pythoncode"])
+
+    def test_nothing_stored_without_option_or_brython(self):
+        app = pwe.App()
+        html = app.build_html(HELLO_BODY, HELLO_PY)
+        self.assertNotIn(pwe.COMPILED_MODULES_ID, html)
+        pwe.brython_build = self.saved["brython_build"]  # Under the stub, no Brython
+        self.assertEqual(self._export(app), html)
+
+
+class Tracing(unittest.TestCase):
+    """The hot paths are timed as spans only while tracing is on."""
+
+    def setUp(self):
+        ticks = iter(range(0, 10**6, 5))
+        self.saved = (pwe.TRACER.enabled, pwe.TRACER.clock)
+        pwe.TRACER.clock = lambda: float(next(ticks))
+        pwe.TRACER.clear()
+
+    def tearDown(self):
+        pwe.TRACER.enabled, pwe.TRACER.clock = self.saved
+        pwe.TRACER.clear()
+
+    def test_off_records_nothing(self):
+        pwe.TRACER.enabled = False
+        html = pwe.App().build_html(HELLO_BODY, HELLO_PY)
+        self.assertIn("Hello, World!", html)
+        self.assertEqual(pwe.TRACER.spans, [])
+
+    def test_hot_paths_recorded_with_sizes(self):
+        app = pwe.App()
+        pwe.TRACER.enabled = True
+        asyncio.run(app.add_image("dot", "data:image/png;base64,QUFBQQ=="))
+        html = app.build_html(HELLO_BODY, HELLO_PY)
+        pwe.App().split_html(html)
+        spans = {span.name: span for span in pwe.TRACER.spans}
+        self.assertEqual(spans["asset_add"].size, 4)  # Async, with the decoded size
+        self.assertEqual(spans["build_html"].size, len(html))
+        self.assertEqual(spans["split_html"].size, len(html))
+        self.assertEqual(spans["build_html"].duration, 5.0)
+        # read_page runs inside split_html, so it ends first
+        self.assertEqual([s.name for s in pwe.TRACER.spans][-2:], ["read_page", "split_html"])
+
+    def test_trace_events_and_limit(self):
+        pwe.TRACER.enabled = True
+        for _ in range(pwe.TRACE_MAX_SPANS + 3):
+            with pwe.TRACER.span("tick") as span:
+                span.size = 7
+        self.assertEqual(len(pwe.TRACER.spans), pwe.TRACE_MAX_SPANS)
+        trace = json.loads(pwe.TRACER.trace_events())
+        event = trace["traceEvents"][0]
+        self.assertEqual((event["name"], event["ph"], event["dur"], event["args"]),
+                         ("tick", "X", 5000, {"size": 7}))  # In microseconds
+        self.assertEqual(event["ts"], 3 * 10 * 1000)  # The first 3 spans were dropped
+
+
 class BuildScripts(unittest.TestCase):
     """The pure-CPython scripts that assemble the editor distribution."""
 
@@ -415,7 +1531,11 @@ class BuildScripts(unittest.TestCase):
         import examples as examples_mod  # on sys.path via import_pywebedit()
 
         out = os.path.join(HERE, "output", "_test_examples.js")
-        os.makedirs(os.path.dirname(out), exist_ok=True)
+        payload_dir = os.path.join(HERE, "output", examples_mod.PAYLOAD_DIR)
+        os.makedirs(payload_dir, exist_ok=True)
+        stale = os.path.join(payload_dir, "hello.0000000000000000.js")
+        with open(stale, "w") as f:
+            f.write("// an earlier version of the example")
 
         cwd = os.getcwd()
         try:
@@ -427,13 +1547,36 @@ class BuildScripts(unittest.TestCase):
 
         with open(out, encoding="utf-8") as f:
             js = f.read()
-        self.assertTrue(js.startswith("window.EXAMPLES_DATA = "))
+        self.assertTrue(js.startswith("window.EXAMPLES_INDEX = "))
+        self.assertNotIn("Hello, World!", js)  # Only the index is loaded up front
+        self.assertFalse(os.path.exists(stale))
 
-        data = json.loads(js[len("window.EXAMPLES_DATA = ") : -1])
+        data = json.loads(js[len("window.EXAMPLES_INDEX = ") : -1])
         ids = {ex["id"]: ex for cat in data for ex in cat["examples"]}
         self.assertIn("hello", ids)
-        decoded = base64.b64decode(ids["hello"]["content"]).decode("utf-8")
+        with open(os.path.join(os.path.dirname(out), ids["hello"]["src"]), encoding="utf-8") as f:
+            payload = f.read()
+        self.assertTrue(payload.startswith("(globalThis.EXAMPLES_PAYLOADS ??= {})[\"hello\"] = "))
+        decoded = pwe.gunzip_b64(re.search(r'= "([^"]+)";', payload).group(1))
         self.assertIn("Hello, World!", decoded)
+        self.assertEqual(ids["hello"]["size"], len(decoded.encode("utf-8")))
+        # Named by content, so an unchanged example keeps its name
+        self.assertRegex(ids["hello"]["src"], r"^examples/hello\.[0-9a-f]{16}\.js$")
+
+    def test_examples_bundling_keeps_out_of_the_sources(self):
+        import examples as examples_mod
+
+        before = sorted(os.listdir(os.path.join(REPO_ROOT, "examples")))
+        cwd = os.getcwd()
+        try:
+            os.chdir(REPO_ROOT)
+            for args in (("examples.js",), (os.path.join(HERE, "output", "_x.js"), "examples")):
+                with self.assertRaises(ValueError):
+                    examples_mod.bundle_examples_to_javascript(*args)
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(sorted(os.listdir(os.path.join(REPO_ROOT, "examples"))), before)
+        self.assertFalse(os.path.exists(os.path.join(REPO_ROOT, "examples.js")))
 
     def test_tagreplace(self):
         path = os.path.join(REPO_ROOT, "utils", "tagreplace.py")
@@ -455,27 +1598,154 @@ class BuildScripts(unittest.TestCase):
         finally:
             os.unlink(tmp)
 
+    def test_precompile_wrapper_and_stamp(self):
+        path = os.path.join(REPO_ROOT, "utils", "precompile.py")
+        spec = importlib.util.spec_from_file_location("precompile", path)
+        precompile = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(precompile)
+
+        js = precompile.wrap_compiled('var s = "</script>"', "3.13.2.final.0 2025", "x = 1\n")
+        # Runs only under the Brython that compiled it, with the code kept as a
+        # string that can't close the script tag it is inlined into
+        self.assertIn('!== "3.13.2.final.0 2025"', js)
+        self.assertIn("globalThis.pywebeditPrecompiled = function", js)
+        self.assertIn('js: "var s = \\"<\\/script>\\""', js)
+        self.assertIn("__doc__: $B.builtins.None", js)
+        self.assertIn(hashlib.sha256(b"x = 1\n").hexdigest(), js)
+
+        with open(os.path.join(REPO_ROOT, "pywebedit.html_template"), encoding="utf-8") as f:
+            template = f.read()
+        stamped = precompile.stamp_html(template, "pywebedit.compiled.js", js)
+        digest = hashlib.sha256(js.encode("utf-8")).hexdigest()[:16]
+        self.assertIn(f'src="pywebedit.compiled.js?v={digest}"', stamped)
+        # Restamping a built page replaces the old hash
+        self.assertEqual(precompile.stamp_html(stamped, "pywebedit.compiled.js", js), stamped)
+        with self.assertRaises(ValueError):
+            precompile.stamp_html("<html></html>", "pywebedit.compiled.js", js)
+
+    def test_service_worker_manifest(self):
+        path = os.path.join(REPO_ROOT, "utils", "serviceworker.py")
+        spec = importlib.util.spec_from_file_location("serviceworker", path)
+        serviceworker = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(serviceworker)
+
+        with tempfile.TemporaryDirectory() as dist:
+            os.makedirs(os.path.join(dist, "examples"))
+            for name, content in (("index.html", "<html></html>"), ("brython.min.js", "b"),
+                                  ("examples/hello.0123.js", "h")):
+                with open(os.path.join(dist, name), "w", encoding="utf-8") as f:
+                    f.write(content)
+            files = serviceworker.list_files(dist, ["index.html", "examples", "brython.min.js"])
+            self.assertEqual(files, ["brython.min.js", "examples/hello.0123.js", "index.html"])
+            with self.assertRaises(FileNotFoundError):
+                serviceworker.list_files(dist, ["missing.js"])
+            manifest = serviceworker.precache_manifest(dist, files)
+        self.assertEqual(manifest["brython.min.js"], hashlib.sha256(b"b").hexdigest())
+
+        cdn = serviceworker.cdn_aliases(
+            ["https://cdn.example/brython@3.13.2/brython.min.js", "https://cdn.example/pico.css"], files)
+        self.assertEqual(cdn, {"https://cdn.example/brython@3.13.2/brython.min.js": "brython.min.js"})
+        js = serviceworker.service_worker(manifest, cdn)
+        self.assertIn('"examples/hello.0123.js": "' + hashlib.sha256(b"h").hexdigest(), js)
+        # The cache is named by the manifest, so any changed file means a new cache
+        cache = re.search(r'const CACHE = "(pywebedit-sw-[0-9a-f]{16})"', js).group(1)
+        changed = serviceworker.service_worker(dict(manifest, **{"index.html": "0" * 64}), cdn)
+        self.assertNotIn(cache, changed)
+        # A new build drops old precaches only, never the editor's library cache
+        prefix = re.search(r'name\.startsWith\(("[^"]*")\)', js).group(1)
+        self.assertEqual(json.loads(prefix), serviceworker.CACHE_PREFIX)
+        self.assertFalse(pwe.LibraryStore.CACHE_NAME.startswith(serviceworker.CACHE_PREFIX))
+
+
+class StartupImports(unittest.TestCase):
+    """Modules that are slow to load under Brython are imported only by the
+    functions that need them, not when the editor starts."""
+
+    LAZY = {"ast", "gzip", "hashlib", "json"}
+
+    def test_slow_modules_are_not_imported_at_the_top(self):
+        with open(os.path.join(REPO_ROOT, "pywebedit.py"), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        top = set()
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                top.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                top.add(node.module)
+        self.assertEqual(top & self.LAZY, set())
+
 
 class ModificationTracking(unittest.TestCase):
     """anything_modified must flag edits to the HTML, modules, AND every asset
-    type, and a save must reset that baseline."""
-
-    PRISTINE = (pwe.INITIAL_HTML, pwe.INITIAL_PYTHON)
+    type, and a save must reset that baseline -- by version counter, never by
+    comparing contents."""
 
     def test_asset_changes_mark_modified(self):
-        for add in (lambda a: a.add_sound("x", "data:audio/wav;base64,AAAA"),
-                    lambda a: a.add_image("x", "data:image/png;base64,AAAA"),
-                    lambda a: a.add_resource("x.css", "data:text/css;base64,AAAA")):
+        for add in (lambda a: asyncio.run(a.add_sound("x", "data:audio/wav;base64,AAAA")),
+                    lambda a: asyncio.run(a.add_image("x", "data:image/png;base64,AAAA")),
+                    lambda a: asyncio.run(a.add_resource("x.css", "data:text/css;base64,AAAA"))):
             app = pwe.App()
-            self.assertFalse(app.anything_modified(*self.PRISTINE))
+            self.assertFalse(app.anything_modified())
             add(app)
-            self.assertTrue(app.anything_modified(*self.PRISTINE))
+            self.assertTrue(app.anything_modified())
+            self.assertTrue(app.ui.modified)
+
+    def test_module_changes_mark_modified(self):
+        for change in (lambda a: a.new_module("util", pwe.INITIAL_PYTHON, None),
+                       lambda a: (a.new_module("util", pwe.INITIAL_PYTHON, None),
+                                  a._remember_saved_state(), a.rename_module("tools")),
+                       lambda a: (a.new_module("util", pwe.INITIAL_PYTHON, None),
+                                  a._remember_saved_state(), a.remove_module())):
+            app = pwe.App()
+            change(app)
+            self.assertTrue(app.anything_modified())
+
+    def test_typing_marks_modified_but_setting_contents_does_not(self):
+        app = pwe.App()
+        typed = SimpleNamespace(docChanged=True)
+        app.ui._setting_contents = True  # as while set_contents_* dispatches
+        app.ui._on_editor_update(typed)
+        self.assertFalse(app.anything_modified())
+        app.ui._setting_contents = False
+        app.ui._on_editor_update(SimpleNamespace(docChanged=False))  # e.g. a cursor move
+        self.assertFalse(app.anything_modified())
+        app.ui._on_editor_update(typed)
+        self.assertTrue(app.anything_modified())
 
     def test_save_resets_baseline(self):
         app = pwe.App()
-        app.add_resource("style.css", "data:text/css;base64,AAAA")
+        asyncio.run(app.add_resource("style.css", "data:text/css;base64,AAAA"))
         app._remember_saved_state()  # what save_file does once the file is written
-        self.assertFalse(app.anything_modified(*self.PRISTINE))
+        self.assertFalse(app.anything_modified())
+        self.assertFalse(app.ui.modified)
+
+    def test_edits_while_saving_stay_modified(self):
+        app = pwe.App()
+        app.touch()
+
+        class _Writable:
+            async def write(self, data):
+                app.touch()  # as if typed while the file is being written
+
+            async def close(self):
+                pass
+
+        class _Handle:
+            name = "p.html"
+
+            async def createWritable(self):
+                return _Writable()
+
+        asyncio.run(app.save_file(_Handle(), HELLO_BODY, HELLO_PY, None, quiet=True))
+        self.assertTrue(app.anything_modified())
+        self.assertTrue(app.ui.modified)
+
+    def test_load_resets_baseline(self):
+        app = pwe.App()
+        app.touch()
+        html = app.build_html(HELLO_BODY, HELLO_PY)
+        self.assertTrue(asyncio.run(app.load_html(html)))
+        self.assertFalse(app.anything_modified())
 
 
 if __name__ == "__main__":
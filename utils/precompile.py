@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Precompile pywebedit.py to JavaScript with Brython, ahead of time.
+
+The editor page otherwise ships pywebedit.py as text/python, and Brython
+transpiles all of it on every load before the editor appears. This runs that
+same transpiler once, at build time -- in Node if it is installed, else in
+headless Chromium through Playwright -- and writes the result as a script the
+page can run directly.
+
+The compiled code only works with the exact Brython build that produced it, so
+the script checks the Brython it finds on the page and, on any mismatch, leaves
+the page to compile the text/python source as before.
+
+  precompile.py compile BRYTHON_JS SOURCE -o OUTPUT
+  precompile.py stamp COMPILED_JS HTML
+
+``stamp`` rewrites the ``?v=`` of the page's link to the compiled script to the
+script's content hash, so browsers never run a stale cached copy.
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+MODULE_NAME = "__main__"
+FILENAME = "pywebedit.py"
+
+# Runs in Node or a page with Brython loaded. The Brython key names the exact
+# build, as its compiled code relies on that build's internals.
+COMPILE_JS = """
+(src) => {
+  const $B = __BRYTHON__;
+  $B.url2name[%(filename)s] = %(name)s;
+  const root = $B.py2js({src, filename: %(filename)s}, %(name)s, %(name)s);
+  return {js: root.to_js(), brython: `${$B.implementation.join('.')} ${$B.compiled_date}`};
+}
+""" % {"filename": json.dumps(FILENAME), "name": json.dumps(MODULE_NAME)}
+
+# Loads brython.js as a browser page would, then compiles stdin to the output file
+NODE_JS = """
+const fs = require('fs'), url = require('url');
+const [brython, output] = process.argv.slice(1);
+Object.assign(globalThis, {
+  window: globalThis, self: globalThis, addEventListener() {},
+  navigator: {userAgent: 'node', language: 'en'},
+  location: {href: 'file:///precompile.html', protocol: 'file:', origin: 'null', pathname: '/precompile.html'},
+  document: {getElementsByTagName: () => [], querySelectorAll: () => [], createElement: () => ({}),
+             addEventListener() {}, readyState: 'complete',
+             currentScript: {src: url.pathToFileURL(brython).href}},
+});
+require(brython);
+globalThis.$B = globalThis.__BRYTHON__;  // Top-level in a browser, not in a Node module
+fs.writeFileSync(output, JSON.stringify((%s)(fs.readFileSync(0, 'utf8'))));
+""" % COMPILE_JS
+
+# Defines pywebeditPrecompiled(script, options) only when this Brython matches.
+# It sets Brython up without compiling any script, then queues the compiled
+# editor as Brython's own run_script would after compiling the source.
+WRAPPER_JS = """\
+// pywebedit.py precompiled by Brython %(brython)s.
+// Generated by utils/precompile.py from source sha256 %(source_sha)s; do not edit.
+(function () {
+  const $B = globalThis.__BRYTHON__;
+  if (!$B || `${$B.implementation.join('.')} ${$B.compiled_date}` !== %(brython_json)s) {
+    return;
+  }
+  globalThis.pywebeditPrecompiled = function (script, options) {
+    brython(Object.assign({}, options, {ids: []}));
+    const filename = $B.script_filename = %(filename)s;
+    $B.file_cache[filename] = script.textContent;
+    $B.url2name[filename] = %(name)s;
+    $B.scripts[filename] = script;
+    $B.make_import_paths(filename);
+    $B.builtins.__debug__ = $B.get_option('debug') > 0;
+    if ($B.get_page_option('indexedDB') && $B.has_indexedDB && $B.hasOwnProperty('VFS')) {
+      $B.tasks.push([$B.idb_open]);
+    }
+    $B.tasks.push(['execute', {__doc__: %(doc)s, js: %(js)s, __name__: %(name)s,
+                               __file__: $B.script_path, script_element: script, filename}]);
+    $B.loop();
+  };
+})();
+"""
+
+
+def compile_with_node(brython_path, source):
+    """Run the Brython transpiler on source in Node; returns (js, brython key)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "compiled.json")
+        subprocess.run(["node", "-e", NODE_JS, os.path.abspath(brython_path), output],
+                       input=source, text=True, check=True)
+        with open(output, encoding="utf-8") as f:
+            result = json.load(f)
+    return result["js"], result["brython"]
+
+
+def compile_with_chromium(brython_path, source):
+    """Run the Brython transpiler on source in headless Chromium."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch()
+        page = browser.new_page()
+        page.set_content("<!doctype html><title>precompile</title>")
+        page.add_script_tag(path=brython_path)
+        result = page.evaluate(COMPILE_JS, source)
+        browser.close()
+    return result["js"], result["brython"]
+
+
+def wrap_compiled(js, brython, source):
+    """The compiled script: the editor's JS plus the Brython check and runner."""
+    doc = ast.get_docstring(ast.parse(source), clean=False)
+    return WRAPPER_JS % {
+        "brython": brython,
+        "brython_json": json.dumps(brython),
+        "source_sha": hashlib.sha256(source.encode("utf-8")).hexdigest(),
+        "filename": json.dumps(FILENAME),
+        "name": json.dumps(MODULE_NAME),
+        "doc": "$B.builtins.None" if doc is None else json.dumps(doc),
+        # As a string, like the output of Brython's own compile step
+        "js": json.dumps(js).replace("</", "<\\/"),
+    }
+
+
+def stamp_html(html, compiled_name, compiled_js):
+    """Point the page's link to the compiled script at its content hash."""
+    digest = hashlib.sha256(compiled_js.encode("utf-8")).hexdigest()[:16]
+    pattern = re.escape(compiled_name) + r"\?v=[0-9A-Za-z]*"
+    stamped, count = re.subn(pattern, f"{compiled_name}?v={digest}", html)
+    if count == 0:
+        raise ValueError(f"No link to {compiled_name}?v= in the page")
+    return stamped
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Precompile pywebedit.py to JavaScript with Brython.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = commands.add_parser('compile', help='Compile the editor source')
+    compile_parser.add_argument('brython', help='brython.js (or .min.js) the page will load')
+    compile_parser.add_argument('source', help='Python source to compile')
+    compile_parser.add_argument('-o', '--output', required=True, help='Output JavaScript file')
+    compile_parser.add_argument('--engine', choices=('node', 'chromium'),
+                                help='Where to run Brython (default: node if installed)')
+    stamp_parser = commands.add_parser('stamp', help='Stamp the compiled script hash into a page')
+    stamp_parser.add_argument('compiled', help='Compiled JavaScript file')
+    stamp_parser.add_argument('html', help='HTML page to update in place')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'compile':
+            source = Path(args.source).read_text(encoding='utf-8')
+            engine = args.engine or ('node' if shutil.which('node') else 'chromium')
+            if engine == 'node':
+                js, brython = compile_with_node(args.brython, source)
+            else:
+                js, brython = compile_with_chromium(args.brython, source)
+            Path(args.output).write_text(wrap_compiled(js, brython, source), encoding='utf-8')
+        else:
+            compiled = Path(args.compiled)
+            html = Path(args.html)
+            html.write_text(stamp_html(html.read_text(encoding='utf-8'), compiled.name,
+                                       compiled.read_text(encoding='utf-8')),
+                            encoding='utf-8')
+    except (FileNotFoundError, ImportError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
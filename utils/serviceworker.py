@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Generate the service worker that keeps the hosted editor cached.
+
+Served over http(s), the editor page registers ``sw.js``, which precaches the
+files listed in its manifest, each with the hash of its contents, and then
+serves them from that cache first, so repeat visits start without the network
+and work offline. The CDN copies of the libraries the page asks for are
+answered with the local copies of the same version.
+
+The cache is named by a hash of the whole manifest. A rebuild that changes any
+file changes ``sw.js``, which the browser checks for in the background on each
+visit; it then precaches the new build alongside the old one, and takes over
+(dropping the old cache) once no page uses the old one. So a page never mixes
+files from two builds.
+
+  serviceworker.py DIST FILE... [--cdn URL ...] -o OUTPUT
+
+FILEs are relative to DIST; a directory stands for all the files in it. Pages
+opened from ``file://`` don't register the worker, so they are unaffected.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+# Only caches with this prefix are the worker's to drop; the editor keeps others
+# of its own (pywebedit-libraries) that must survive a new build
+CACHE_PREFIX = "pywebedit-sw-"
+
+SERVICE_WORKER_JS = """\
+// Generated by utils/serviceworker.py; do not edit.
+const CACHE = %(cache)s;
+const PRECACHE = %(precache)s;  // file -> sha256 of its contents
+const CDN = %(cdn)s;  // CDN url -> file, the local copy of it
+
+const scope = new URL(self.registration.scope);
+const local = (file) => new URL(file, scope).href;
+const precached = new Set(Object.keys(PRECACHE).map(local));
+const fromCdn = new Map(Object.entries(CDN).map(([url, file]) => [url, local(file)]));
+
+self.addEventListener('install', (event) => {
+  // Bypass the http cache, which may hold files of an older build
+  event.waitUntil(caches.open(CACHE).then((cache) =>
+    cache.addAll([...precached].map((url) => new Request(url, {cache: 'reload'})))));
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil(caches.keys().then((names) => Promise.all(names
+    .filter((name) => name.startsWith(%(prefix)s) && name !== CACHE)
+    .map((name) => caches.delete(name)))));
+});
+
+self.addEventListener('fetch', (event) => {
+  if (event.request.method !== 'GET') return;
+  const url = new URL(event.request.url);
+  url.search = '';  // Content hashes in ?v= just bust the http cache
+  url.hash = '';
+  let key = fromCdn.get(url.href) || url.href;
+  if (event.request.mode === 'navigate' && key === scope.href) key = local('index.html');
+  if (!precached.has(key)) return;
+  event.respondWith(caches.open(CACHE)
+    .then((cache) => cache.match(key))
+    .then((response) => response || fetch(event.request)));
+});
+"""
+
+
+def list_files(dist, paths):
+    """The files under dist named by paths, directories expanded, as urls."""
+    files = []
+    for path in paths:
+        full = os.path.join(dist, path)
+        if os.path.isdir(full):
+            for root, _, names in os.walk(full):
+                files.extend(os.path.relpath(os.path.join(root, name), dist)
+                             for name in names)
+        elif os.path.exists(full):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"No {path} in {dist}")
+    return sorted(set(f.replace(os.sep, "/") for f in files))
+
+
+def precache_manifest(dist, files):
+    """Map each file to the sha256 of its contents."""
+    manifest = {}
+    for name in files:
+        with open(os.path.join(dist, name), "rb") as f:
+            manifest[name] = hashlib.sha256(f.read()).hexdigest()
+    return manifest
+
+
+def cdn_aliases(urls, files):
+    """Map each CDN url to the precached file of the same name, if any."""
+    by_name = {os.path.basename(name): name for name in files}
+    return {url: by_name[url.rsplit("/", 1)[-1]] for url in urls
+            if url.rsplit("/", 1)[-1] in by_name}
+
+
+def service_worker(manifest, cdn):
+    """The service worker script, versioned by its manifest."""
+    version = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return SERVICE_WORKER_JS % {
+        "cache": json.dumps(CACHE_PREFIX + version),
+        "prefix": json.dumps(CACHE_PREFIX),
+        "precache": json.dumps(manifest, indent=2, sort_keys=True),
+        "cdn": json.dumps(cdn, indent=2, sort_keys=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate the service worker that precaches the hosted editor.'
+    )
+    parser.add_argument('dist', help='Directory the editor is served from')
+    parser.add_argument('files', nargs='+', help='Files (or directories) in dist to precache')
+    parser.add_argument('--cdn', action='append', default=[], metavar='URL',
+                        help='CDN url to answer with the precached file of the same name')
+    parser.add_argument('-o', '--output', required=True, help='Output JavaScript file')
+
+    args = parser.parse_args()
+
+    try:
+        files = list_files(args.dist, args.files)
+        manifest = precache_manifest(args.dist, files)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(service_worker(manifest, cdn_aliases(args.cdn, files)))
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Wrote {args.output}, precaching {len(manifest)} files "
+          f"({sum(os.path.getsize(os.path.join(args.dist, f)) for f in files) // 1024} kB)")
+
+
+if __name__ == "__main__":
+    main()